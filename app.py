@@ -4,29 +4,47 @@ import hashlib
 import logging
 
 from src.pipeline.core import (
-    load_docs_from_pdf_bytes,
-    build_graph_from_documents,
-    ask_question,
+    index_pdf_bytes,
+    build_graph_for_pdf,
+    build_graph_from_stored_chunks,
+    load_graph_from_index,
+    ask_question_stream,
 )
-from src.db.database import db
+from src.db.database import get_db
+from src.cache.answer_cache import answer_cache
+from src.graph.registry import graph_registry
 from src.utils.logger import setup_logging
+from src.utils.text_cleaner import clean_text
+from src.utils.warmup import start_warm_up
+from src.utils.metrics import start_metrics_server
+from config import THREADS_PAGE_SIZE, WARM_UP
 
 # Initialize logging
 setup_logging(log_file="app.log")
 logger = logging.getLogger(__name__)
 logger.info("FileChat application started")
 
+# Models load on first use; start loading them now, once per process, so the first question doesn't wait
+if WARM_UP:
+    start_warm_up()
+# Prometheus text on /metrics when METRICS_PORT is set; no-op otherwise
+start_metrics_server()
+db = get_db()
+
 st.set_page_config(page_title="FileChat", page_icon="📄", layout="wide")
 
 
 def load_pdf_data_and_graph(pdf_id: int):
-    """Load PDF chunks and rebuild graph from stored data."""
-    pdf_chunks = db.get_pdf_chunks(pdf_id)
-    if pdf_chunks:
-        from langchain_core.documents import Document
-        docs = [Document(page_content=chunk) for chunk in pdf_chunks]
-        return build_graph_from_documents(docs, k=4)
-    return None
+    """Load the PDF's stored index, rebuilding it from stored chunks only if missing or stale.
+    Graphs come from the process-wide graph registry, so sessions on the same PDF share one;
+    sessions keep the pdf_id and fetch the graph per question, since idle graphs get evicted."""
+    content_hash = db.get_pdf_content_hash(pdf_id)
+    if content_hash:
+        graph = load_graph_from_index(content_hash, k=4, pdf_id=pdf_id)
+        if graph is not None:
+            return graph
+
+    return build_graph_from_stored_chunks(pdf_id, index_key=content_hash, k=4)
 
 
 # Initialize session state
@@ -34,7 +52,6 @@ if "thread" not in st.session_state:
     # Always start with a fresh chat on app restart
     st.session_state.thread = {"id": str(uuid4()), "messages": []}
     st.session_state.pdf_id = None
-    st.session_state.graph = None
     st.session_state.thread_saved = False  # Track if thread has been saved to DB
 
     # Clean up any empty threads from previous sessions
@@ -47,15 +64,21 @@ with st.sidebar:
     # New Chat button
     if st.button("🆕 New Chat", use_container_width=True):
         st.session_state.thread = {"id": str(uuid4()), "messages": []}
-        st.session_state.graph = None
         st.session_state.pdf_id = None
         st.session_state.thread_saved = False  # Reset saved flag for new thread
         # Don't save empty thread to database
 
     st.divider()
 
-    # Load existing threads
-    threads = db.get_all_threads()
+    # Load existing threads, a page at a time
+    if "thread_pages" not in st.session_state:
+        st.session_state.thread_pages = 1
+    threads, threads_cursor = [], None
+    for _ in range(st.session_state.thread_pages):
+        page, threads_cursor = db.get_threads_page(threads_cursor, limit=THREADS_PAGE_SIZE)
+        threads.extend(page)
+        if threads_cursor is None:
+            break
 
     if threads:
         for thread in threads:
@@ -73,23 +96,41 @@ with st.sidebar:
                 st.session_state.thread = {"id": thread['id'], "messages": []}
                 st.session_state.pdf_id = db.get_thread_pdf_id(thread['id'])
 
-                # Load messages and rebuild graph
+                # Load messages and warm the PDF's graph
                 existing_messages = db.get_chat_history(thread['id'])
                 st.session_state.thread["messages"] = existing_messages
 
                 if st.session_state.pdf_id:
-                    st.session_state.graph = load_pdf_data_and_graph(st.session_state.pdf_id)
+                    load_pdf_data_and_graph(st.session_state.pdf_id)
+
+        if threads_cursor is not None and st.button("⬇️ Load more", use_container_width=True):
+            st.session_state.thread_pages += 1
+            st.rerun()
     else:
         st.info("No chat threads yet. Start a new chat!")
 
+    cache_stats = answer_cache.stats()
+    if cache_stats["hits"] + cache_stats["misses"]:
+        st.caption(
+            f"⚡ Answer cache: {cache_stats['hit_rate']:.0%} hit rate, "
+            f"{cache_stats['saved_seconds']:.1f}s saved"
+        )
+
+    registry_stats = graph_registry.stats()
+    if registry_stats["hits"] + registry_stats["misses"]:
+        st.caption(
+            f"🧠 Graphs: {registry_stats['graphs']} loaded, ~{registry_stats['bytes'] / 2 ** 20:.0f}MB, "
+            f"{registry_stats['hit_rate']:.0%} hit rate, {registry_stats['evictions']} evicted"
+        )
+
 # Main content area
 st.title("📄 FileChat")
 
 # Show current thread info
 if st.session_state.pdf_id:
-    pdf_info = db.get_pdf_chunks(st.session_state.pdf_id)
-    if pdf_info:
-        st.info(f"📎 Current PDF: {pdf_info[0][:50]}..." if len(pdf_info[0]) > 50 else f"📎 Current PDF: {pdf_info[0]}")
+    first_chunk = db.get_chunk(st.session_state.pdf_id, 0)
+    if first_chunk:
+        st.info(f"📎 Current PDF: {first_chunk[:50]}..." if len(first_chunk) > 50 else f"📎 Current PDF: {first_chunk}")
 
 # Upload (only if no PDF is loaded)
 if st.session_state.pdf_id is None:
@@ -98,14 +139,19 @@ if st.session_state.pdf_id is None:
         # Generate content hash for PDF
         content_hash = hashlib.md5(uploaded.getvalue()).hexdigest()
 
-        # Load and process documents
-        docs = load_docs_from_pdf_bytes(uploaded.name, uploaded.getvalue())
-        st.session_state.graph = build_graph_from_documents(docs, k=4)
-
-        # Store PDF in database
-        chunks = [doc.page_content for doc in docs]
-        pdf_id = db.store_pdf(uploaded.name, content_hash, chunks)
+        # Stream pages into the index (built and persisted once per content hash)
+        vectorstore, chunks, rebuilt = index_pdf_bytes(uploaded.name, uploaded.getvalue(), index_key=content_hash)
+
+        # Store PDF in database, one row per indexed chunk; a re-split index replaces stored chunks
+        pdf_id = db.store_pdf(
+            uploaded.name,
+            content_hash,
+            [chunk.page_content for chunk in chunks],
+            [chunk.metadata.get("page") for chunk in chunks],
+            replace_chunks=rebuilt,
+        )
         st.session_state.pdf_id = pdf_id
+        build_graph_for_pdf(pdf_id, vectorstore, index_key=content_hash, k=4)
 
         # Update chat thread with PDF reference
         db.create_chat_thread(st.session_state.thread["id"], pdf_id)
@@ -126,21 +172,29 @@ if prompt:
         db.create_chat_thread(st.session_state.thread["id"])
         st.session_state.thread_saved = True
 
-    # Add user message to database
-    db.add_message(st.session_state.thread["id"], "user", prompt)
+    # Add user message to database; its embedding is reused to answer it
+    prompt_vector = db.add_message(st.session_state.thread["id"], "user", prompt)
     st.session_state.thread["messages"].append({"role": "user", "content": prompt})
 
     with st.chat_message("user"):
         st.write(prompt)
 
-    if st.session_state.graph is None:
-        answer = "Please upload a PDF first."
-    else:
-        answer = ask_question(st.session_state.graph, prompt, st.session_state.thread["id"])
+    with st.chat_message("ai"):
+        pdf_id = st.session_state.pdf_id
+        # Leased while answering, so another session's upload cannot evict and close it mid-stream
+        with graph_registry.leased(lambda: load_pdf_data_and_graph(pdf_id) if pdf_id else None) as graph:
+            if graph is None:
+                answer = "Please upload a PDF first."
+                st.write(answer)
+            else:
+                # Render tokens as they arrive, then keep the cleaned full text
+                answer = clean_text(st.write_stream(
+                    ask_question_stream(
+                        graph, prompt, st.session_state.thread["id"],
+                        pdf_id=pdf_id, question_vector=prompt_vector,
+                    )
+                ))
 
     # Add AI response to database
     db.add_message(st.session_state.thread["id"], "assistant", answer)
     st.session_state.thread["messages"].append({"role": "assistant", "content": answer})
-
-    with st.chat_message("ai"):
-        st.write(answer)
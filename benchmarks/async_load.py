@@ -0,0 +1,116 @@
+"""Concurrent conversation throughput: async graph path vs. the sync path.
+
+Runs many conversations at once through aask_question (graph.ainvoke with the
+async SQLite checkpointer and async DB accessors) in a single event loop, and
+compares questions/second against answering the same questions one at a time
+with ask_question. The LLM is a local fake OpenAI-compatible server.
+
+    python -m benchmarks.async_load --conversations 50 --questions 3 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from benchmarks.common import prepare_environment, synthetic_documents, summarize
+from benchmarks.fake_llm_server import start_in_background
+from benchmarks.workflow_latency import QUESTIONS
+
+
+async def run_conversation(graph, n_questions: int, samples: list):
+    from src.db.async_database import get_async_db
+    from src.pipeline.core import aask_question
+
+    async_db = get_async_db()
+
+    thread_id = str(uuid4())
+    await async_db.create_chat_thread(thread_id)
+    for i in range(n_questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        vector = await async_db.add_message(thread_id, "user", question)
+        answer = await aask_question(graph, question, thread_id, question_vector=vector)
+        await async_db.add_message(thread_id, "assistant", answer)
+        samples.append(time.perf_counter() - start)
+
+
+async def run_async(documents, conversations: int, n_questions: int, k: int):
+    from src.db.async_database import get_async_db
+    from src.graph.registry import aclose_graph
+    from src.pipeline.core import abuild_graph_from_documents
+
+    async_db = get_async_db()
+
+    graph = await abuild_graph_from_documents(documents, k=k)
+    try:
+        await run_conversation(graph, 1, [])  # Warm up connections and the checkpointer
+
+        samples = []
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(graph, n_questions, samples) for _ in range(conversations)))
+        elapsed = time.perf_counter() - start
+    finally:
+        # Open aiosqlite connections keep the process alive, failed run or not
+        await aclose_graph(graph)
+        await async_db.close()
+    return elapsed, samples
+
+
+def run_sync(documents, n_questions: int, k: int):
+    from src.db.database import get_db
+    from src.pipeline.core import build_graph_from_documents, ask_question
+
+    db = get_db()
+
+    graph = build_graph_from_documents(documents, k=k)
+    thread_id = str(uuid4())
+    db.create_chat_thread(thread_id)
+    samples = []
+    start = time.perf_counter()
+    for i in range(n_questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        begin = time.perf_counter()
+        vector = db.add_message(thread_id, "user", question)
+        answer = ask_question(graph, question, thread_id, question_vector=vector)
+        db.add_message(thread_id, "assistant", answer)
+        samples.append(time.perf_counter() - begin)
+    return time.perf_counter() - start, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=3, help="Questions per conversation")
+    parser.add_argument("--sync-questions", type=int, default=5, help="Questions answered serially for the baseline")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    _, base_url = start_in_background(latency=args.llm_latency)
+    prepare_environment(base_url)
+    documents = synthetic_documents(args.pages)
+
+    sync_elapsed, sync_samples = run_sync(documents, args.sync_questions, args.k)
+    async_elapsed, async_samples = asyncio.run(run_async(documents, args.conversations, args.questions, args.k))
+
+    total = args.conversations * args.questions
+    print(json.dumps({
+        "llm_latency_s": args.llm_latency,
+        "sync_serial": {
+            "questions": args.sync_questions,
+            "questions_per_s": round(args.sync_questions / sync_elapsed, 2),
+            "latency": summarize(sync_samples),
+        },
+        "async_concurrent": {
+            "conversations": args.conversations,
+            "questions": total,
+            "questions_per_s": round(total / async_elapsed, 2),
+            "latency": summarize(async_samples),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
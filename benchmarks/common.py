@@ -0,0 +1,107 @@
+"""Shared setup for the offline benchmarks.
+
+Every benchmark runs inside a scratch working directory (so chatbot.db, indexes
+and caches never touch the real ones) against a local fake LLM endpoint.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "warranty period device battery firmware update error code reset procedure "
+    "installation manual safety warning temperature voltage sensor calibration "
+    "maintenance schedule replacement part network configuration display panel "
+    "power supply cable connector module service interval troubleshooting guide"
+).split()
+
+
+def prepare_environment(llm_base_url: str = None, workdir: str = None) -> str:
+    """Point FileChat at a scratch directory and, optionally, a fake LLM endpoint.
+    Must run before anything from config or src is imported."""
+    workdir = workdir or tempfile.mkdtemp(prefix="filechat-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("HG_API_KEY", "benchmark-key")
+    if llm_base_url:
+        os.environ["OPENAI_BASE"] = llm_base_url
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return workdir
+
+
+def synthetic_text(n_words: int, seed: int = 0) -> str:
+    """Deterministic pseudo-technical prose, with part numbers sprinkled in."""
+    rng = random.Random(seed)
+    words = []
+    for i in range(n_words):
+        if i % 37 == 0:
+            words.append(f"PN-{rng.randint(1000, 9999)}")
+        else:
+            words.append(rng.choice(WORDS))
+        if i % 12 == 11:
+            words[-1] += "."
+    return " ".join(words)
+
+
+def synthetic_documents(n_pages: int, words_per_page: int = 350, seed: int = 0):
+    """Page-level Documents shaped like the PDF loader's output."""
+    from langchain_core.documents import Document
+
+    return [
+        Document(
+            page_content=synthetic_text(words_per_page, seed=seed * 100003 + page),
+            metadata={"source": "synthetic.pdf", "page": page, "total_pages": n_pages},
+        )
+        for page in range(n_pages)
+    ]
+
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(n_pages: int, words_per_page: int = 350, seed: int = 0) -> bytes:
+    """A minimal, valid text PDF (Helvetica, one content stream per page), written by hand
+    so benchmarks need no PDF-authoring dependency."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for page in range(n_pages):
+        words = synthetic_text(words_per_page, seed=seed * 100003 + page).split()
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        text = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in lines)
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, n_pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
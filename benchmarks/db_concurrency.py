@@ -0,0 +1,158 @@
+"""Chat database under concurrent writers and readers: per-call connections vs. the pool.
+
+The baseline reproduces the previous FileChatDB access pattern: a fresh
+sqlite3.connect per call on a rollback-journal database with the default 5s
+timeout. The pooled variant is FileChatDB as it is now (per-thread connections,
+WAL, IMMEDIATE write transactions). Writers append messages, readers load chat
+history, and one extra writer stands in for the LangGraph checkpointer on its
+own connection. Reports throughput, latency and "database is locked" errors.
+
+    python -m benchmarks.db_concurrency --writers 8 --readers 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from benchmarks.common import prepare_environment, summarize
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chat_threads (id TEXT PRIMARY KEY, pdf_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT NOT NULL, role TEXT NOT NULL,
+        content TEXT NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT, checkpoint BLOB);
+"""
+
+
+class PerCallDB:
+    """The previous access pattern: connect, run, commit and close on every call."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def add_message(self, thread_id: str, role: str, content: str):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "INSERT INTO chat_messages (thread_id, role, content) VALUES (?, ?, ?)", (thread_id, role, content)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_chat_history(self, thread_id: str):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT role, content, timestamp FROM chat_messages WHERE thread_id = ? ORDER BY timestamp", (thread_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def checkpoint_connection(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+
+def pooled_db(db_path: str):
+    from src.db.database import FileChatDB
+
+    db = FileChatDB(db_path)
+    db.pool.connection().executescript(SCHEMA)
+    db.checkpoint_connection = db.get_langgraph_connection
+    return db
+
+
+def run(db, writers: int, readers: int, seconds: float, threads_per_writer: int = 4) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {"write": [], "read": [], "checkpoint": [], "locked_errors": 0}
+
+    def record(kind: str, started: float):
+        with lock:
+            results[kind].append(time.perf_counter() - started)
+
+    def locked():
+        with lock:
+            results["locked_errors"] += 1
+
+    def writer(n: int):
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                db.add_message(f"thread-{n}-{i % threads_per_writer}", "user", "x" * 200)
+                record("write", started)
+            except sqlite3.OperationalError:
+                locked()
+            i += 1
+
+    def reader(n: int):
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                db.get_chat_history(f"thread-{n % max(1, writers)}-{i % threads_per_writer}")
+                record("read", started)
+            except sqlite3.OperationalError:
+                locked()
+            i += 1
+
+    def checkpointer():
+        # Like SqliteSaver: one long-lived connection, a commit per checkpoint
+        conn = db.checkpoint_connection()
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute("INSERT INTO checkpoints VALUES (?, ?)", ("thread", os.urandom(2048)))
+                conn.commit()
+                record("checkpoint", started)
+            except sqlite3.OperationalError:
+                conn.rollback()
+                locked()
+        conn.close()
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    workers += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    workers.append(threading.Thread(target=checkpointer))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    report = {"locked_errors": results["locked_errors"]}
+    for kind in ("write", "read", "checkpoint"):
+        samples = results[kind]
+        report[kind] = {"ops_per_s": round(len(samples) / seconds, 1), **(summarize(samples) if samples else {})}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    os.environ["HISTORY_SELECTION"] = "recent"  # Measure the database, not message embedding
+    per_call = run(PerCallDB(os.path.join(workdir, "per_call.db")), args.writers, args.readers, args.seconds)
+    pooled = run(pooled_db(os.path.join(workdir, "pooled.db")), args.writers, args.readers, args.seconds)
+    print(json.dumps({
+        "writers": args.writers,
+        "readers": args.readers,
+        "per_call_connections": per_call,
+        "pooled_wal": pooled,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Embedding throughput in chunks/second, from chunk texts to vectors in a FAISS index.
+
+The baseline is the previous path: HuggingFaceEmbeddings.embed_documents with
+default settings, then FAISS.from_embeddings over the returned Python lists.
+It is compared with EmbeddingEngine over a sweep of batch sizes, in-process and
+with a pool of encoder processes, adding its float32 matrix to a flat index
+directly. Chunks come from splitting synthetic pages, so their lengths vary as
+real chunks do. The embedding cache is bypassed, and each configuration encodes
+a few chunks before timing, so model loading and pool start-up are excluded.
+
+    python -m benchmarks.embedding_throughput --pages 200 --batch-sizes 16,32,64,128 --processes 1,2,4
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import prepare_environment, synthetic_documents
+
+
+def timed_run(encode_and_index, n_chunks: int, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode_and_index()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": round(best, 3), "chunks_per_s": round(n_chunks / best, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--batch-sizes", default="16,32,64,128", help="Comma-separated EmbeddingEngine batch sizes")
+    parser.add_argument("--processes", default="1,2,4", help="Comma-separated encoder process counts; 1 is in-process")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads; 0 keeps torch's default")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per configuration; the fastest is reported")
+    args = parser.parse_args()
+
+    prepare_environment()
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from config import EMBEDDING_MODEL
+    from src.splitter.semantic_chunker import split_pdf_into_chunks
+    from src.vector_store.embedding_engine import EmbeddingEngine
+
+    texts = [chunk.page_content for chunk in split_pdf_into_chunks(synthetic_documents(args.pages))]
+    lengths = sorted(len(text) for text in texts)
+
+    baseline = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    baseline.embed_documents(texts[:8])
+    results = [{
+        "config": "HuggingFaceEmbeddings + FAISS.from_embeddings",
+        **timed_run(lambda: FAISS.from_embeddings(zip(texts, baseline.embed_documents(texts)), baseline), len(texts), args.repeat),
+    }]
+
+    for processes in (int(value) for value in args.processes.split(",")):
+        for batch_size in (int(value) for value in args.batch_sizes.split(",")):
+            engine = EmbeddingEngine(
+                EMBEDDING_MODEL, batch_size=batch_size, threads=args.threads, processes=processes, pool_min_texts=1
+            )
+            engine.encode(texts[:8 * max(1, processes)])
+
+            def encode_and_index():
+                vectors = engine.encode(texts)
+                faiss.IndexFlatL2(vectors.shape[1]).add(vectors)
+
+            results.append({
+                "config": f"EmbeddingEngine batch_size={batch_size} processes={processes}",
+                **timed_run(encode_and_index, len(texts), args.repeat),
+            })
+            engine.close()
+
+    print(json.dumps({
+        "chunks": len(texts),
+        "chunk_chars": {"min": lengths[0], "median": lengths[len(lengths) // 2], "max": lengths[-1]},
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
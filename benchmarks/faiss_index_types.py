@@ -0,0 +1,81 @@
+"""FAISS index types: recall@k against the exact flat index, query latency and memory.
+
+For each corpus size, builds every index type with build_faiss_index (the same
+code and FAISS_* settings ingestion uses) over synthetic clustered, normalized
+vectors of the embedding model's dimension, then answers --queries queries one
+at a time. Recall@k is the share of the flat index's top k that each index
+returns; memory is the serialized index size. Tune with the FAISS_* variables,
+e.g. FAISS_IVF_NPROBE=32 or FAISS_HNSW_EF_SEARCH=128.
+
+    python -m benchmarks.faiss_index_types --sizes 10000,50000,100000 --metric ip
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import prepare_environment, summarize
+
+
+def clustered_vectors(rng: np.random.Generator, centers: np.ndarray, n: int) -> np.ndarray:
+    """Unit vectors scattered around topic centers, a rough stand-in for chunk embeddings."""
+    labels = rng.integers(len(centers), size=n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, centers.shape[1]))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(index, queries: np.ndarray, k: int, truth: np.ndarray) -> dict:
+    samples, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        samples.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = np.mean([len(set(row) & set(expected)) / k for row, expected in zip(found, truth)])
+    return {"recall_at_k": round(float(recall), 4), "latency": summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--types", default="flat,hnsw,ivf,ivfpq", help="Comma-separated index types")
+    parser.add_argument("--metric", default="ip", choices=["l2", "ip"])
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 embeddings have 384 dimensions")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    prepare_environment()
+    import faiss
+    from src.vector_store.faiss_store import build_faiss_index, index_factory_string
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((args.clusters, args.dim))
+    queries = clustered_vectors(rng, centers, args.queries)
+    index_types = args.types.split(",")
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        vectors = clustered_vectors(rng, centers, size)
+        exact = build_faiss_index(vectors, "flat", args.metric)
+        _, truth = exact.search(queries, args.k)
+        for index_type in index_types:
+            start = time.perf_counter()
+            index = build_faiss_index(vectors, index_type, args.metric)
+            build_s = time.perf_counter() - start
+            results.append({
+                "vectors": size,
+                "index": index_factory_string(index_type, size, args.dim),
+                "build_s": round(build_s, 2),
+                "memory_mb": round(len(faiss.serialize_index(index)) / 2 ** 20, 1),
+                **measure(index, queries, args.k, truth),
+            })
+
+    print(json.dumps({"metric": args.metric, "dim": args.dim, "k": args.k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Local stand-in for the OpenAI-compatible chat completions endpoint.
+
+Serves POST /v1/chat/completions (plain and streamed) with configurable latency,
+so benchmarks can exercise the real ChatOpenAI client without network access.
+
+    python -m benchmarks.fake_llm_server --port 8765 --latency 0.5
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REWRITE_RESPONSE = "What is covered by the warranty\nHow long does the warranty last\nWarranty period duration"
+ANSWER_RESPONSE = "The warranty period is two years from the date of purchase, covering parts and labour."
+
+
+def _completion_text(messages) -> str:
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    return REWRITE_RESPONSE if "reformulator" in system else ANSWER_RESPONSE
+
+
+def _usage(messages, text: str) -> dict:
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = max(1, len(text) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Latency settings are read from the server instance (see make_server)."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        model = body.get("model", "fake-model")
+        text = _completion_text(messages)
+        time.sleep(self.server.latency)
+
+        if body.get("stream"):
+            self._stream(model, messages, text, body.get("stream_options", {}).get("include_usage", False))
+        else:
+            self._respond(model, messages, text)
+
+    def _respond(self, model, messages, text):
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(messages, text),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, model, messages, text, include_usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def send(chunk):
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        tokens = text.split(" ")
+        for i, token in enumerate(tokens):
+            delta = {"content": token if i == 0 else " " + token}
+            if i == 0:
+                delta["role"] = "assistant"
+            send({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            send({**base, "choices": [], "usage": _usage(messages, text)})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.5, token_delay: float = 0.0):
+    """Create (but do not start) a fake server; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    return server
+
+
+def start_in_background(latency: float = 0.5, token_delay: float = 0.0):
+    """Start a fake server on a free port in a daemon thread and return (server, base_url)."""
+    server = make_server(latency=latency, token_delay=token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first byte of every response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.token_delay)
+    print(f"Fake LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Cold-start guard: import cost of FileChat's modules, measured with python -X importtime.
+
+Each module is imported in a fresh interpreter inside a scratch directory. The
+check fails (exit status 1) when a module takes longer than --budget-ms to
+import, or when importing it loads a module that must wait until first use:
+the embedding model's torch / sentence-transformers stack or the LLM client.
+Files the import creates in the scratch directory are listed as side effects.
+
+    python -m benchmarks.import_time --budget-ms 3000
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import REPO_ROOT, prepare_environment
+
+MODULES = ["config", "src.db.database", "src.graph.workflow", "src.pipeline.core"]
+
+# Loaded by get_embeddings() and get_llm(), never by an import
+DEFERRED_MODULES = ["torch", "sentence_transformers", "transformers", "langchain_huggingface", "langchain_openai", "openai"]
+
+# "import time: self [us] | cumulative | imported package", nesting shown by indentation
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile(module: str, workdir: str) -> dict:
+    """Import module in a fresh interpreter and an empty directory; return its import time and what it pulled in."""
+    workdir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    # (name, cumulative microseconds, nesting level); a module is listed after everything it imports
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            _, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(cumulative_us), (len(indent) - 1) // 2))
+    total_us = next(cumulative for name, cumulative, level in entries if name == module and level == 0)
+    imported = {name for name, _, _ in entries}
+    # Direct imports of the module itself, which is the last top-level entry
+    top = max(i for i, (_, _, level) in enumerate(entries) if level == 0)
+    previous_top = max([i for i, (_, _, level) in enumerate(entries[:top]) if level == 0], default=-1)
+    direct = [(name, cumulative) for name, cumulative, level in entries[previous_top + 1:top] if level == 1]
+    return {
+        "module": module,
+        "import_ms": round(total_us / 1000, 1),
+        "slowest_imports": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, cumulative in sorted(direct, key=lambda entry: -entry[1])[:5]
+        ],
+        "deferred_loaded": sorted(name for name in DEFERRED_MODULES if name in imported),
+        "files_created": sorted(os.listdir(workdir)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=",".join(MODULES), help="Comma-separated modules to import")
+    parser.add_argument("--budget-ms", type=float, default=3000.0, help="Largest acceptable import time per module")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    results = [profile(module, workdir) for module in args.modules.split(",")]
+    failures = []
+    for result in results:
+        if result["import_ms"] > args.budget_ms:
+            failures.append(f"{result['module']}: imports in {result['import_ms']}ms, budget {args.budget_ms}ms")
+        if result["deferred_loaded"]:
+            failures.append(f"{result['module']}: loads {', '.join(result['deferred_loaded'])} at import")
+        if result["files_created"]:
+            failures.append(f"{result['module']}: creates {', '.join(result['files_created'])} at import")
+    print(json.dumps({"budget_ms": args.budget_ms, "results": results, "failures": failures}, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""PDF ingestion: load-everything pipeline vs. streaming page pipeline.
+
+The baseline parses every page, then splits everything, then embeds everything
+(load_pdf_from_bytes -> split_pdf_into_chunks -> create_vector_store). The
+streaming path (stream_vector_store over iter_pdf_pages) overlaps the stages
+through bounded queues. Reports wall time and, with --trace-memory, peak Python
+heap (tracemalloc, which slows parsing several times over).
+Each mode ingests a different synthetic PDF of the same size, so neither
+benefits from the other's embedding cache entries.
+
+    python -m benchmarks.ingest_streaming --pages 300
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.common import prepare_environment, synthetic_pdf
+
+
+def measure(ingest, trace_memory: bool) -> dict:
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    vectorstore = ingest()
+    result = {"seconds": round(time.perf_counter() - start, 2), "chunks": vectorstore.index.ntotal}
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_heap_mb"] = round(peak / 2 ** 20, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--words-per-page", type=int, default=450)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    prepare_environment()
+    from src.loader.pdf_loader import load_pdf_from_bytes, iter_pdf_pages
+    from src.splitter.semantic_chunker import split_pdf_into_chunks
+    from src.vector_store.faiss_store import create_vector_store
+    from src.pipeline.streaming import stream_vector_store
+
+    batch_pdf = synthetic_pdf(args.pages, args.words_per_page, seed=1)
+    stream_pdf = synthetic_pdf(args.pages, args.words_per_page, seed=2)
+
+    def batch():
+        return create_vector_store(split_pdf_into_chunks(load_pdf_from_bytes(batch_pdf)))
+
+    def streaming():
+        return stream_vector_store(iter_pdf_pages(stream_pdf))
+
+    print(json.dumps({
+        "pages": args.pages,
+        "pdf_mb": round(len(batch_pdf) / 2 ** 20, 2),
+        "load_everything": measure(batch, args.trace_memory),
+        "streaming": measure(streaming, args.trace_memory),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""PDF parsing throughput against parser process count.
+
+Parses one synthetic PDF with iter_pdf_pages at 1, 2, 4, ... workers (up to the
+core count, or --max-workers) and reports pages/second and speedup over the
+in-process parser. Every run is checked to return the same pages in order.
+
+    python -m benchmarks.parse_scaling --pages 500
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import prepare_environment, synthetic_pdf
+
+
+def worker_counts(max_workers: int):
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--words-per-page", type=int, default=450)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    prepare_environment()
+    from src.loader.pdf_loader import iter_pdf_pages
+
+    data = synthetic_pdf(args.pages, args.words_per_page)
+    baseline_pages, baseline_seconds, runs = None, None, []
+    for workers in worker_counts(args.max_workers):
+        start = time.perf_counter()
+        pages = list(iter_pdf_pages(data, "synthetic.pdf", workers=workers, parallel_min_pages=0))
+        elapsed = time.perf_counter() - start
+        if baseline_pages is None:
+            baseline_pages, baseline_seconds = pages, elapsed
+        elif pages != baseline_pages:
+            raise AssertionError(f"{workers} workers returned different pages than the in-process parser")
+        runs.append({
+            "workers": workers,
+            "seconds": round(elapsed, 2),
+            "pages_per_s": round(len(pages) / elapsed, 1),
+            "speedup": round(baseline_seconds / elapsed, 2),
+        })
+
+    print(json.dumps({"pages": args.pages, "cpu_count": os.cpu_count(), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Query expansion strategies: end-to-end latency and retrieval overlap.
+
+Answers the same questions through graphs built with each QUERY_EXPANSION
+strategy and reports question latency plus, per strategy, how many retrieved
+chunks it shares with the llm strategy (Jaccard over chunk ids). The LLM is a
+local fake OpenAI-compatible server; pass --llm-base-url to compare against a
+real endpoint, where the llm strategy's rewrites are meaningful.
+
+    python -m benchmarks.query_expansion --llm-latency 0.6 --questions 20
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import prepare_environment, synthetic_documents, summarize
+from benchmarks.fake_llm_server import start_in_background
+from benchmarks.workflow_latency import QUESTIONS
+
+
+def run_strategy(graph, strategy: str, n_questions: int):
+    samples, retrieved = [], []
+    for i in range(n_questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        result = graph.invoke({"question": question}, config={"configurable": {"thread_id": f"{strategy}-{i}"}})
+        samples.append(time.perf_counter() - start)
+        retrieved.append({hit["id"] for hit in result.get("hits") or []})
+    return samples, retrieved
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.6, help="Fake LLM response latency in seconds")
+    parser.add_argument("--llm-base-url", default=None, help="Use this OpenAI-compatible endpoint instead of the fake one")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    base_url = args.llm_base_url
+    if base_url is None:
+        _, base_url = start_in_background(latency=args.llm_latency)
+    prepare_environment(base_url)
+
+    from src.splitter.semantic_chunker import split_pdf_into_chunks
+    from src.vector_store.faiss_store import create_vector_store
+    from src.vector_store.index_store import load_or_build_lexical_index
+    from src.retrieval.query_expansion import QUERY_EXPANSION_STRATEGIES
+    from src.graph.workflow import create_workflow
+
+    vectorstore = create_vector_store(split_pdf_into_chunks(synthetic_documents(args.pages)))
+    start = time.perf_counter()
+    lexical_index = load_or_build_lexical_index(None, vectorstore)
+    lexical_build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    results = {}
+    for strategy in QUERY_EXPANSION_STRATEGIES:
+        graph = create_workflow(vectorstore, k=args.k, lexical_index=lexical_index, query_expansion=strategy)
+        run_strategy(graph, f"warmup-{strategy}", 1)
+        results[strategy] = run_strategy(graph, strategy, args.questions)
+
+    _, reference = results["llm"]
+    report = {}
+    for strategy, (samples, retrieved) in results.items():
+        overlaps = [jaccard(ids, ref) for ids, ref in zip(retrieved, reference)]
+        report[strategy] = {
+            "latency": summarize(samples),
+            "mean_chunks": round(sum(len(ids) for ids in retrieved) / len(retrieved), 2),
+            "jaccard_vs_llm": round(sum(overlaps) / len(overlaps), 3),
+        }
+
+    print(json.dumps({
+        "llm_latency_s": args.llm_latency if args.llm_base_url is None else None,
+        "pages": args.pages,
+        "lexical_index_build_ms": lexical_build_ms,
+        "strategies": report,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""End-to-end benchmark suite, for comparing performance across commits.
+
+For each PDF size in --pages, synthetic PDFs are parsed with
+load_docs_from_pdf_bytes, turned into a graph with build_graph_from_documents and
+asked --questions questions through ask_question, against a local fake LLM with
+--llm-latency seconds per response. The FileChatDB operations behind a chat
+session are timed on their own database. Every repeat uses a new PDF, so the
+embedding cache never serves a build; the embedding model is loaded before timing.
+
+Results (p50/p95 per operation, plus the commit and library versions) are written
+as JSON to --output. With --baseline, each operation's p50 is compared with the
+baseline's, and the run fails (exit status 1) when one is more than
+--max-regression slower, by at least --min-delta-ms.
+
+    python -m benchmarks.suite --pages 10,50,200 --output bench.json
+    python -m benchmarks.suite --pages 10,50,200 --baseline bench.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from importlib import metadata
+from uuid import uuid4
+
+from benchmarks.common import REPO_ROOT, prepare_environment, summarize, synthetic_pdf, synthetic_text
+from benchmarks.fake_llm_server import start_in_background
+from benchmarks.workflow_latency import QUESTIONS
+
+# Libraries whose upgrades the suite is meant to catch
+PACKAGES = [
+    "langchain", "langchain-community", "langchain-core", "langchain-openai", "langgraph",
+    "faiss-cpu", "sentence-transformers", "torch", "pypdf", "pdfplumber", "numpy",
+]
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {"commit": commit, "python": platform.python_version(), "packages": versions}
+
+
+def timed(samples: list, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def bench_pipeline(n_pages: int, repeat: int, n_questions: int, k: int) -> dict:
+    from src.pipeline.core import load_docs_from_pdf_bytes, build_graph_from_documents, ask_question
+
+    load_samples, build_samples, ask_samples = [], [], []
+    for run in range(repeat):
+        data = synthetic_pdf(n_pages, seed=n_pages * 1000 + run)
+        docs = timed(load_samples, load_docs_from_pdf_bytes, f"synthetic-{n_pages}-{run}.pdf", data)
+        graph = timed(build_samples, build_graph_from_documents, docs, k=k)
+        thread_id = str(uuid4())
+        for i in range(n_questions):
+            timed(ask_samples, ask_question, graph, QUESTIONS[i % len(QUESTIONS)], thread_id)
+    return {
+        f"load_docs_from_pdf_bytes[{n_pages}p]": summarize(load_samples),
+        f"build_graph_from_documents[{n_pages}p]": summarize(build_samples),
+        f"ask_question[{n_pages}p]": summarize(ask_samples),
+    }
+
+
+def bench_database(n_chunks: int, n_threads: int, n_messages: int) -> dict:
+    from src.db.database import FileChatDB
+
+    db = FileChatDB("bench-suite.db")
+    samples = {name: [] for name in (
+        "store_pdf", "get_pdf_chunks", "get_chunks_by_ordinals", "create_chat_thread",
+        "add_message", "get_recent_messages", "get_chat_history", "get_threads_page",
+    )}
+    chunk_texts = [synthetic_text(120, seed=i) for i in range(n_chunks)]
+    pdf_ids = [
+        timed(samples["store_pdf"], db.store_pdf, f"manual-{i}.pdf", f"suite-{uuid4().hex}", chunk_texts)
+        for i in range(5)
+    ]
+    for pdf_id in pdf_ids:
+        timed(samples["get_pdf_chunks"], db.get_pdf_chunks, pdf_id)
+        timed(samples["get_chunks_by_ordinals"], db.get_chunks_by_ordinals, pdf_id, range(0, n_chunks, max(1, n_chunks // 8)))
+
+    thread_ids = [f"suite-thread-{i:05d}" for i in range(n_threads)]
+    for i, thread_id in enumerate(thread_ids):
+        timed(samples["create_chat_thread"], db.create_chat_thread, thread_id, pdf_ids[i % len(pdf_ids)])
+    for i in range(n_messages):
+        thread_id = thread_ids[i % n_threads]
+        role = "user" if i % 2 == 0 else "assistant"
+        timed(samples["add_message"], db.add_message, thread_id, role, synthetic_text(40, seed=i))
+    for thread_id in thread_ids:
+        timed(samples["get_recent_messages"], db.get_recent_messages, thread_id, 6)
+        timed(samples["get_chat_history"], db.get_chat_history, thread_id)
+
+    cursor = None
+    while True:
+        _, cursor = timed(samples["get_threads_page"], db.get_threads_page, cursor, 50)
+        if cursor is None:
+            break
+    db.close()
+    return {f"db.{name}": summarize(values) for name, values in samples.items()}
+
+
+def compare(results: dict, baseline: dict, max_regression: float, min_delta_ms: float) -> list:
+    """Regressions of p50 latency against a baseline run; operations missing from either run are skipped."""
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        delta = stats["p50_ms"] - before["p50_ms"]
+        if stats["p50_ms"] > before["p50_ms"] * (1 + max_regression) and delta >= min_delta_ms:
+            regressions.append({
+                "operation": name,
+                "baseline_p50_ms": before["p50_ms"],
+                "p50_ms": stats["p50_ms"],
+                "slowdown": round(stats["p50_ms"] / before["p50_ms"], 2) if before["p50_ms"] else None,
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,50,200", help="Comma-separated synthetic PDF sizes in pages")
+    parser.add_argument("--repeat", type=int, default=3, help="PDFs parsed and built per size")
+    parser.add_argument("--questions", type=int, default=5, help="Questions asked per built graph")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM response latency in seconds")
+    parser.add_argument("--db-chunks", type=int, default=500, help="Chunks per stored PDF in the database benchmark")
+    parser.add_argument("--db-threads", type=int, default=200)
+    parser.add_argument("--db-messages", type=int, default=1000)
+    parser.add_argument("--output", help="Write the results JSON here (as well as to stdout)")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Largest acceptable relative p50 slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore p50 slowdowns smaller than this")
+    args = parser.parse_args()
+    # prepare_environment moves into a scratch directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    _, base_url = start_in_background(latency=args.llm_latency)
+    prepare_environment(base_url)
+    from config import get_embeddings
+
+    # Model loading is a one-off cost, not part of any operation
+    get_embeddings().embed_query("warm up")
+
+    results = {}
+    for n_pages in (int(value) for value in args.pages.split(",")):
+        results.update(bench_pipeline(n_pages, args.repeat, args.questions, args.k))
+    results.update(bench_database(args.db_chunks, args.db_threads, args.db_messages))
+
+    report = {
+        "environment": environment_info(),
+        "settings": {
+            "pages": args.pages, "repeat": args.repeat, "questions": args.questions, "k": args.k,
+            "llm_latency_s": args.llm_latency, "db_chunks": args.db_chunks,
+            "db_threads": args.db_threads, "db_messages": args.db_messages,
+        },
+        "results": results,
+    }
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.max_regression, args.min_delta_ms)
+        report["baseline"] = {"commit": baseline.get("environment", {}).get("commit"), "regressions": regressions}
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Sidebar thread listing: correlated COUNT(*) without indexes vs. counters and keyset pages.
+
+Builds a chat database with the original schema (no indexes, no message
+counter) holding --threads threads and --messages messages, times the original
+get_all_threads query, then opens the same file with FileChatDB, which migrates
+it (indexes, backfilled message_count, triggers), and times the new listing
+queries, including a keyset page deep into the list. The original query scans
+every message once per thread, so it is timed only once.
+
+    python -m benchmarks.thread_listing --threads 2000 --messages 100000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks.common import prepare_environment, summarize
+
+ORIGINAL_SCHEMA = """
+    CREATE TABLE pdfs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT NOT NULL, content_hash TEXT UNIQUE NOT NULL,
+        chunks TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE chat_threads (
+        id TEXT PRIMARY KEY, pdf_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT NOT NULL, role TEXT NOT NULL,
+        content TEXT NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+ORIGINAL_LISTING = """
+    SELECT t.id, t.created_at, p.filename,
+           (SELECT COUNT(*) FROM chat_messages WHERE thread_id = t.id) as message_count
+    FROM chat_threads t
+    LEFT JOIN pdfs p ON t.pdf_id = p.id
+    ORDER BY t.created_at DESC
+"""
+
+
+def populate(db_path: str, n_threads: int, n_messages: int):
+    rng = random.Random(0)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(ORIGINAL_SCHEMA)
+    conn.executemany(
+        "INSERT INTO pdfs (filename, content_hash, chunks) VALUES (?, ?, '[]')",
+        ((f"manual-{i}.pdf", f"hash-{i}") for i in range(100))
+    )
+    conn.executemany(
+        "INSERT INTO chat_threads (id, pdf_id, created_at) VALUES (?, ?, datetime('2025-01-01', ?))",
+        ((f"thread-{i:06d}", rng.randint(1, 100), f"+{i * 7} minutes") for i in range(n_threads))
+    )
+    conn.executemany(
+        "INSERT INTO chat_messages (thread_id, role, content) VALUES (?, ?, ?)",
+        ((f"thread-{rng.randrange(n_threads):06d}", "user" if i % 2 == 0 else "assistant", "x" * 300)
+         for i in range(n_messages))
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    db_path = os.path.join(workdir, "threads.db")
+    populate(db_path, args.threads, args.messages)
+
+    conn = sqlite3.connect(db_path)
+    original = timed(lambda: conn.execute(ORIGINAL_LISTING).fetchall(), 1)
+    conn.close()
+
+    from src.db.database import FileChatDB
+
+    start = time.perf_counter()
+    db = FileChatDB(db_path)
+    migration_s = time.perf_counter() - start
+
+    # Cursor halfway down the list, reached by walking pages once
+    deep_cursor, cursor = None, None
+    for _ in range(args.threads // args.page_size // 2):
+        _, cursor = db.get_threads_page(cursor, args.page_size)
+    deep_cursor = cursor
+
+    print(json.dumps({
+        "threads": args.threads,
+        "messages": args.messages,
+        "migration_s": round(migration_s, 2),
+        "original_get_all_threads": original,
+        "get_all_threads": timed(db.get_all_threads, args.repeat),
+        "get_threads_page_first": timed(lambda: db.get_threads_page(None, args.page_size), args.repeat),
+        "get_threads_page_middle": timed(lambda: db.get_threads_page(deep_cursor, args.page_size), args.repeat),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
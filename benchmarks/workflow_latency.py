@@ -0,0 +1,98 @@
+"""End-to-end question latency: linear pipeline vs. fan-out/fan-in workflow.
+
+The linear baseline runs the same nodes one after another (rewrite, original
+retrieval, alternative retrieval, merge, answer), as the graph did before
+original-question retrieval was moved alongside the rewrite.
+
+    python -m benchmarks.workflow_latency --llm-latency 0.6 --questions 20
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import prepare_environment, synthetic_documents, summarize
+from benchmarks.fake_llm_server import start_in_background
+
+QUESTIONS = [
+    "What is the warranty period?",
+    "How do I reset the device after a firmware update?",
+    "Which error code means the sensor needs calibration?",
+    "What voltage does the power supply need?",
+]
+
+
+def build_linear_graph(vectorstore, k: int):
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.db.database import get_db
+    from src.graph.state import QAState
+    from src.graph.nodes import (
+        generate_alternative_queries,
+        make_load_docs,
+        make_load_alternative_docs,
+        merge_docs,
+        llm_answer,
+    )
+
+    workflow = StateGraph(QAState)
+    workflow.add_node("alternate_queries", generate_alternative_queries)
+    workflow.add_node("LOAD_DOCS", make_load_docs(vectorstore, k=k))
+    workflow.add_node("LOAD_ALT_DOCS", make_load_alternative_docs(vectorstore, k=k))
+    workflow.add_node("MERGE_DOCS", merge_docs)
+    workflow.add_node("LLM_ANSWER", llm_answer)
+    workflow.add_edge(START, "alternate_queries")
+    workflow.add_edge("alternate_queries", "LOAD_DOCS")
+    workflow.add_edge("LOAD_DOCS", "LOAD_ALT_DOCS")
+    workflow.add_edge("LOAD_ALT_DOCS", "MERGE_DOCS")
+    workflow.add_edge("MERGE_DOCS", "LLM_ANSWER")
+    workflow.add_edge("LLM_ANSWER", END)
+    # Same checkpointer as create_workflow, so only the topology differs
+    return workflow.compile(checkpointer=SqliteSaver(conn=get_db().get_langgraph_connection()))
+
+
+def time_questions(graph, n_questions: int, thread_prefix: str):
+    samples = []
+    for i in range(n_questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        graph.invoke({"question": question}, config={"configurable": {"thread_id": f"{thread_prefix}-{i}"}})
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.6, help="Fake LLM response latency in seconds")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    _, base_url = start_in_background(latency=args.llm_latency)
+    prepare_environment(base_url)
+
+    from src.splitter.semantic_chunker import split_pdf_into_chunks
+    from src.vector_store.faiss_store import create_vector_store
+    from src.graph.workflow import create_workflow
+
+    vectorstore = create_vector_store(split_pdf_into_chunks(synthetic_documents(args.pages)))
+    linear = build_linear_graph(vectorstore, args.k)
+    parallel = create_workflow(vectorstore, k=args.k)
+
+    # Warm up embeddings and HTTP connections before timing
+    time_questions(linear, 1, "warmup-linear")
+    time_questions(parallel, 1, "warmup-parallel")
+
+    linear_stats = summarize(time_questions(linear, args.questions, "linear"))
+    parallel_stats = summarize(time_questions(parallel, args.questions, "parallel"))
+    print(json.dumps({
+        "llm_latency_s": args.llm_latency,
+        "pages": args.pages,
+        "linear": linear_stats,
+        "fan_out": parallel_stats,
+        "mean_saved_ms": round(linear_stats["mean_ms"] - parallel_stats["mean_ms"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
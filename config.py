@@ -1,20 +1,121 @@
 import os
+import threading
 from dotenv import load_dotenv
-from langchain_huggingface import HuggingFaceEmbeddings
 
 load_dotenv()
 
-MAX_MESSAGES = 10  # Keep last 10 messages (≈5 Q&A pairs)
+THREADS_PAGE_SIZE = int(os.getenv("THREADS_PAGE_SIZE", "30"))  # Sidebar threads loaded per "Load more"
 
 # API Configuration
-api_key = os.getenv("HG_API_KEY")
-if not api_key:
-    raise RuntimeError("Missing HG_API_KEY in environment. Please set it in your .env file.")
+api_key = os.getenv("HG_API_KEY")  # Checked when the LLM client is first constructed
 
 OPENAI_BASE = os.getenv("OPENAI_BASE", "https://router.huggingface.co/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "deepseek-ai/DeepSeek-V3.1")
 
 # Embeddings Configuration
-emb = HuggingFaceEmbeddings(
-    model_name=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # Texts per forward pass
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # torch intra-op threads; 0 keeps torch's default
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", "1"))  # Encoder processes for bulk requests; 1 disables the pool
+EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", "512"))  # Smaller requests are encoded in-process
+
+_emb = None
+_emb_lock = threading.Lock()
+
+
+def get_embeddings():
+    """The embedding engine (src/vector_store/embedding_engine.py), created on first use;
+    its model loads, pulling in torch and sentence-transformers, on the first encode."""
+    global _emb
+    if _emb is None:
+        with _emb_lock:
+            if _emb is None:
+                from src.vector_store.embedding_engine import EmbeddingEngine
+                _emb = EmbeddingEngine(EMBEDDING_MODEL)
+    return _emb
+
+
+# Splitter Configuration
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+
+# Ingestion Configuration
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(min(8, os.cpu_count() or 1))))  # Parser processes; 1 disables
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "100"))  # Smaller PDFs are parsed in-process
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # Chunks embedded and indexed per batch
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))  # Items buffered between pipeline stages
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # PDFs indexed concurrently by the bulk ingest CLI
+
+# SQLite Configuration
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # Seconds a writer waits for the lock
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "32768"))  # Page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes of the file read via mmap
+
+# Chunk Storage Configuration
+CHUNK_COMPRESSION = os.getenv("CHUNK_COMPRESSION", "zstd")  # zstd | none; applies to newly stored chunks
+CHUNK_COMPRESSION_LEVEL = int(os.getenv("CHUNK_COMPRESSION_LEVEL", "3"))
+
+# Index Storage Configuration
+INDEX_DIR = os.getenv("INDEX_DIR", "data/indexes")  # One FAISS index per pdfs.content_hash
+
+# Vector Index Configuration
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")  # flat | hnsw | ivf | ivfpq
+FAISS_METRIC = os.getenv("FAISS_METRIC", "l2")  # l2 | ip (inner product over normalized vectors: cosine)
+FAISS_ANN_MIN_VECTORS = int(os.getenv("FAISS_ANN_MIN_VECTORS", "10000"))  # Smaller stores stay flat: exact and fast enough
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))  # Graph neighbours per vector
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))  # Higher: better recall, slower queries
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # Inverted lists; 0 picks 4 * sqrt(vectors)
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))  # Lists scanned per query
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))  # Sub-quantizers; must divide the embedding dimension
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))  # Bits per sub-quantizer code
+
+# Startup Configuration
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"  # Load models in the background when the app starts
+
+# Graph Registry Configuration
+GRAPH_REGISTRY_MAX_MB = float(os.getenv("GRAPH_REGISTRY_MAX_MB", "512"))  # Approximate index memory of graphs kept for reuse
+
+# Metrics Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # Per-node timings, token counts and per-request rows
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", "data/metrics.db")  # One row per answered question
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Serve Prometheus text on /metrics; 0 disables
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))  # ≈300MB of MiniLM vectors
+
+# Retrieval Configuration
+QUERY_REWRITE_TIMEOUT = float(os.getenv("QUERY_REWRITE_TIMEOUT", "4.0"))  # Seconds; answer without alternatives past this
+QUERY_REWRITE_WORKERS = int(os.getenv("QUERY_REWRITE_WORKERS", "16"))  # Rewrite calls in flight at once, across sessions
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "llm")  # llm | prf | keywords | none
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid (BM25 + vector) | vector
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Per-query depth of each ranking before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))  # Reciprocal rank fusion damping constant
+
+# Conversation History Configuration
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "50"))  # Most recent chat messages considered for each question
+HISTORY_SELECTION = os.getenv("HISTORY_SELECTION", "semantic")  # semantic | recent
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "10"))  # Chat messages sent with each question
+HISTORY_RECENT_MESSAGES = int(os.getenv("HISTORY_RECENT_MESSAGES", "4"))  # Latest messages always sent; the rest by relevance
+
+# Prompt Configuration
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))  # Input tokens per answer: context, history and question
+PROMPT_TRIM_MIN_TOKENS = int(os.getenv("PROMPT_TRIM_MIN_TOKENS", "64"))  # Smallest leftover worth filling with a trimmed chunk
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "cl100k_base")  # tiktoken encoding used to count tokens
+
+# Semantic Answer Cache Configuration
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.db")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))  # Cosine similarity for a hit
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+
+
+def __getattr__(name):
+    # `from config import emb` still works, loading the model at that point
+    if name == "emb":
+        return get_embeddings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
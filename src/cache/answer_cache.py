@@ -0,0 +1,249 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    get_embeddings,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Words that usually point back at earlier turns ("what about its battery?")
+_ANAPHORA = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|his|her|above|previous|"
+    r"earlier|before|again|also|else|same|instead|more|first one|last one)\b",
+    re.IGNORECASE,
+)
+
+
+def depends_on_history(question: str, prior_messages: List[Dict]) -> bool:
+    """Whether a question likely needs earlier turns to be understood; such answers are not cached."""
+    if not prior_messages:
+        return False
+    if len(question.split()) < 4:  # "why?", "and the second?"
+        return True
+    return bool(_ANAPHORA.search(question))
+
+
+class _PdfEntries:
+    """In-memory view of one PDF's cached answers: a normalized embedding matrix plus rows.
+    The matrix grows by doubling its capacity, so appends are amortized O(dim)."""
+
+    def __init__(self, dim: int):
+        self.ids: List[int] = []
+        self.answers: List[str] = []
+        self.latencies: List[float] = []
+        self.created_at: List[float] = []
+        self._buffer = np.empty((0, dim), dtype=np.float32)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._buffer[:len(self.ids)]
+
+    def append(self, entry_id: int, vector: np.ndarray, answer: str, latency: float, created_at: float):
+        n = len(self.ids)
+        if n == self._buffer.shape[0]:
+            grown = np.empty((max(8, 2 * n), self._buffer.shape[1]), dtype=np.float32)
+            grown[:n] = self._buffer
+            self._buffer = grown
+        self._buffer[n] = vector
+        self.ids.append(entry_id)
+        self.answers.append(answer)
+        self.latencies.append(latency)
+        self.created_at.append(created_at)
+
+    def remove(self, entry_ids: Set[int]):
+        """Drop the given entries, keeping the rest in order."""
+        keep = [i for i, entry_id in enumerate(self.ids) if entry_id not in entry_ids]
+        if len(keep) == len(self.ids):
+            return
+        self._buffer[:len(keep)] = self._buffer[keep]
+        self.ids = [self.ids[i] for i in keep]
+        self.answers = [self.answers[i] for i in keep]
+        self.latencies = [self.latencies[i] for i in keep]
+        self.created_at = [self.created_at[i] for i in keep]
+
+
+class SemanticAnswerCache:
+    """Answers keyed by question embedding, scoped per PDF.
+
+    A lookup is a hit when the cosine similarity to a stored question reaches the
+    threshold. Entries expire after ttl seconds and the least recently used are
+    evicted past max_entries. Rows persist in SQLite and are loaded per PDF on demand.
+    """
+
+    def __init__(
+        self,
+        db_path: str = ANSWER_CACHE_PATH,
+        embeddings: Optional[Embeddings] = None,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.db_path = db_path
+        self._embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[int, _PdfEntries] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "saved_seconds": 0.0, "lookup_seconds": 0.0}
+        self._initialized = False  # Table created on first use, not at import
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings if self._embeddings is not None else get_embeddings()
+
+    def init_database(self):
+        """Initialize the cache table"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pdf_id INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    answer TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_pdf ON answer_cache (pdf_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_last_used ON answer_cache (last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_created ON answer_cache (created_at)")
+            conn.commit()
+            self._initialized = True
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.init_database()
+        return sqlite3.connect(self.db_path)
+
+    def embed_question(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load_pdf(self, conn: sqlite3.Connection, pdf_id: int, dim: int) -> _PdfEntries:
+        entries = self._entries.get(pdf_id)
+        if entries is None:
+            entries = _PdfEntries(dim)
+            rows = conn.execute(
+                "SELECT id, embedding, answer, latency, created_at FROM answer_cache WHERE pdf_id = ? AND created_at > ? ORDER BY id",
+                (pdf_id, time.time() - self.ttl)
+            ).fetchall()
+            for entry_id, blob, answer, latency, created_at in rows:
+                entries.append(entry_id, np.frombuffer(blob, dtype=np.float32), answer, latency, created_at)
+            self._entries[pdf_id] = entries
+            logger.debug(f"Loaded {len(rows)} cached answers for PDF {pdf_id}")
+        return entries
+
+    def lookup(self, pdf_id: int, question: str, vector: Optional[np.ndarray] = None) -> Optional[str]:
+        """Return a cached answer for a similar question about the same PDF, or None."""
+        start = time.perf_counter()
+        vector = self.embed_question(question) if vector is None else vector
+        conn = self._connect()
+        try:
+            with self._lock:
+                entries = self._load_pdf(conn, pdf_id, vector.shape[0])
+                best = -1
+                if entries.ids:
+                    similarities = entries.matrix @ vector
+                    # Expired entries can never match
+                    similarities[np.asarray(entries.created_at) <= time.time() - self.ttl] = -1.0
+                    best = int(np.argmax(similarities))
+                    if similarities[best] < self.threshold:
+                        best = -1
+
+                if best < 0:
+                    self._stats["misses"] += 1
+                    self._stats["lookup_seconds"] += time.perf_counter() - start
+                    return None
+
+                entry_id, answer = entries.ids[best], entries.answers[best]
+                self._stats["hits"] += 1
+                self._stats["saved_seconds"] += entries.latencies[best]
+                self._stats["lookup_seconds"] += time.perf_counter() - start
+
+            conn.execute("UPDATE answer_cache SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+            conn.commit()
+            logger.info(f"Answer cache hit for PDF {pdf_id} (entry {entry_id})")
+            return answer
+        finally:
+            conn.close()
+
+    def store(self, pdf_id: int, question: str, answer: str, latency: float, vector: Optional[np.ndarray] = None):
+        """Cache the answer to a question about a PDF, evicting expired and least recently used entries."""
+        vector = self.embed_question(question) if vector is None else vector
+        now = time.time()
+        conn = self._connect()
+        try:
+            with self._lock:
+                entries = self._load_pdf(conn, pdf_id, vector.shape[0])
+                cursor = conn.execute(
+                    "INSERT INTO answer_cache (pdf_id, question, embedding, answer, latency, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (pdf_id, question, vector.astype(np.float32).tobytes(), answer, latency, now, now)
+                )
+                entries.append(cursor.lastrowid, vector, answer, latency, now)
+                self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        cutoff = now - self.ttl
+        victims = conn.execute("SELECT id, pdf_id FROM answer_cache WHERE created_at <= ?", (cutoff,)).fetchall()
+        overflow = conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] - len(victims) - self.max_entries
+        if overflow > 0:
+            victims += conn.execute(
+                "SELECT id, pdf_id FROM answer_cache WHERE created_at > ? ORDER BY last_used LIMIT ?", (cutoff, overflow)
+            ).fetchall()
+        if not victims:
+            return
+        conn.executemany("DELETE FROM answer_cache WHERE id = ?", [(entry_id,) for entry_id, _ in victims])
+        logger.debug(f"Evicted {len(victims)} cached answers")
+        # Only the affected PDFs' in-memory views change; the others stay loaded
+        by_pdf: Dict[int, Set[int]] = {}
+        for entry_id, pdf_id in victims:
+            by_pdf.setdefault(pdf_id, set()).add(entry_id)
+        for pdf_id, entry_ids in by_pdf.items():
+            entries = self._entries.get(pdf_id)
+            if entries is not None:
+                entries.remove(entry_ids)
+
+    def record_skip(self):
+        """Count a question that bypassed the cache because it depends on conversation history."""
+        with self._lock:
+            self._stats["skipped"] += 1
+
+    def stats(self) -> dict:
+        """Hit rate and latency saved since startup."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries_loaded"] = sum(len(entries.ids) for entries in self._entries.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Global answer cache instance
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Optional
+
+import aiosqlite
+import numpy as np
+
+from .connection import aconnect
+from .database import get_db, decode_chunk, embed_message, RECENT_MESSAGES_QUERY
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFileChatDB:
+    """Async accessors for the FileChat database used on the request path.
+
+    Reads share one long-lived aiosqlite connection, in autocommit mode, instead of
+    connecting per call. Writes go through _write, on a second connection: it holds an
+    explicit transaction and lets one coroutine write at a time, and it never carries
+    another coroutine's half-read statement, whose stale snapshot would make
+    BEGIN IMMEDIATE fail at once instead of waiting. The schema is owned and created
+    by FileChatDB.
+    """
+
+    def __init__(self, db_path: str = "chatbot.db"):
+        self.db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._write_conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        # Coroutines share the connection, so a transaction must not interleave with another's statements
+        self._write_lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            async with self._lock:
+                if self._conn is None:
+                    logger.info(f"Opening async database connection to {self.db_path}")
+                    self._conn = await aconnect(self.db_path, isolation_level=None)
+        return self._conn
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run statements in one write transaction, committed on success and rolled back on error."""
+        async with self._write_lock:
+            if self._write_conn is None:
+                self._write_conn = await aconnect(self.db_path, isolation_level=None)
+            conn = self._write_conn
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+
+    async def close(self):
+        """Close the shared connections"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        async with self._write_lock:
+            if self._write_conn is not None:
+                await self._write_conn.close()
+                self._write_conn = None
+
+    async def get_pdf_chunks(self, pdf_id: int) -> List[str]:
+        """Retrieve all chunks of a PDF, in order"""
+        conn = await self._connection()
+        async with conn.execute(
+            "SELECT text, compressed FROM chunks WHERE pdf_id = ? ORDER BY ordinal", (pdf_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [decode_chunk(text, compressed) for text, compressed in rows]
+
+    async def get_pdf_content_hash(self, pdf_id: int) -> Optional[str]:
+        """Get the content hash of a PDF, which keys its stored vector index"""
+        conn = await self._connection()
+        async with conn.execute("SELECT content_hash FROM pdfs WHERE id = ?", (pdf_id,)) as cursor:
+            result = await cursor.fetchone()
+        return result[0] if result else None
+
+    @timed("db.create_chat_thread")
+    async def create_chat_thread(self, thread_id: str, pdf_id: Optional[int] = None):
+        """Create a new chat thread or attach a PDF to an existing thread that has none."""
+        logger.info(f"Creating chat thread: {thread_id}")
+        try:
+            async with self._write() as conn:
+                await conn.execute(
+                    "INSERT OR IGNORE INTO chat_threads (id, pdf_id) VALUES (?, ?)", (thread_id, pdf_id)
+                )
+                if pdf_id is not None:
+                    await conn.execute(
+                        "UPDATE chat_threads SET pdf_id = ? WHERE id = ? AND pdf_id IS NULL", (pdf_id, thread_id)
+                    )
+        except Exception as e:
+            logger.error(f"Failed to create/update chat thread {thread_id}: {e}")
+            raise
+
+    @timed("db.add_message")
+    async def add_message(self, thread_id: str, role: str, content: str) -> Optional[np.ndarray]:
+        """Add a message to a chat thread, with its embedding for semantic history selection.
+        Returns that embedding (None if not embedded), for aask_question."""
+        embedding = await asyncio.to_thread(embed_message, content)
+        async with self._write() as conn:
+            await conn.execute(
+                "INSERT INTO chat_messages (thread_id, role, content, embedding) VALUES (?, ?, ?, ?)",
+                (thread_id, role, content, embedding.tobytes() if embedding is not None else None)
+            )
+        return embedding
+
+    async def get_chat_history(self, thread_id: str) -> List[Dict]:
+        """Get chat history for a thread"""
+        conn = await self._connection()
+        async with conn.execute(
+            "SELECT role, content, timestamp FROM chat_messages WHERE thread_id = ? ORDER BY id",
+            (thread_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [{"role": row[0], "content": row[1], "timestamp": row[2]} for row in rows]
+
+    @timed("db.get_recent_messages")
+    async def get_recent_messages(self, thread_id: str, limit: int) -> List[Dict]:
+        """Get the last `limit` messages of a thread, oldest first, with their stored embeddings"""
+        conn = await self._connection()
+        async with conn.execute(RECENT_MESSAGES_QUERY, (thread_id, limit)) as cursor:
+            rows = await cursor.fetchall()
+        return [{"role": row[0], "content": row[1], "timestamp": row[2], "embedding": row[3]} for row in rows]
+
+    async def get_thread_pdf_id(self, thread_id: str) -> Optional[int]:
+        """Get PDF ID associated with a thread"""
+        conn = await self._connection()
+        async with conn.execute("SELECT pdf_id FROM chat_threads WHERE id = ?", (thread_id,)) as cursor:
+            result = await cursor.fetchone()
+        return result[0] if result else None
+
+
+_async_db: Optional[AsyncFileChatDB] = None
+_async_db_lock = threading.Lock()
+
+
+def get_async_db() -> AsyncFileChatDB:
+    """The global async database instance, on the same file as the sync one, whose
+    schema is created first; the connection itself opens on first query."""
+    global _async_db
+    if _async_db is None:
+        with _async_db_lock:
+            if _async_db is None:
+                _async_db = AsyncFileChatDB(get_db().db_path)
+    return _async_db
+
+
+def __getattr__(name):
+    # `from src.db.async_database import async_db` still works
+    if name == "async_db":
+        return get_async_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,96 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import aiosqlite
+
+from config import SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def connection_pragmas() -> List[str]:
+    """Per-connection settings shared by every connection to the chat database.
+
+    WAL lets readers proceed while one writer commits; synchronous=NORMAL is
+    durable across application crashes in WAL mode and skips an fsync per commit.
+    """
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open a connection to db_path with the shared pragmas applied."""
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT, **kwargs)
+    for pragma in connection_pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+async def aconnect(db_path: str, **kwargs) -> aiosqlite.Connection:
+    """Async counterpart of connect."""
+    conn = await aiosqlite.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT, **kwargs)
+    for pragma in connection_pragmas():
+        await conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Long-lived SQLite connections, one per thread.
+
+    Connections run in autocommit mode; writes go through write(), which holds
+    an IMMEDIATE transaction so concurrent writers queue on the busy timeout
+    instead of failing with "database is locked" on a read-to-write upgrade.
+    Connections of threads that have exited (Streamlit runs each rerun in a new
+    thread) are closed when the next one is opened.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            logger.debug(f"Opening pooled connection to {self.db_path} for {threading.current_thread().name}")
+            conn = connect(self.db_path, isolation_level=None, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction, committed on success and rolled back on error."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close_all(self):
+        """Close every pooled connection; threads reconnect on their next call."""
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
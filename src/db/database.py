@@ -1,230 +1,499 @@
 import sqlite3
 import json
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import Iterable, List, Dict, Optional, Tuple
+
+import numpy as np
+import zstandard
+
+from .connection import ConnectionPool, connect
+from config import get_embeddings, CHUNK_COMPRESSION, CHUNK_COMPRESSION_LEVEL, HISTORY_SELECTION
+from src.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# PRAGMA user_version; 1 moved chunks from the pdfs.chunks JSON blob into the chunks table,
+# 2 added the trigger-maintained chat_threads.message_count, 3 added chat_messages.embedding,
+# 4 added pdfs.chunked
+SCHEMA_VERSION = 4
+
+# Newest `limit` messages of a thread via idx_chat_messages_thread (thread_id, id), returned oldest first
+RECENT_MESSAGES_QUERY = """
+    SELECT role, content, timestamp, embedding FROM (
+        SELECT id, role, content, timestamp, embedding FROM chat_messages
+        WHERE thread_id = ? ORDER BY id DESC LIMIT ?
+    ) ORDER BY id
+"""
+
+
+def encode_chunk(text: str) -> Tuple[object, int]:
+    """Chunk text as stored: (value, compressed flag)."""
+    if CHUNK_COMPRESSION == "zstd":
+        return zstandard.compress(text.encode("utf-8"), CHUNK_COMPRESSION_LEVEL), 1
+    return text, 0
+
+
+def decode_chunk(value, compressed: int) -> str:
+    return zstandard.decompress(value).decode("utf-8") if compressed else value
+
+
+def embed_message(content: str) -> Optional[np.ndarray]:
+    """A chat message's unit-norm float32 embedding, stored as its bytes; None when
+    history selection does not use embeddings or embedding fails."""
+    if HISTORY_SELECTION != "semantic" or not content:
+        return None
+    try:
+        vector = np.asarray(get_embeddings().embed_query(content), dtype=np.float32)
+    except Exception as e:
+        logger.warning(f"Failed to embed chat message, storing it without an embedding: {e}")
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embedding_matrix(blobs: List[Optional[bytes]], dim: Optional[int] = None) -> Optional[np.ndarray]:
+    """Stack stored message embeddings into one float32 matrix, with NaN rows for
+    messages that have none; None when no message has one. With dim (the question
+    vector's length), embeddings of another width, e.g. stored under an earlier
+    EMBEDDING_MODEL, count as missing; otherwise the first stored width is used."""
+    width = dim * 4 if dim is not None else next((len(blob) for blob in blobs if blob), None)
+    if not width or not any(blob and len(blob) == width for blob in blobs):
+        return None
+    missing = np.full(width // 4, np.nan, dtype=np.float32).tobytes()
+    joined = b"".join(blob if blob and len(blob) == width else missing for blob in blobs)
+    return np.frombuffer(joined, dtype=np.float32).reshape(len(blobs), -1)
+
 
 class FileChatDB:
     def __init__(self, db_path: str = "chatbot.db"):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
         self.init_database()
     
     def init_database(self):
         """Initialize database tables"""
         logger.info("Initializing database tables")
-        conn = sqlite3.connect(self.db_path)
         try:
-            logger.debug("Creating pdfs table")
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS pdfs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    filename TEXT NOT NULL,
-                    content_hash TEXT UNIQUE NOT NULL,
-                    chunks TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            with self.pool.write() as conn:
+                logger.debug("Creating pdfs table")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS pdfs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        filename TEXT NOT NULL,
+                        content_hash TEXT UNIQUE NOT NULL,
+                        chunks TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        chunked INTEGER NOT NULL DEFAULT 1
+                    )
+                """)
             
-            logger.debug("Creating chat_threads table")
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_threads (
-                    id TEXT PRIMARY KEY,
-                    pdf_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (pdf_id) REFERENCES pdfs (id)
-                )
-            """)
+                logger.debug("Creating chat_threads table")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chat_threads (
+                        id TEXT PRIMARY KEY,
+                        pdf_id INTEGER,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        message_count INTEGER NOT NULL DEFAULT 0,
+                        FOREIGN KEY (pdf_id) REFERENCES pdfs (id)
+                    )
+                """)
             
-            logger.debug("Creating chat_messages table")
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    thread_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (thread_id) REFERENCES chat_threads (id)
-                )
-            """)
-            conn.commit()
+                logger.debug("Creating chat_messages table")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chat_messages (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        thread_id TEXT NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        embedding BLOB,
+                        FOREIGN KEY (thread_id) REFERENCES chat_threads (id)
+                    )
+                """)
+
+                logger.debug("Creating chunks table")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chunks (
+                        pdf_id INTEGER NOT NULL,
+                        ordinal INTEGER NOT NULL,
+                        page INTEGER,
+                        text NOT NULL,
+                        compressed INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (pdf_id, ordinal),
+                        FOREIGN KEY (pdf_id) REFERENCES pdfs (id)
+                    ) WITHOUT ROWID
+                """)
+
+                logger.debug("Creating indexes")
+                # Per-thread message lookups in insertion order; created first so the count backfill uses it
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_thread ON chat_messages (thread_id, id)")
+                # Keyset pagination of the sidebar, newest first
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_threads_created ON chat_threads (created_at, id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_threads_pdf ON chat_threads (pdf_id)")
+
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version < 1:
+                    self._migrate_json_chunks(conn)
+                if version < 2:
+                    self._migrate_message_counts(conn)
+                if version < 3:
+                    self._migrate_message_embeddings(conn)
+                if version < 4:
+                    self._migrate_chunked_flag(conn)
+                if version < SCHEMA_VERSION:
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+                logger.debug("Creating triggers")
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS chat_messages_count_insert AFTER INSERT ON chat_messages
+                    BEGIN
+                        UPDATE chat_threads SET message_count = message_count + 1 WHERE id = NEW.thread_id;
+                    END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS chat_messages_count_delete AFTER DELETE ON chat_messages
+                    BEGIN
+                        UPDATE chat_threads SET message_count = message_count - 1 WHERE id = OLD.thread_id;
+                    END
+                """)
             logger.info("Database tables initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
-        finally:
-            conn.close()
     
-    def store_pdf(self, filename: str, content_hash: str, chunks: List[str]) -> int:
+    def _migrate_json_chunks(self, conn: sqlite3.Connection):
+        """Move chunks stored as one JSON blob per PDF into chunks rows, emptying the blobs.
+        The blobs hold one page per entry, not index chunks; _migrate_chunked_flag marks them so."""
+        rows = conn.execute("SELECT id, chunks FROM pdfs WHERE chunks != '[]'").fetchall()
+        for pdf_id, blob in rows:
+            self._insert_chunks(conn, pdf_id, json.loads(blob))
+        conn.execute("UPDATE pdfs SET chunks = '[]' WHERE chunks != '[]'")
+        if rows:
+            logger.info(f"Migrated chunks of {len(rows)} PDFs into the chunks table")
+
+    def _migrate_message_counts(self, conn: sqlite3.Connection):
+        """Add chat_threads.message_count to older databases and backfill it."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(chat_threads)")]
+        if "message_count" not in columns:
+            conn.execute("ALTER TABLE chat_threads ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        conn.execute("""
+            UPDATE chat_threads SET message_count = (
+                SELECT COUNT(*) FROM chat_messages WHERE chat_messages.thread_id = chat_threads.id
+            )
+        """)
+        logger.info("Backfilled chat thread message counts")
+
+    def _migrate_message_embeddings(self, conn: sqlite3.Connection):
+        """Add chat_messages.embedding to older databases; earlier messages keep none."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(chat_messages)")]
+        if "embedding" not in columns:
+            conn.execute("ALTER TABLE chat_messages ADD COLUMN embedding BLOB")
+
+    def _migrate_chunked_flag(self, conn: sqlite3.Connection):
+        """Add pdfs.chunked to older databases. PDFs migrated from the JSON blob (rows without
+        page numbers) hold whole pages and are marked 0 until their rows are replaced by chunks."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(pdfs)")]
+        if "chunked" not in columns:
+            conn.execute("ALTER TABLE pdfs ADD COLUMN chunked INTEGER NOT NULL DEFAULT 1")
+        conn.execute("""
+            UPDATE pdfs SET chunked = 0 WHERE NOT EXISTS (
+                SELECT 1 FROM chunks WHERE chunks.pdf_id = pdfs.id AND chunks.page IS NOT NULL
+            )
+        """)
+
+    def _insert_chunks(
+        self, conn: sqlite3.Connection, pdf_id: int, chunks: List[str], pages: Optional[List[Optional[int]]] = None
+    ):
+        pages = pages if pages is not None else [None] * len(chunks)
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunks (pdf_id, ordinal, page, text, compressed) VALUES (?, ?, ?, ?, ?)",
+            ((pdf_id, ordinal, page, *encode_chunk(text)) for ordinal, (text, page) in enumerate(zip(chunks, pages)))
+        )
+
+    def _replace_chunks(
+        self, conn: sqlite3.Connection, pdf_id: int, chunks: List[str], pages: Optional[List[Optional[int]]] = None
+    ):
+        conn.execute("DELETE FROM chunks WHERE pdf_id = ?", (pdf_id,))
+        self._insert_chunks(conn, pdf_id, chunks, pages)
+        conn.execute("UPDATE pdfs SET chunked = 1 WHERE id = ?", (pdf_id,))
+
+    @timed("db.store_pdf")
+    def store_pdf(
+        self,
+        filename: str,
+        content_hash: str,
+        chunks: List[str],
+        pages: Optional[List[Optional[int]]] = None,
+        replace_chunks: bool = False,
+    ) -> int:
         """Store PDF metadata and chunks, return PDF ID.
-        If PDF with same content already exists, return existing ID instead of overwriting."""
+        Chunk ordinals follow the list order, which matches the PDF's FAISS chunk ids;
+        pages optionally gives each chunk's page number.
+        If PDF with same content already exists, return existing ID instead of overwriting,
+        unless replace_chunks is set (its index was just re-split from the PDF)."""
         logger.info(f"Storing PDF: {filename}")
-        conn = sqlite3.connect(self.db_path)
         try:
-            # Check if PDF with same content hash already exists
-            existing_pdf = conn.execute("SELECT id FROM pdfs WHERE content_hash = ?", (content_hash,)).fetchone()
-            
-            if existing_pdf:
-                # PDF already exists, return existing ID (don't overwrite)
-                logger.debug(f"PDF already exists with ID: {existing_pdf[0]}")
-                return existing_pdf[0]
-            else:
+            with self.pool.write() as conn:
+                # Check if PDF with same content hash already exists
+                existing_pdf = conn.execute("SELECT id FROM pdfs WHERE content_hash = ?", (content_hash,)).fetchone()
+
+                if existing_pdf:
+                    if replace_chunks:
+                        # Ordinals must follow the rebuilt index's chunk ids
+                        logger.debug(f"Replacing chunks of existing PDF {existing_pdf[0]}")
+                        self._replace_chunks(conn, existing_pdf[0], chunks, pages)
+                    else:
+                        # PDF already exists, return existing ID (don't overwrite)
+                        logger.debug(f"PDF already exists with ID: {existing_pdf[0]}")
+                    return existing_pdf[0]
+
                 # New PDF, insert it
                 logger.debug("Storing new PDF")
                 cursor = conn.execute(
-                    "INSERT INTO pdfs (filename, content_hash, chunks) VALUES (?, ?, ?)",
-                    (filename, content_hash, json.dumps(chunks))
+                    "INSERT INTO pdfs (filename, content_hash, chunks) VALUES (?, ?, '[]')",
+                    (filename, content_hash)
                 )
-                conn.commit()
                 pdf_id = cursor.lastrowid
-                logger.info(f"PDF stored successfully with ID: {pdf_id}")
-                return pdf_id
+                self._insert_chunks(conn, pdf_id, chunks, pages)
+            logger.info(f"PDF stored successfully with ID: {pdf_id}")
+            return pdf_id
         except Exception as e:
             logger.error(f"Failed to store PDF {filename}: {e}")
             raise
-        finally:
-            conn.close()
     
+    def replace_pdf_chunks(self, pdf_id: int, chunks: List[str], pages: Optional[List[Optional[int]]] = None):
+        """Replace all chunks of a PDF, e.g. after its stored pages were split into chunks"""
+        with self.pool.write() as conn:
+            self._replace_chunks(conn, pdf_id, chunks, pages)
+        logger.info(f"Replaced chunks of PDF {pdf_id} with {len(chunks)} chunks")
+
     def get_pdf_chunks(self, pdf_id: int) -> List[str]:
-        """Retrieve PDF chunks by ID"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            result = conn.execute("SELECT chunks FROM pdfs WHERE id = ?", (pdf_id,)).fetchone()
-            return json.loads(result[0]) if result else []
-        finally:
-            conn.close()
-    
+        """Retrieve all chunks of a PDF, in order"""
+        return self.get_chunk_range(pdf_id, 0)
+
+    def get_pdf_chunk_rows(self, pdf_id: int) -> List[Tuple[str, Optional[int]]]:
+        """Retrieve all chunks of a PDF with their page numbers, in order"""
+        conn = self.pool.connection()
+        cursor = conn.execute(
+            "SELECT text, compressed, page FROM chunks WHERE pdf_id = ? ORDER BY ordinal", (pdf_id,)
+        )
+        return [(decode_chunk(text, compressed), page) for text, compressed, page in cursor]
+
+    def is_pdf_chunked(self, pdf_id: int) -> bool:
+        """Whether a PDF's rows are index chunks; PDFs stored before chunking hold one page per row"""
+        conn = self.pool.connection()
+        result = conn.execute("SELECT chunked FROM pdfs WHERE id = ?", (pdf_id,)).fetchone()
+        return bool(result[0]) if result else True
+
+    def get_chunk(self, pdf_id: int, ordinal: int) -> Optional[str]:
+        """Retrieve a single chunk of a PDF"""
+        conn = self.pool.connection()
+        result = conn.execute(
+            "SELECT text, compressed FROM chunks WHERE pdf_id = ? AND ordinal = ?", (pdf_id, ordinal)
+        ).fetchone()
+        return decode_chunk(*result) if result else None
+
+    def get_chunk_range(self, pdf_id: int, start: int, end: Optional[int] = None) -> List[str]:
+        """Retrieve chunks [start, end) of a PDF, in order; end=None reads to the last chunk"""
+        conn = self.pool.connection()
+        cursor = conn.execute(
+            "SELECT text, compressed FROM chunks WHERE pdf_id = ? AND ordinal >= ? AND ordinal < ? ORDER BY ordinal",
+            (pdf_id, start, end if end is not None else 2 ** 62)
+        )
+        return [decode_chunk(text, compressed) for text, compressed in cursor]
+
+    @timed("db.get_chunks_by_ordinals")
+    def get_chunks_by_ordinals(self, pdf_id: int, ordinals: Iterable[int]) -> Dict[int, str]:
+        """Retrieve chunks by ordinal (FAISS chunk id); missing ordinals are left out"""
+        ordinals = [int(ordinal) for ordinal in ordinals]
+        if not ordinals:
+            return {}
+        conn = self.pool.connection()
+        placeholders = ", ".join("?" * len(ordinals))
+        cursor = conn.execute(
+            f"SELECT ordinal, text, compressed FROM chunks WHERE pdf_id = ? AND ordinal IN ({placeholders})",
+            (pdf_id, *ordinals)
+        )
+        return {ordinal: decode_chunk(text, compressed) for ordinal, text, compressed in cursor}
+
+    def get_pdf_content_hash(self, pdf_id: int) -> Optional[str]:
+        """Get the content hash of a PDF, which keys its stored vector index"""
+        conn = self.pool.connection()
+        result = conn.execute("SELECT content_hash FROM pdfs WHERE id = ?", (pdf_id,)).fetchone()
+        return result[0] if result else None
+
+    def get_pdf_id_by_content_hash(self, content_hash: str) -> Optional[int]:
+        """Get the ID of an already stored PDF by its content hash"""
+        conn = self.pool.connection()
+        result = conn.execute("SELECT id FROM pdfs WHERE content_hash = ?", (content_hash,)).fetchone()
+        return result[0] if result else None
+
+    @timed("db.create_chat_thread")
     def create_chat_thread(self, thread_id: str, pdf_id: Optional[int] = None):
         """Create a new chat thread or update existing one with PDF.
         If thread already has a PDF, don't overwrite it unless explicitly requested."""
         logger.info(f"Creating chat thread: {thread_id}")
-        conn = sqlite3.connect(self.db_path)
         try:
-            existing = conn.execute("SELECT id, pdf_id FROM chat_threads WHERE id = ?", (thread_id,)).fetchone()
-            
-            if existing:
-                logger.debug(f"Thread {thread_id} already exists")
-                existing_pdf_id = existing[1]
-                if pdf_id is not None and existing_pdf_id is None:
-                    # Thread exists but has no PDF, add the PDF
-                    logger.debug(f"Associating PDF {pdf_id} with existing thread {thread_id}")
-                    conn.execute("UPDATE chat_threads SET pdf_id = ? WHERE id = ?", (pdf_id, thread_id))
-                # If thread already has a PDF, don't overwrite it (preserve existing connection)
-            else:
-                # Create new thread
-                logger.debug(f"Creating new thread {thread_id}")
-                conn.execute("INSERT INTO chat_threads (id, pdf_id) VALUES (?, ?)", (thread_id, pdf_id))
-            
-            conn.commit()
+            with self.pool.write() as conn:
+                existing = conn.execute("SELECT id, pdf_id FROM chat_threads WHERE id = ?", (thread_id,)).fetchone()
+
+                if existing:
+                    logger.debug(f"Thread {thread_id} already exists")
+                    existing_pdf_id = existing[1]
+                    if pdf_id is not None and existing_pdf_id is None:
+                        # Thread exists but has no PDF, add the PDF
+                        logger.debug(f"Associating PDF {pdf_id} with existing thread {thread_id}")
+                        conn.execute("UPDATE chat_threads SET pdf_id = ? WHERE id = ?", (pdf_id, thread_id))
+                    # If thread already has a PDF, don't overwrite it (preserve existing connection)
+                else:
+                    # Create new thread
+                    logger.debug(f"Creating new thread {thread_id}")
+                    conn.execute("INSERT INTO chat_threads (id, pdf_id) VALUES (?, ?)", (thread_id, pdf_id))
+
             logger.info(f"Chat thread {thread_id} processed successfully")
         except Exception as e:
             logger.error(f"Failed to create/update chat thread {thread_id}: {e}")
             raise
-        finally:
-            conn.close()
     
-    def add_message(self, thread_id: str, role: str, content: str):
-        """Add a message to a chat thread"""
-        conn = sqlite3.connect(self.db_path)
-        try:
+    @timed("db.add_message")
+    def add_message(self, thread_id: str, role: str, content: str) -> Optional[np.ndarray]:
+        """Add a message to a chat thread, with its embedding for semantic history selection.
+        Returns that embedding (None if not embedded); pass a question's to ask_question
+        so it is not embedded again."""
+        embedding = embed_message(content)
+        with self.pool.write() as conn:
             conn.execute(
-                "INSERT INTO chat_messages (thread_id, role, content) VALUES (?, ?, ?)",
-                (thread_id, role, content)
+                "INSERT INTO chat_messages (thread_id, role, content, embedding) VALUES (?, ?, ?, ?)",
+                (thread_id, role, content, embedding.tobytes() if embedding is not None else None)
             )
-            conn.commit()
-        finally:
-            conn.close()
+        return embedding
     
     def get_chat_history(self, thread_id: str) -> List[Dict]:
         """Get chat history for a thread"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.execute(
-                "SELECT role, content, timestamp FROM chat_messages WHERE thread_id = ? ORDER BY timestamp",
-                (thread_id,)
-            )
-            return [
-                {"role": row[0], "content": row[1], "timestamp": row[2]}
-                for row in cursor.fetchall()
-            ]
-        finally:
-            conn.close()
+        conn = self.pool.connection()
+        cursor = conn.execute(
+            "SELECT role, content, timestamp FROM chat_messages WHERE thread_id = ? ORDER BY id",
+            (thread_id,)
+        )
+        return [
+            {"role": row[0], "content": row[1], "timestamp": row[2]}
+            for row in cursor.fetchall()
+        ]
+
+    @timed("db.get_recent_messages")
+    def get_recent_messages(self, thread_id: str, limit: int) -> List[Dict]:
+        """Get the last `limit` messages of a thread, oldest first, with their stored embeddings"""
+        conn = self.pool.connection()
+        cursor = conn.execute(RECENT_MESSAGES_QUERY, (thread_id, limit))
+        return [
+            {"role": row[0], "content": row[1], "timestamp": row[2], "embedding": row[3]}
+            for row in cursor.fetchall()
+        ]
     
     def get_all_threads(self) -> List[Dict]:
         """Get all chat threads with PDF info"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.execute("""
-                SELECT t.id, t.created_at, p.filename, 
-                       (SELECT COUNT(*) FROM chat_messages WHERE thread_id = t.id) as message_count
-                FROM chat_threads t
-                LEFT JOIN pdfs p ON t.pdf_id = p.id
-                ORDER BY t.created_at DESC
-            """)
-            return [
-                {
-                    "id": row[0],
-                    "created_at": row[1],
-                    "pdf_name": row[2] or "No PDF",
-                    "message_count": row[3]
-                }
-                for row in cursor.fetchall()
-            ]
-        finally:
-            conn.close()
+        conn = self.pool.connection()
+        cursor = conn.execute("""
+            SELECT t.id, t.created_at, p.filename, t.message_count
+            FROM chat_threads t
+            LEFT JOIN pdfs p ON t.pdf_id = p.id
+            ORDER BY t.created_at DESC, t.id DESC
+        """)
+        return [self._thread_row(row) for row in cursor.fetchall()]
+
+    @timed("db.get_threads_page")
+    def get_threads_page(
+        self, cursor: Optional[Tuple[str, str]] = None, limit: int = 50
+    ) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """Get one page of chat threads, newest first, with PDF info.
+        Pass the returned cursor to get the next page; it is None after the last page.
+        Keyset pagination: each page is an index range scan, however deep."""
+        conn = self.pool.connection()
+        query = """
+            SELECT t.id, t.created_at, p.filename, t.message_count
+            FROM chat_threads t
+            LEFT JOIN pdfs p ON t.pdf_id = p.id
+            {where}
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT ?
+        """
+        if cursor is None:
+            rows = conn.execute(query.format(where=""), (limit + 1,)).fetchall()
+        else:
+            rows = conn.execute(
+                query.format(where="WHERE (t.created_at, t.id) < (?, ?)"), (*cursor, limit + 1)
+            ).fetchall()
+        threads = [self._thread_row(row) for row in rows[:limit]]
+        next_cursor = (threads[-1]["created_at"], threads[-1]["id"]) if len(rows) > limit else None
+        return threads, next_cursor
+
+    @staticmethod
+    def _thread_row(row) -> Dict:
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "pdf_name": row[2] or "No PDF",
+            "message_count": row[3]
+        }
     
     def get_thread_pdf_id(self, thread_id: str) -> Optional[int]:
         """Get PDF ID associated with a thread"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            result = conn.execute("SELECT pdf_id FROM chat_threads WHERE id = ?", (thread_id,)).fetchone()
-            return result[0] if result else None
-        finally:
-            conn.close()
+        conn = self.pool.connection()
+        result = conn.execute("SELECT pdf_id FROM chat_threads WHERE id = ?", (thread_id,)).fetchone()
+        return result[0] if result else None
     
     def get_pdf_threads(self, pdf_id: int) -> List[Dict]:
         """Get all threads that are linked to a specific PDF"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.execute("""
-                SELECT t.id, t.created_at, 
-                       (SELECT COUNT(*) FROM chat_messages WHERE thread_id = t.id) as message_count
-                FROM chat_threads t
-                WHERE t.pdf_id = ?
-                ORDER BY t.created_at DESC
-            """, (pdf_id,))
-            return [
-                {
-                    "thread_id": row[0],
-                    "created_at": row[1],
-                    "message_count": row[2]
-                }
-                for row in cursor.fetchall()
-            ]
-        finally:
-            conn.close()
+        conn = self.pool.connection()
+        cursor = conn.execute("""
+            SELECT t.id, t.created_at, t.message_count
+            FROM chat_threads t
+            WHERE t.pdf_id = ?
+            ORDER BY t.created_at DESC
+        """, (pdf_id,))
+        return [
+            {
+                "thread_id": row[0],
+                "created_at": row[1],
+                "message_count": row[2]
+            }
+            for row in cursor.fetchall()
+        ]
     
     def cleanup_empty_threads(self):
         """Remove threads that have no messages and no PDF content"""
-        conn = sqlite3.connect(self.db_path)
-        try:
+        with self.pool.write() as conn:
             # Delete threads with no messages and no PDF
-            conn.execute("""
-                DELETE FROM chat_threads 
-                WHERE id NOT IN (
-                    SELECT DISTINCT thread_id FROM chat_messages
-                ) 
-                AND pdf_id IS NULL
-            """)
-            conn.commit()
-        finally:
-            conn.close()
+            conn.execute("DELETE FROM chat_threads WHERE message_count = 0 AND pdf_id IS NULL")
     
-    def get_langgraph_connection(self):
-        """Get SQLite connection for LangGraph checkpointer"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+    def get_langgraph_connection(self) -> sqlite3.Connection:
+        """Get SQLite connection for LangGraph checkpointer.
+        It gets the pool's WAL and busy-timeout settings, so checkpoint writes queue
+        behind chat writes instead of failing with "database is locked"."""
+        return connect(self.db_path, check_same_thread=False)
+
+    def close(self):
+        """Close pooled connections"""
+        self.pool.close_all()
+
+
+_db: Optional[FileChatDB] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> FileChatDB:
+    """The global database instance, created (tables and migrations included) on first use."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = FileChatDB()
+    return _db
 
 
-# Global database instance
-db = FileChatDB() 
\ No newline at end of file
+def __getattr__(name):
+    # `from src.db.database import db` still works, creating the database at that point
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
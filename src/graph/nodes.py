@@ -1,98 +1,192 @@
+import asyncio
 import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+
+import numpy as np
 from .state import QAState
-from src.llm.llm import llm
+from src.llm.llm import get_llm
+from src.llm.prompt_packer import message_tokens, pack_prompt
+from config import (
+    HISTORY_MAX_MESSAGES, HISTORY_RECENT_MESSAGES, PROMPT_TOKEN_BUDGET, QUERY_REWRITE_TIMEOUT, QUERY_REWRITE_WORKERS,
+)
 from src.utils.text_cleaner import clean_text
+from src.vector_store.faiss_store import batch_similarity_search
+from src.retrieval.hybrid import hybrid_search
+from src.retrieval.query_expansion import expand_query
+from src.utils.metrics import record_error, record_llm_usage
+from langchain_core.documents import Document
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 logger = logging.getLogger(__name__)
 
+# Returned when the answer LLM call fails; never worth caching
+LLM_ERROR_ANSWER = "I'm sorry, I couldn't generate an answer due to an internal error."
+
+# Rewrite calls run here so they can be abandoned once QUERY_REWRITE_TIMEOUT has passed
+_rewrite_executor = ThreadPoolExecutor(max_workers=QUERY_REWRITE_WORKERS, thread_name_prefix="query-rewrite")
+
+
+def merge_hits(hit_lists):
+    """Merge hit dicts from several queries, deduplicating by chunk id and keeping
+    each chunk's best score. Returns hits sorted by descending relevance."""
+    best = {}
+    for hits in hit_lists:
+        for hit in hits:
+            if hit["id"] not in best or hit["score"] > best[hit["id"]]["score"]:
+                best[hit["id"]] = hit
+    return sorted(best.values(), key=lambda hit: hit["score"], reverse=True)
+
+
+def _retrieve(vectorstore, queries, k: int, lexical_index=None):
+    """Run one batched search for the queries and return merged hit dicts.
+    With a lexical index, dense and BM25 rankings are fused (hybrid retrieval)."""
+    try:
+        if lexical_index is not None:
+            results = hybrid_search(vectorstore, lexical_index, queries, k=k)
+        else:
+            results = batch_similarity_search(vectorstore, queries, k=k)
+    except Exception as exc:
+        logger.exception("Vector store retrieval failed for queries %s: %s", queries, exc)
+        record_error(exc)
+        return []
+    # A docstore answers a missing id with an error string, e.g. once a PDF leaves the corpus
+    return merge_hits(
+        [
+            {"id": chunk_id, "score": score, "content": doc.page_content, "tokens": doc.metadata.get("tokens")}
+            for chunk_id, doc, score in hits
+            if isinstance(doc, Document)
+        ]
+        for hits in results
+    )
+
 
-def make_load_docs(vectorstore, k: int = 4):
-    """Factory to create a load_docs node that uses a captured vectorstore,
-    retrieving docs for both the main query and its alternatives.
+def make_load_docs(vectorstore, k: int = 4, lexical_index=None):
+    """Factory to create a load_docs node that retrieves docs for the original question.
+    It needs nothing from the query rewriter, so it runs alongside it.
     """
     def load_docs(state: QAState):
-        logger.info("Loading documents for query retrieval")
+        logger.info("Loading documents for the original question")
         query = state.get("question") or ""
-        alternatives = state.get("alternative_queries", [])
-        logger.debug(f"Main query: {query}, Alternative queries: {alternatives}")
-
-        if not query and not alternatives:
-            logger.warning("No question or alternatives found in state; skipping retrieval.")
-            return {"retrieved": [], "question": query, "alternative_queries": alternatives}
-
-        retrieved_docs = []
-
-        def _search(q: str):
-            try:
-                return vectorstore.similarity_search(q, k=k)
-            except Exception as exc:
-                logger.exception("Vector store retrieval failed for query '%s': %s", q, exc)
-                return []
-
-        # Search for main query
-        if query:
-            retrieved_docs.extend(_search(query))
-
-        # Search for alternative queries
-        for alt in alternatives:
-            retrieved_docs.extend(_search(alt))
-
-        # Deduplicate while preserving order
-        seen = set()
-        unique_docs = []
-        for r in retrieved_docs:
-            if r.page_content not in seen:
-                seen.add(r.page_content)
-                unique_docs.append(r.page_content)
-
-        return {
-            "retrieved": unique_docs,
-            "question": query
-        }
+        if not query:
+            logger.warning("No question found in state; skipping retrieval.")
+            return {"question_hits": []}
+
+        hits = _retrieve(vectorstore, [query], k, lexical_index)
+        logger.debug(f"Retrieved {len(hits)} chunks for the original question")
+        return {"question_hits": hits}
 
     return load_docs
 
 
+def make_load_alternative_docs(vectorstore, k: int = 4, lexical_index=None):
+    """Factory to create a node that retrieves docs for all alternative queries
+    in one batched search.
+    """
+    def load_alternative_docs(state: QAState):
+        alternatives = state.get("alternative_queries") or []
+        if not alternatives:
+            logger.info("No alternative queries; answering from the original question's documents")
+            return {"alternative_hits": []}
+
+        logger.info(f"Loading documents for {len(alternatives)} alternative queries")
+        hits = _retrieve(vectorstore, alternatives, k, lexical_index)
+        logger.debug(f"Retrieved {len(hits)} unique chunks for alternative queries")
+        return {"alternative_hits": hits}
+
+    return load_alternative_docs
 
-def select_relevant_context(question: str, messages: list, max_messages: int = 5):
-    """Smartly select only relevant conversation context instead of entire history."""
+
+def run_in_thread(node):
+    """Async form of a CPU-bound sync node (embedding + FAISS search) that keeps
+    it off the event loop."""
+    async def anode(state: QAState):
+        return await asyncio.to_thread(node, state)
+    return anode
+
+
+def merge_docs(state: QAState):
+    """Join original-question and alternative-query hits, keeping each chunk's best score."""
+    question_hits = state.get("question_hits") or []
+    alternative_hits = state.get("alternative_hits") or []
+    hits = merge_hits([question_hits, alternative_hits])
+    logger.debug(f"Merged {len(question_hits)} + {len(alternative_hits)} hits into {len(hits)} unique chunks")
+    return {"retrieved": [hit["content"] for hit in hits], "hits": hits}
+
+
+def select_relevant_context(
+    question: str,
+    messages: list,
+    max_messages: int = 5,
+    embeddings: Optional[np.ndarray] = None,
+    question_embedding: Optional[np.ndarray] = None,
+    recent: int = HISTORY_RECENT_MESSAGES,
+):
+    """Select the conversation context sent with a question, in chronological order.
+
+    The latest `recent` messages are always kept for continuity. Given unit-norm
+    message embeddings (one row per message, NaN where missing) and the question's,
+    the remaining slots go to the earlier turns most similar to the question, a
+    turn being a user message and the replies that follow it. Without embeddings
+    the latest max_messages are kept.
+    """
+    return score_relevant_context(question, messages, max_messages, embeddings, question_embedding, recent)[0]
+
+
+def score_relevant_context(
+    question: str,
+    messages: list,
+    max_messages: int = 5,
+    embeddings: Optional[np.ndarray] = None,
+    question_embedding: Optional[np.ndarray] = None,
+    recent: int = HISTORY_RECENT_MESSAGES,
+) -> Tuple[list, List[Optional[float]]]:
+    """select_relevant_context, plus each selected message's score: its turn's similarity
+    to the question for earlier turns chosen by relevance, None for the rest."""
     if not messages or len(messages) <= max_messages:
-        return messages
-    
-    # STRATEGY 1: Recent context (current implementation)
-    # Return last N messages for immediate conversation continuity
-    recent_messages = messages[-max_messages:]
-    
-    # TODO: STRATEGY 2: Semantic relevance (future enhancement)
-    # Could use embeddings to find most semantically relevant messages
-    # This would be more intelligent than just recent messages
-    
-    # TODO: STRATEGY 3: Topic-based clustering
-    # Group messages by topic and select relevant topic clusters
-    
-    return recent_messages
+        return messages, [None] * len(messages)
+    if embeddings is None or question_embedding is None:
+        return messages[-max_messages:], [None] * max_messages
 
+    recent = min(recent, max_messages)
+    split = len(messages) - recent
+    earlier = messages[:split]
+    # A turn scores as its best message; messages without an embedding never win
+    scores = np.nan_to_num(embeddings[:split] @ question_embedding, nan=-np.inf)
+    turns = np.cumsum([isinstance(message, HumanMessage) for message in earlier])
+    turn_scores = np.full(turns[-1] + 1, -np.inf, dtype=np.float32)
+    np.maximum.at(turn_scores, turns, scores)
+    # Whole turns, best first, while they fit in the remaining slots
+    ranked = np.argsort(-turn_scores, kind="stable")
+    ranked = ranked[np.isfinite(turn_scores[ranked])]
+    sizes = np.bincount(turns, minlength=len(turn_scores))[ranked]
+    chosen = ranked[np.cumsum(sizes) <= max_messages - recent]
+    keep = np.isin(turns, chosen)
+    logger.debug(f"Selected {int(keep.sum())} relevant and {recent} recent of {len(messages)} messages")
+    selected = [message for message, kept in zip(earlier, keep) if kept] + messages[split:]
+    selected_scores = [float(turn_scores[turn]) for turn, kept in zip(turns, keep) if kept] + [None] * recent
+    return selected, selected_scores
 
-def llm_answer(state: QAState):
-    """Answer the question using the LLM with smart conversation context selection."""
-    logger.info("Generating answer using LLM")
+
+def _answer_messages(state: QAState):
+    """Build the answer prompt, or return None when there is no question."""
     retrieved = state.get("retrieved") or []
     question = state.get("question") or ""
     messages = state.get("messages", [])  # Get existing conversation history
     logger.debug(f"Retrieved {len(retrieved)} documents, {len(messages)} conversation messages")
 
     if not question:
-        logger.warning("No question provided to LLM")
-        return {"answer": "No question provided."}
+        return None
 
     # SMART CONTEXT SELECTION: Only send relevant conversation history
-    relevant_messages = select_relevant_context(question, messages, max_messages=20)
-    
-    # Build conversation context with limited history
-    conversation_messages = []
+    relevant_messages = select_relevant_context(question, messages, max_messages=HISTORY_MAX_MESSAGES)
+    # Similarities from the selection made before the graph ran, one per message
+    history_scores = state.get("history_scores")
+    if history_scores is not None and len(history_scores) != len(relevant_messages):
+        history_scores = None
     
-    # Add system message
     system_message = SystemMessage(
         content=(
             "You are a helpful assistant. Use the provided context if relevant. "
@@ -100,44 +194,72 @@ def llm_answer(state: QAState):
             "Be concise. You can reference recent conversation context when relevant."
         )
     )
-    conversation_messages.append(system_message)
-    
-    # Add only relevant conversation history (not entire chat)
-    if relevant_messages:
-        conversation_messages.extend(relevant_messages)
-    
-    # Add current question with retrieved context
-    context_str = "\n\n".join(retrieved[:10]) if retrieved else "No relevant context found."
-    
-    human_message = HumanMessage(
-        content=(
-            f"Context:\n{context_str}\n\n"
-            f"Question: {question}\n\n"
-            "Answer concisely."
+
+    def human_message(context_str: str) -> HumanMessage:
+        return HumanMessage(
+            content=(
+                f"Context:\n{context_str}\n\n"
+                f"Question: {question}\n\n"
+                "Answer concisely."
+            )
         )
+
+    # TOKEN BUDGET: retrieved chunks and history compete for what the fixed parts leave
+    hits = state.get("hits") or [{"content": text, "score": 0.0} for text in retrieved]
+    reserved = message_tokens(system_message.content) + message_tokens(human_message("").content)
+    packed = pack_prompt(hits, relevant_messages, reserved_tokens=reserved, history_scores=history_scores)
+    logger.info(
+        f"Packed prompt: {packed.tokens} tokens of {PROMPT_TOKEN_BUDGET} "
+        f"({len(packed.chunks)}/{len(hits)} chunks, {len(packed.history)}/{len(relevant_messages)} history messages, "
+        f"{packed.trimmed} trimmed)"
     )
-    conversation_messages.append(human_message)
+
+    context_str = "\n\n".join(packed.chunks) if packed.chunks else "No relevant context found."
+    return [system_message, *packed.history, human_message(context_str)]
+
+
+def llm_answer(state: QAState):
+    """Answer the question using the LLM with smart conversation context selection."""
+    logger.info("Generating answer using LLM")
+    conversation_messages = _answer_messages(state)
+    if conversation_messages is None:
+        logger.warning("No question provided to LLM")
+        return {"answer": "No question provided."}
 
     try:
-        response = llm.invoke(conversation_messages)
+        response = get_llm().invoke(conversation_messages)
+        record_llm_usage(response)
         content = getattr(response, "content", str(response))
     except Exception as exc:
         logger.exception("LLM invocation failed: %s", exc)
-        content = "I'm sorry, I couldn't generate an answer due to an internal error."
+        record_error(exc)
+        content = LLM_ERROR_ANSWER
 
     return {"answer": clean_text(content)}
 
 
-def generate_alternative_queries(state: QAState):
-    """Generate alternative queries to improve document retrieval."""
-    logger.info("Generating alternative queries")
-    question = state.get("question") or ""
-    logger.debug(f"Original question: {question}")
-    if not question:
-        logger.warning("No question provided for alternative query generation")
-        return {"alternative_queries": []}
+async def allm_answer(state: QAState):
+    """Async counterpart of llm_answer."""
+    logger.info("Generating answer using LLM (async)")
+    conversation_messages = _answer_messages(state)
+    if conversation_messages is None:
+        logger.warning("No question provided to LLM")
+        return {"answer": "No question provided."}
+
+    try:
+        response = await get_llm().ainvoke(conversation_messages)
+        record_llm_usage(response)
+        content = getattr(response, "content", str(response))
+    except Exception as exc:
+        logger.exception("LLM invocation failed: %s", exc)
+        record_error(exc)
+        content = LLM_ERROR_ANSWER
+
+    return {"answer": clean_text(content)}
 
-    messages = [
+
+def _rewrite_messages(question: str):
+    return [
         SystemMessage(
             content=(
                 "You are an expert query reformulator. Given a user's question, "
@@ -153,16 +275,118 @@ def generate_alternative_queries(state: QAState):
         ),
     ]
 
+
+# List markers the model likes to add: "1.", "2)", "-", "*", "Query 1:"
+_LIST_MARKER = re.compile(r"^\s*(?:[-*\u2022]+|\d+[.)]|(?:alternative\s+)?query\s*\d*\s*:)\s*", re.IGNORECASE)
+
+
+def _parse_alternatives(response, question: str = "") -> list:
+    content = getattr(response, "content", str(response))
+    alternatives = []
+    seen = {question.strip().lower()}
+    # One query per line, without list markers, emphasis, quotes or headings
+    for line in content.split('\n'):
+        query = clean_text(_LIST_MARKER.sub("", line).strip().strip("*_`\"'"))
+        if not query or query.endswith(":") or query.lower() in seen:
+            continue
+        seen.add(query.lower())
+        alternatives.append(query)
+    # Limit to 3 alternatives
+    return alternatives[:3]
+
+
+def _invoke_rewrite(messages):
+    """Run the rewrite call on the rewrite pool and return its response.
+
+    QUERY_REWRITE_TIMEOUT bounds the wait for a free worker and, from the moment the
+    call starts, the call itself, so queueing behind other sessions' calls does not eat
+    into its time. Past either deadline FutureTimeoutError is raised; a call still
+    queued is cancelled, one already running finishes on its worker unobserved.
+    """
+    timeout = QUERY_REWRITE_TIMEOUT or None
+    started = threading.Event()
+
+    def call():
+        started.set()
+        return get_llm().invoke(messages)
+
+    future = _rewrite_executor.submit(call)
     try:
-        response = llm.invoke(messages)
-        content = getattr(response, "content", str(response))
-        # Split response into separate queries
-        alternatives = [clean_text(q) for q in content.split('\n') if q.strip()]
-        # Limit to 3 alternatives
-        alternatives = alternatives[:3]
+        if not started.wait(timeout):
+            raise FutureTimeoutError()
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+
+def generate_alternative_queries(state: QAState):
+    """Generate alternative queries to improve document retrieval."""
+    logger.info("Generating alternative queries")
+    question = state.get("question") or ""
+    logger.debug(f"Original question: {question}")
+    if not question:
+        logger.warning("No question provided for alternative query generation")
+        return {"alternative_queries": []}
+
+    try:
+        response = _invoke_rewrite(_rewrite_messages(question))
+        record_llm_usage(response)
+        alternatives = _parse_alternatives(response, question)
+    except FutureTimeoutError as exc:
+        logger.warning(f"Alternative query generation exceeded {QUERY_REWRITE_TIMEOUT}s; using the original question only")
+        record_error(exc)
+        alternatives = []
+    except Exception as exc:
+        logger.exception("LLM invocation for alternative queries failed: %s", exc)
+        record_error(exc)
+        alternatives = []
+
+    logger.info(f"Following alternative queries generated: \n{alternatives}\n")
+    return {"alternative_queries": alternatives}
+
+
+async def agenerate_alternative_queries(state: QAState):
+    """Async counterpart of generate_alternative_queries."""
+    logger.info("Generating alternative queries (async)")
+    question = state.get("question") or ""
+    logger.debug(f"Original question: {question}")
+    if not question:
+        logger.warning("No question provided for alternative query generation")
+        return {"alternative_queries": []}
+
+    try:
+        response = await asyncio.wait_for(
+            get_llm().ainvoke(_rewrite_messages(question)), timeout=QUERY_REWRITE_TIMEOUT or None
+        )
+        record_llm_usage(response)
+        alternatives = _parse_alternatives(response, question)
+    except asyncio.TimeoutError as exc:
+        logger.warning(f"Alternative query generation exceeded {QUERY_REWRITE_TIMEOUT}s; using the original question only")
+        record_error(exc)
+        alternatives = []
     except Exception as exc:
         logger.exception("LLM invocation for alternative queries failed: %s", exc)
+        record_error(exc)
         alternatives = []
 
     logger.info(f"Following alternative queries generated: \n{alternatives}\n")
-    return {"alternative_queries": alternatives}
\ No newline at end of file
+    return {"alternative_queries": alternatives}
+
+
+def make_expand_queries(strategy: str, lexical_index=None):
+    """Factory for an alternate_queries node that expands the question locally,
+    without an LLM round trip (see src.retrieval.query_expansion).
+    """
+    def expand_queries(state: QAState):
+        logger.info(f"Expanding query locally ({strategy})")
+        question = state.get("question") or ""
+        if not question:
+            logger.warning("No question provided for query expansion")
+            return {"alternative_queries": []}
+
+        alternatives = expand_query(strategy, question, state.get("question_hits") or [], lexical_index)
+        logger.info(f"Following alternative queries generated: \n{alternatives}\n")
+        return {"alternative_queries": alternatives}
+
+    return expand_queries
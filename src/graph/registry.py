@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import GRAPH_REGISTRY_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+
+class GraphEntry(NamedTuple):
+    graph: Any  # Compiled workflow graph
+    nbytes: int  # Approximate memory of its indexes
+    on_evict: Optional[Callable[[], None]] = None  # Releases what only this graph used
+
+
+# Callbacks run when an unregistered graph is closed, by id(graph)
+_close_callbacks: Dict[int, Callable[[], None]] = {}
+_close_callbacks_lock = threading.Lock()
+
+
+def on_close(graph: Any, callback: Callable[[], None]):
+    """Run callback once graph is closed with aclose_graph, e.g. to return what it held."""
+    with _close_callbacks_lock:
+        _close_callbacks[id(graph)] = callback
+
+
+def _pop_close_callback(graph: Any) -> Optional[Callable[[], None]]:
+    with _close_callbacks_lock:
+        return _close_callbacks.pop(id(graph), None)
+
+
+def close_graph(graph: Any):
+    """Close the SQLite connection of a compiled graph's checkpointer, if it has one."""
+    conn = getattr(getattr(graph, "checkpointer", None), "conn", None)
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to close checkpointer connection: {e}")
+
+
+async def aclose_graph(graph: Any):
+    """Close the aiosqlite connection of a graph built by acreate_workflow and run its
+    on_close callback. Its owner, whoever built it, must call this once the graph is no longer used."""
+    conn = getattr(getattr(graph, "checkpointer", None), "conn", None)
+    if conn is not None:
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to close async checkpointer connection: {e}")
+    callback = _pop_close_callback(graph)
+    if callback is not None:
+        try:
+            await asyncio.to_thread(callback)
+        except Exception as e:
+            logger.warning(f"Failed to release closed graph: {e}")
+
+
+class GraphRegistry:
+    """Compiled graphs shared by every session of the process, keyed by PDF and retrieval settings.
+
+    Entries are kept in least-recently-used order and evicted, oldest first, once
+    their approximate index memory exceeds max_bytes; the most recent entry is
+    always kept. Eviction closes the graph's checkpointer connection and runs the
+    entry's on_evict; for a graph still leased (see leased) both wait until its
+    last lease is returned. A graph is built once per key even when sessions ask
+    for it concurrently.
+    """
+
+    def __init__(self, max_bytes: int = int(GRAPH_REGISTRY_MAX_MB * 2 ** 20)):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, GraphEntry]" = OrderedDict()
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self._leases: Dict[int, int] = {}  # id(graph) -> sessions using it
+        self._retired: Dict[int, Tuple[Hashable, GraphEntry]] = {}  # Evicted while leased, by id(graph)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        """The graph for key, marked most recently used; caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry.graph
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Optional[GraphEntry]]) -> Optional[Any]:
+        """The graph for key, calling build on a miss; None when build finds nothing to serve."""
+        with self._lock:
+            graph = self._get(key)
+            if graph is not None:
+                self._stats["hits"] += 1
+                return graph
+            building = self._building.setdefault(key, threading.Lock())
+
+        # Only one session builds a given key; the others wait for its graph
+        with building:
+            with self._lock:
+                graph = self._get(key)
+                if graph is not None:
+                    self._stats["hits"] += 1
+                    return graph
+                self._stats["misses"] += 1
+            try:
+                entry = build()
+                if entry is not None:
+                    self._put(key, entry)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+            return entry.graph if entry is not None else None
+
+    def _put(self, key: Hashable, entry: GraphEntry):
+        with self._lock:
+            self._entries[key] = entry
+            evicted = []
+            while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+                evicted.append(self._entries.popitem(last=False))
+            self._stats["evictions"] += len(evicted)
+        logger.info(f"Registered graph {key} (~{entry.nbytes / 2 ** 20:.1f}MB, {len(self)} graphs, ~{self.nbytes / 2 ** 20:.1f}MB)")
+        for evicted_key, evicted_entry in evicted:
+            logger.info(f"Evicting graph {evicted_key} (~{evicted_entry.nbytes / 2 ** 20:.1f}MB)")
+            self._retire(evicted_key, evicted_entry)
+
+    def _retire(self, key: Hashable, entry: GraphEntry):
+        """Release an entry no longer registered, or defer that until its last lease is returned."""
+        with self._lock:
+            if self._leases.get(id(entry.graph)):
+                self._retired[id(entry.graph)] = (key, entry)
+                logger.debug(f"Graph {key} is in use; releasing it once returned")
+                return
+        self._release(entry)
+
+    def acquire(self, graph: Any) -> bool:
+        """Lease a registered graph, so eviction cannot release it while in use;
+        False when it is no longer registered. Return it with release."""
+        with self._lock:
+            if not any(entry.graph is graph for entry in self._entries.values()):
+                return False
+            self._leases[id(graph)] = self._leases.get(id(graph), 0) + 1
+            return True
+
+    def release(self, graph: Any):
+        """Return a leased graph, releasing it if it was evicted meanwhile and this was its last lease."""
+        with self._lock:
+            count = self._leases.get(id(graph), 0) - 1
+            if count > 0:
+                self._leases[id(graph)] = count
+                return
+            self._leases.pop(id(graph), None)
+            retired = self._retired.pop(id(graph), None)
+        if retired is not None:
+            logger.info(f"Releasing returned graph {retired[0]}")
+            self._release(retired[1])
+
+    @contextmanager
+    def leased(self, fetch: Callable[[], Optional[Any]], attempts: int = 3) -> Iterator[Optional[Any]]:
+        """Fetch a registered graph (e.g. with get_or_build) and lease it for the block.
+        A graph evicted between fetch and lease is fetched again; yields None when fetch does."""
+        for _ in range(attempts):
+            graph = fetch()
+            if graph is None:
+                yield None
+                return
+            if self.acquire(graph):
+                break
+        else:
+            raise RuntimeError(f"Graph was evicted before it could be leased, {attempts} times")
+        try:
+            yield graph
+        finally:
+            self.release(graph)
+
+    def _release(self, entry: GraphEntry):
+        close_graph(entry.graph)
+        if entry.on_evict is not None:
+            try:
+                entry.on_evict()
+            except Exception as e:
+                logger.warning(f"Failed to release evicted graph: {e}")
+
+    def evict(self, key: Hashable):
+        """Drop one graph, releasing it."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._stats["evictions"] += 1
+        if entry is not None:
+            self._retire(key, entry)
+
+    def clear(self):
+        """Drop every graph, releasing them."""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        for key, entry in entries:
+            self._retire(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters plus current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["graphs"] = len(self._entries)
+            stats["bytes"] = self.nbytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Global registry of compiled graphs shared across sessions
+graph_registry = GraphRegistry()
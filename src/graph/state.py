@@ -1,10 +1,14 @@
-from typing import TypedDict, List
+from typing import TypedDict, List, Dict, Any, Optional
 from langchain_core.messages import BaseMessage
 
 
 class QAState(TypedDict, total=False):
     question: str
     retrieved: List[str]
+    hits: List[Dict[str, Any]]  # Retrieved chunks as {"id", "score", "content", "tokens"}, best first
+    question_hits: List[Dict[str, Any]]  # Hits for the original question
+    alternative_hits: List[Dict[str, Any]]  # Hits for the alternative queries
     answer: str
     messages: List[BaseMessage]  # Chat history for conversation context
-    alternatives = List[str]  # Alternative queries for better retrieval
\ No newline at end of file
+    history_scores: List[Optional[float]]  # Per message: similarity to the question if selected for it, else None
+    alternative_queries: List[str]  # Alternative queries for better retrieval
\ No newline at end of file
@@ -1,75 +1,187 @@
-# src/workflow/qa_workflow.py
-
 from __future__ import annotations
 
 from langgraph.graph import StateGraph, END, START
 from langgraph.checkpoint.sqlite import SqliteSaver
-from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langchain_core.runnables import RunnableLambda
 
 from .state import QAState
-from .nodes import make_load_docs, llm_answer, generate_alternative_queries
-from src.db.database import db
-from config import MAX_MESSAGES
+from .nodes import (
+    make_load_docs,
+    make_load_alternative_docs,
+    run_in_thread,
+    merge_docs,
+    llm_answer,
+    allm_answer,
+    generate_alternative_queries,
+    agenerate_alternative_queries,
+    make_expand_queries,
+)
+from src.retrieval.query_expansion import QUERY_EXPANSION_STRATEGIES, FEEDBACK_STRATEGIES
+from src.db.database import get_db
+from src.db.connection import aconnect
+from src.utils.metrics import instrument_node, timed
+from config import QUERY_EXPANSION, RETRIEVAL_MODE
 
-# ---------------------------
-# Reducers
-# ---------------------------
-def message_accumulator(state: dict) -> dict:
-    """
-    Accumulate messages for conversation context with memory management.
+RETRIEVAL_MODES = ("hybrid", "vector")
 
-    Keeps the last N messages to avoid unbounded growth of conversation history.
-    """
-    current_messages = state.get("messages", [])
-    question = state.get("question", "")
-    answer = state.get("answer", "")
 
-    new_messages = []
-    if question:
-        new_messages.append(HumanMessage(content=question))
-    if answer:
-        new_messages.append(AIMessage(content=answer))
+class TimedSqliteSaver(SqliteSaver):
+    """SqliteSaver that records checkpoint write times."""
+
+    @timed("checkpoint.put")
+    def put(self, *args, **kwargs):
+        return super().put(*args, **kwargs)
+
+    @timed("checkpoint.put_writes")
+    def put_writes(self, *args, **kwargs):
+        return super().put_writes(*args, **kwargs)
 
-    # Merge old and new
-    all_messages = current_messages + new_messages
 
-    # Smart memory management
-    if len(all_messages) > MAX_MESSAGES:
-        all_messages = all_messages[-MAX_MESSAGES:]
+class TimedAsyncSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that records checkpoint write times."""
 
-    return {"messages": all_messages}
+    @timed("checkpoint.put")
+    async def aput(self, *args, **kwargs):
+        return await super().aput(*args, **kwargs)
+
+    @timed("checkpoint.put_writes")
+    async def aput_writes(self, *args, **kwargs):
+        return await super().aput_writes(*args, **kwargs)
 
 
 # ---------------------------
 # Workflow Builder
 # ---------------------------
-def create_workflow(vectorstore, k: int = 4):
+def _build_workflow(
+    vectorstore,
+    k: int = 4,
+    lexical_index=None,
+    query_expansion: str = QUERY_EXPANSION,
+    retrieval_mode: str = RETRIEVAL_MODE,
+) -> StateGraph:
+    """
+    Build the uncompiled QA workflow graph.
+
+    Retrieval for the original question starts immediately and runs alongside
+    alternative query generation; MERGE_DOCS joins both result sets. Feedback
+    expansion strategies instead wait for the original question's hits. Every
+    node has a sync and an async form, so the graph serves both invoke and ainvoke,
+    and each is wrapped by instrument_node to record its latency and errors.
+    Chat history is not accumulated in the graph state: the messages table is
+    the only history, and each question arrives with its recent window.
+    """
+    if query_expansion not in QUERY_EXPANSION_STRATEGIES:
+        raise ValueError(
+            f"Unknown query expansion strategy '{query_expansion}', expected one of {QUERY_EXPANSION_STRATEGIES}"
+        )
+    if retrieval_mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{retrieval_mode}', expected one of {RETRIEVAL_MODES}")
+
+    workflow = StateGraph(QAState)
+    # Hybrid retrieval fuses BM25 over the lexical index with the dense ranking
+    retrieval_index = lexical_index if retrieval_mode == "hybrid" else None
+    load_docs = make_load_docs(vectorstore, k=k, lexical_index=retrieval_index)
+    load_alternative_docs = make_load_alternative_docs(vectorstore, k=k, lexical_index=retrieval_index)
+
+    # Register nodes
+    if query_expansion == "llm":
+        workflow.add_node(
+            "alternate_queries",
+            RunnableLambda(
+                instrument_node("alternate_queries", generate_alternative_queries),
+                afunc=instrument_node("alternate_queries", agenerate_alternative_queries),
+            ),
+        )
+    else:
+        workflow.add_node(
+            "alternate_queries", instrument_node("alternate_queries", make_expand_queries(query_expansion, lexical_index))
+        )
+    workflow.add_node(
+        "LOAD_DOCS",
+        RunnableLambda(
+            instrument_node("LOAD_DOCS", load_docs),
+            afunc=instrument_node("LOAD_DOCS", run_in_thread(load_docs)),
+        ),
+    )
+    workflow.add_node(
+        "LOAD_ALT_DOCS",
+        RunnableLambda(
+            instrument_node("LOAD_ALT_DOCS", load_alternative_docs),
+            afunc=instrument_node("LOAD_ALT_DOCS", run_in_thread(load_alternative_docs)),
+        ),
+    )
+    workflow.add_node("MERGE_DOCS", instrument_node("MERGE_DOCS", merge_docs))
+    workflow.add_node(
+        "LLM_ANSWER",
+        RunnableLambda(instrument_node("LLM_ANSWER", llm_answer), afunc=instrument_node("LLM_ANSWER", allm_answer)),
+    )
+
+    # Define edges: fan out from START, fan in at MERGE_DOCS
+    workflow.add_edge(START, "LOAD_DOCS")
+    if query_expansion in FEEDBACK_STRATEGIES:
+        workflow.add_edge("LOAD_DOCS", "alternate_queries")
+    else:
+        workflow.add_edge(START, "alternate_queries")
+    workflow.add_edge("alternate_queries", "LOAD_ALT_DOCS")
+    workflow.add_edge(["LOAD_DOCS", "LOAD_ALT_DOCS"], "MERGE_DOCS")
+    workflow.add_edge("MERGE_DOCS", "LLM_ANSWER")
+    workflow.add_edge("LLM_ANSWER", END)
+    return workflow
+
+
+def create_workflow(
+    vectorstore,
+    k: int = 4,
+    lexical_index=None,
+    query_expansion: str = QUERY_EXPANSION,
+    retrieval_mode: str = RETRIEVAL_MODE,
+):
     """
     Create and compile the QA workflow graph.
 
     Args:
         vectorstore: Vector store instance used for document retrieval.
         k (int, optional): Number of documents to retrieve. Defaults to 4.
+        lexical_index (optional): Ingest-time term statistics and BM25 weights, used by
+            local query expansion and hybrid retrieval.
+        query_expansion (str, optional): One of QUERY_EXPANSION_STRATEGIES. Defaults to
+            the QUERY_EXPANSION setting.
+        retrieval_mode (str, optional): "hybrid" or "vector". Defaults to the
+            RETRIEVAL_MODE setting; hybrid falls back to vector without a lexical index.
 
     Returns:
         Compiled workflow graph with persistent checkpointing.
     """
-    workflow = StateGraph(QAState)
-
-    # Register nodes
-    workflow.add_node("alternate_queries", generate_alternative_queries)
-    workflow.add_node("LOAD_DOCS", make_load_docs(vectorstore, k=k))
-    workflow.add_node("LLM_ANSWER", llm_answer)
-    workflow.add_node("MESSAGE_ACCUMULATOR", message_accumulator)
-
-    # Define edges
-    workflow.add_edge(START, "alternate_queries")
-    workflow.add_edge("alternate_queries", "LOAD_DOCS")
-    workflow.add_edge("LOAD_DOCS", "LLM_ANSWER")
-    workflow.add_edge("LLM_ANSWER", "MESSAGE_ACCUMULATOR")
-    workflow.add_edge("MESSAGE_ACCUMULATOR", END)
+    workflow = _build_workflow(
+        vectorstore, k=k, lexical_index=lexical_index, query_expansion=query_expansion, retrieval_mode=retrieval_mode
+    )
 
     # Add persistence layer
-    checkpointer = SqliteSaver(conn=db.get_langgraph_connection())
+    checkpointer = TimedSqliteSaver(conn=get_db().get_langgraph_connection())
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+async def acreate_workflow(
+    vectorstore,
+    k: int = 4,
+    lexical_index=None,
+    query_expansion: str = QUERY_EXPANSION,
+    retrieval_mode: str = RETRIEVAL_MODE,
+):
+    """
+    Create and compile the QA workflow graph for async use (graph.ainvoke).
+
+    Must be awaited inside the event loop that will run the graph, since the
+    async SQLite checkpointer binds to it. The caller owns the checkpointer's
+    connection and closes it with src.graph.registry.aclose_graph when done.
+    """
+    workflow = _build_workflow(
+        vectorstore, k=k, lexical_index=lexical_index, query_expansion=query_expansion, retrieval_mode=retrieval_mode
+    )
+
+    # Add async persistence layer on the same database file
+    checkpointer = TimedAsyncSqliteSaver(await aconnect(get_db().db_path))
 
     return workflow.compile(checkpointer=checkpointer)
@@ -1,13 +1,36 @@
 import logging
-from langchain_openai import ChatOpenAI
+import threading
+
 from config import api_key, OPENAI_BASE, OPENAI_MODEL
 
 logger = logging.getLogger(__name__)
 
-logger.info(f"Initializing LLM with model: {OPENAI_MODEL} and base: {OPENAI_BASE}")
-llm = ChatOpenAI(
-    openai_api_base=OPENAI_BASE,
-    openai_api_key=api_key,
-    model=OPENAI_MODEL,
-)
-logger.info("LLM initialized successfully")
\ No newline at end of file
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """The chat model client, constructed on first use so importing the graph stays cheap."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                if not api_key:
+                    raise RuntimeError("Missing HG_API_KEY in environment. Please set it in your .env file.")
+                from langchain_openai import ChatOpenAI
+
+                logger.info(f"Initializing LLM with model: {OPENAI_MODEL} and base: {OPENAI_BASE}")
+                _llm = ChatOpenAI(
+                    openai_api_base=OPENAI_BASE,
+                    openai_api_key=api_key,
+                    model=OPENAI_MODEL,
+                )
+                logger.info("LLM initialized successfully")
+    return _llm
+
+
+def __getattr__(name):
+    # `from src.llm.llm import llm` still works, constructing the client at that point
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,144 @@
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import tiktoken
+
+from config import PROMPT_ENCODING, PROMPT_TOKEN_BUDGET, PROMPT_TRIM_MIN_TOKENS
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Estimate used when the tiktoken encoding cannot be loaded
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and delimiters the chat format adds to every message
+CHUNK_SEPARATOR_TOKENS = 1  # "\n\n" between context chunks
+
+_encoding = None
+_encoding_unavailable = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    """The tiktoken encoding, loaded once; None when it cannot be loaded (e.g. offline)."""
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_unavailable:
+                try:
+                    _encoding = tiktoken.get_encoding(PROMPT_ENCODING)
+                except Exception as e:
+                    _encoding_unavailable = True
+                    logger.warning(
+                        f"tiktoken encoding {PROMPT_ENCODING} unavailable, estimating {CHARS_PER_TOKEN} characters per token: {e}"
+                    )
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode_ordinary(text))
+
+
+@lru_cache(maxsize=4096)
+def _cached_count(text: str) -> int:
+    return count_tokens(text)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """The longest prefix of text within max_tokens tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+
+
+def message_tokens(content: str) -> int:
+    """Tokens a chat message with this content adds to the prompt."""
+    return _cached_count(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PackedPrompt(NamedTuple):
+    chunks: List[str]  # Chunk texts in relevance order, the last possibly trimmed
+    history: list  # Chat messages in chronological order
+    tokens: int  # Estimated prompt tokens, reserved ones included
+    trimmed: int  # Chunks cut down to fit
+
+
+def _chunk_values(hits: List[Dict[str, Any]]) -> List[float]:
+    """Relevance of each hit relative to the best one; rank-based when scores are not positive."""
+    top = (hits[0].get("score") or 0.0) if hits else 0.0
+    if top > 0:
+        return [max(hit.get("score") or 0.0, 0.0) / top for hit in hits]
+    return [1.0 / (1 + rank) for rank in range(len(hits))]
+
+
+def _history_values(history: list, scores: Optional[List[Optional[float]]] = None) -> List[float]:
+    """1 for the latest turn, 1/2 for the one before, and so on; a turn starts at a user message.
+    A message with a score (its similarity to the question) is worth the higher of the two."""
+    values, age = [], 0
+    for message in reversed(history):
+        values.append(1.0 / (1 + age))
+        if getattr(message, "type", None) == "human":
+            age += 1
+    values.reverse()
+    if scores is not None:
+        values = [value if score is None else max(value, score) for value, score in zip(values, scores)]
+    return values
+
+
+def pack_prompt(
+    hits: List[Dict[str, Any]],
+    history: list,
+    reserved_tokens: int = 0,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    min_trim_tokens: int = PROMPT_TRIM_MIN_TOKENS,
+    history_scores: Optional[List[Optional[float]]] = None,
+) -> PackedPrompt:
+    """Choose the retrieved chunks and chat messages that fit in `budget` tokens.
+
+    hits are retrieval hits, best first, with "content", "score" and optionally
+    the chunk's "tokens" counted at ingest; reserved_tokens covers the fixed parts
+    of the prompt. Chunks and messages compete on value: a chunk's relevance
+    relative to the best hit, a message's 1 / (1 + turns back from the latest),
+    or its history_scores entry (similarity to the question, from the history
+    selector) when that is higher, so older turns picked for relevance are not
+    the first to go. They are taken by decreasing value while they fit; the first chunk that does
+    not is trimmed to the remaining budget when at least min_trim_tokens remain,
+    anything else that does not fit is dropped.
+    """
+    remaining = budget - reserved_tokens
+    chunk_costs = [
+        (hit["tokens"] if hit.get("tokens") is not None else _cached_count(hit["content"])) + CHUNK_SEPARATOR_TOKENS
+        for hit in hits
+    ]
+    history_costs = [message_tokens(message.content) for message in history]
+
+    # (value, kind, index, cost); at equal value chunks go first
+    pieces = [(value, 0, i, chunk_costs[i]) for i, value in enumerate(_chunk_values(hits))]
+    pieces += [(value, 1, i, history_costs[i]) for i, value in enumerate(_history_values(history, history_scores))]
+    pieces.sort(key=lambda piece: (-piece[0], piece[1], piece[2]))
+
+    chunk_texts: Dict[int, str] = {}
+    kept_history = set()
+    trimmed = 0
+    for _, kind, index, cost in pieces:
+        if cost <= remaining:
+            remaining -= cost
+            if kind == 0:
+                chunk_texts[index] = hits[index]["content"]
+            else:
+                kept_history.add(index)
+        elif kind == 0 and not trimmed and remaining - CHUNK_SEPARATOR_TOKENS >= min_trim_tokens:
+            chunk_texts[index] = trim_to_tokens(hits[index]["content"], remaining - CHUNK_SEPARATOR_TOKENS)
+            remaining = 0
+            trimmed = 1
+
+    return PackedPrompt(
+        chunks=[chunk_texts[i] for i in sorted(chunk_texts)],
+        history=[message for i, message in enumerate(history) if i in kept_history],
+        tokens=budget - remaining,
+        trimmed=trimmed,
+    )
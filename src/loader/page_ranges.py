@@ -0,0 +1,45 @@
+"""Page-range parsing run inside loader worker processes.
+
+Kept free of config and model imports so spawning a worker stays cheap.
+"""
+import io
+from typing import Dict, List, Optional
+
+import pdfplumber
+from langchain_core.documents import Document
+
+# Set once per worker process by init_worker, so the PDF bytes are pickled per worker, not per task
+_pdf_data: Optional[bytes] = None
+
+
+def init_worker(data: bytes):
+    global _pdf_data
+    _pdf_data = data
+
+
+def page_document(page, source: str, total_pages: int, pdf_metadata: Dict) -> Document:
+    """A page's text and metadata, matching PDFPlumberLoader's output."""
+    text = page.extract_text()
+    page.close()  # Drop the page's cached layout objects
+    return Document(
+        page_content=text + "\n",
+        metadata={
+            "source": source,
+            "file_path": source,
+            "page": page.page_number - 1,
+            "total_pages": total_pages,
+            **pdf_metadata,
+        },
+    )
+
+
+def pdf_metadata(pdf) -> Dict:
+    return {key: value for key, value in pdf.metadata.items() if type(value) in (str, int)}
+
+
+def parse_page_range(start: int, end: int, source: str) -> List[Document]:
+    """Parse pages [start, end) of the worker's PDF."""
+    with pdfplumber.open(io.BytesIO(_pdf_data)) as pdf:
+        total_pages = len(pdf.pages)
+        metadata = pdf_metadata(pdf)
+        return [page_document(page, source, total_pages, metadata) for page in pdf.pages[start:end]]
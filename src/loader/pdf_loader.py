@@ -1,31 +1,93 @@
+import io
 import logging
-from langchain_community.document_loaders import PDFPlumberLoader
-from typing import List
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Optional
+
+import pdfplumber
 from langchain_core.documents import Document
-import tempfile
+
+from src.loader.page_ranges import init_worker, page_document, parse_page_range, pdf_metadata
+from config import PDF_PARSE_WORKERS, PDF_PARALLEL_MIN_PAGES
 
 logger = logging.getLogger(__name__)
 
+RANGES_PER_WORKER = 4  # Smaller ranges balance uneven pages and let the first pages arrive sooner
+
+
+def _page_ranges(total_pages: int, workers: int) -> List[range]:
+    size = max(1, -(-total_pages // (workers * RANGES_PER_WORKER)))
+    return [range(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+
+def _iter_pages_parallel(data: bytes, source: str, total_pages: int, workers: int) -> Iterator[Document]:
+    """Parse page ranges in a process pool, yielding pages in order as ranges complete.
+
+    At most workers + 1 ranges are in flight; the next is submitted when the oldest is yielded.
+    """
+    ranges = _page_ranges(total_pages, workers)
+    logger.info(f"Parsing {total_pages} pages in {len(ranges)} ranges across {workers} processes")
+    # spawn, not fork: callers such as the streaming pipeline parse from a worker thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(data,)) as pool:
+        pending = iter(ranges)
+        # Keep one range queued beyond the busy workers; parsed pages must not pile up while the consumer is blocked
+        futures = deque(
+            pool.submit(parse_page_range, pages.start, pages.stop, source)
+            for pages in islice(pending, workers + 1)
+        )
+        try:
+            while futures:
+                pages = futures.popleft().result()
+                following = next(pending, None)
+                if following is not None:
+                    futures.append(pool.submit(parse_page_range, following.start, following.stop, source))
+                yield from pages
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_pdf_pages(
+    data: bytes,
+    source: str = "",
+    workers: Optional[int] = None,
+    parallel_min_pages: Optional[int] = None,
+) -> Iterator[Document]:
+    """Lazily parse a PDF provided as bytes, one Document per page, in page order.
+
+    Reads from an in-memory buffer, never a temp file. PDFs with at least
+    parallel_min_pages pages are split into page ranges parsed by `workers`
+    processes. Page text and metadata match PDFPlumberLoader's either way, so
+    chunks (and their cached embeddings) are unchanged.
+    """
+    workers = PDF_PARSE_WORKERS if workers is None else workers
+    parallel_min_pages = PDF_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        total_pages = len(pdf.pages)
+        if workers > 1 and total_pages >= max(2, parallel_min_pages):
+            parallel = True
+        else:
+            parallel = False
+            metadata = pdf_metadata(pdf)
+            logger.debug(f"Streaming {total_pages} pages from PDF")
+            for page in pdf.pages:
+                yield page_document(page, source, total_pages, metadata)
+
+    if parallel:
+        yield from _iter_pages_parallel(data, source, total_pages, min(workers, total_pages))
+
 
-def load_pdf_from_bytes(data: bytes) -> List[Document]:
+def load_pdf_from_bytes(data: bytes, source: str = "") -> List[Document]:
     """Load a PDF provided as bytes into Documents, without persisting it."""
     logger.info("Loading PDF from bytes")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(data)
-        tmp_path = tmp.name
-        logger.debug(f"Temporary PDF file created at: {tmp_path}")
-    
     try:
-        logger.debug("Loading PDF with PDFPlumberLoader")
-        loader = PDFPlumberLoader(tmp_path)
-        docs = loader.load()
+        docs = list(iter_pdf_pages(data, source))
         logger.info(f"Successfully loaded {len(docs)} documents from PDF")
         return docs
     except Exception as e:
         logger.error(f"Failed to load PDF: {e}")
         raise
-    finally:
-        import os
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            logger.debug("Temporary PDF file removed")
\ No newline at end of file
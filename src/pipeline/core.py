@@ -1,12 +1,38 @@
+import asyncio
 import logging
-from typing import Callable, List, Any
+import time
+from typing import Callable, Iterable, Iterator, List, Any, Optional, Tuple
 
 from langchain_core.documents import Document
 
-from src.loader.pdf_loader import load_pdf_from_bytes as default_pdf_bytes_loader
+from src.loader.pdf_loader import (
+	load_pdf_from_bytes as default_pdf_bytes_loader,
+	iter_pdf_pages as default_page_streamer,
+)
 from src.splitter.semantic_chunker import split_pdf_into_chunks as default_splitter
 from src.vector_store.faiss_store import create_vector_store as default_vector_store_builder
-from src.graph.workflow import create_workflow as default_graph_builder
+from src.vector_store.index_store import (
+	load_vector_store as default_vector_store_loader,
+	save_vector_store as default_vector_store_saver,
+	load_or_build_lexical_index as default_lexical_index_provider,
+	vector_store_chunks,
+)
+from src.graph.workflow import (
+	create_workflow as default_graph_builder,
+	acreate_workflow as default_async_graph_builder,
+)
+from src.pipeline.streaming import stream_vector_store as default_vector_store_streamer
+from src.vector_store.corpus import corpus
+from src.graph.registry import GraphEntry, graph_registry, on_close
+from src.graph.nodes import LLM_ERROR_ANSWER, score_relevant_context
+from src.cache.answer_cache import answer_cache, depends_on_history
+from src.db.database import embedding_matrix, get_db
+from src.llm.prompt_packer import count_tokens
+from src.utils.metrics import record_outcome, track_request
+from config import (
+	ANSWER_CACHE_ENABLED, HISTORY_WINDOW, HISTORY_SELECTION, HISTORY_MAX_MESSAGES,
+	RETRIEVAL_MODE, QUERY_EXPANSION, FAISS_INDEX_TYPE, FAISS_METRIC,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +49,74 @@ def load_docs_from_pdf_bytes(name: str, data: bytes, *, pdf_bytes_loader: Callab
 		raise
 
 
+def _search_target(vectorstore: Any, pdf_id: Optional[int]):
+	"""What a graph searches: the PDF's slice of the shared corpus index when pdf_id is
+	given, otherwise the private vector store. With pdf_id this takes a corpus reference
+	to the PDF, copying its vectors in from vectorstore when absent, which the graph's
+	owner returns with corpus.release; None when the PDF is absent and vectorstore is None."""
+	if pdf_id is None:
+		return vectorstore
+	if not corpus.acquire(pdf_id, vectorstore):
+		return None
+	return corpus.view([pdf_id])
+
+
+def graph_key(pdf_id: int, k: int) -> tuple:
+	"""Registry key of a PDF's graph: the PDF plus the settings the graph is built with."""
+	return (pdf_id, k, RETRIEVAL_MODE, QUERY_EXPANSION, FAISS_INDEX_TYPE, FAISS_METRIC)
+
+
+def _pdf_graph_entry(
+	pdf_id: int,
+	vectorstore: Any,
+	index_key: Optional[str],
+	k: int,
+	graph_builder: Callable[[Any, int], Any],
+	lexical_index_provider: Callable[[Optional[str], Any], Any],
+) -> GraphEntry:
+	"""Build a PDF's graph over its corpus slice, sized for the graph registry; None when the
+	PDF is not in the corpus and vectorstore is None. The graph holds a corpus reference to
+	the PDF from the start of the build until its eviction."""
+	view = _search_target(vectorstore, pdf_id)
+	if view is None:
+		return None
+	try:
+		lexical_index = lexical_index_provider(index_key, view)
+		graph = graph_builder(view, k=k, lexical_index=lexical_index)
+	except BaseException:
+		corpus.release(pdf_id)
+		raise
+	nbytes = corpus.nbytes([pdf_id]) + getattr(lexical_index, "nbytes", 0)
+	return GraphEntry(graph, nbytes, on_evict=lambda: corpus.release(pdf_id))
+
+
+def _load_or_build_vector_store(
+	documents: List[Document],
+	splitter: Callable[[List[Document]], List[Document]],
+	vector_store_builder: Callable[[List[Document]], Any],
+	index_key: Optional[str],
+	vector_store_loader: Callable[[str], Any],
+	vector_store_saver: Callable[[str, Any], Any],
+):
+	"""Reuse the stored index for index_key if fresh, otherwise split, embed and persist."""
+	vectorstore = vector_store_loader(index_key) if index_key else None
+	if vectorstore is not None:
+		logger.info(f"Reusing stored vector store for {index_key}")
+		return vectorstore
+
+	logger.debug("Splitting documents into chunks")
+	chunks = splitter(documents)
+	logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
+	
+	logger.debug("Building vector store")
+	vectorstore = vector_store_builder(chunks)
+	logger.info("Vector store created successfully")
+
+	if index_key:
+		vector_store_saver(index_key, vectorstore)
+	return vectorstore
+
+
 def build_graph_from_documents(
 	documents: List[Document],
 	*,
@@ -30,20 +124,35 @@ def build_graph_from_documents(
 	vector_store_builder: Callable[[List[Document]], Any] = default_vector_store_builder,
 	graph_builder: Callable[[Any, int], Any] = default_graph_builder,
 	k: int = 4,
+	index_key: Optional[str] = None,
+	vector_store_loader: Callable[[str], Any] = default_vector_store_loader,
+	vector_store_saver: Callable[[str, Any], Any] = default_vector_store_saver,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+	pdf_id: Optional[int] = None,
 ):
-	"""Create a RAG graph from in-memory documents using provided components."""
+	"""Create a RAG graph from in-memory documents using provided components.
+	When index_key (the PDF content hash) is given, a stored index is reused if fresh
+	and a newly built one is persisted for later loads. With pdf_id the graph searches
+	the shared corpus index instead of a private copy of the vectors, and is shared
+	across sessions through the graph registry."""
+	if pdf_id is not None:
+		return graph_registry.get_or_build(graph_key(pdf_id, k), lambda: _pdf_graph_entry(
+			pdf_id,
+			_load_or_build_vector_store(
+				documents, splitter, vector_store_builder, index_key, vector_store_loader, vector_store_saver
+			),
+			index_key, k, graph_builder, lexical_index_provider,
+		))
+
 	logger.info(f"Building graph from {len(documents)} documents")
 	try:
-		logger.debug("Splitting documents into chunks")
-		chunks = splitter(documents)
-		logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
-		
-		logger.debug("Building vector store")
-		vectorstore = vector_store_builder(chunks)
-		logger.info("Vector store created successfully")
+		vectorstore = _load_or_build_vector_store(
+			documents, splitter, vector_store_builder, index_key, vector_store_loader, vector_store_saver
+		)
+		lexical_index = lexical_index_provider(index_key, vectorstore)
 		
 		logger.debug("Building graph")
-		graph = graph_builder(vectorstore, k=k)
+		graph = graph_builder(vectorstore, k=k, lexical_index=lexical_index)
 		logger.info("Graph built successfully")
 		return graph
 	except Exception as e:
@@ -51,43 +160,394 @@ def build_graph_from_documents(
 		raise
 
 
-def ask_question(graph: Any, question: str, thread_id: str) -> str:
-	"""Invoke the graph with a question and thread id, returning the answer string."""
-	logger.info(f"Asking question: {question}")
-	logger.debug(f"Thread ID: {thread_id}")
-	
-	# Get existing chat history for conversation context
-	from src.db.database import db
-	existing_messages = db.get_chat_history(thread_id)
+async def abuild_graph_from_documents(
+	documents: List[Document],
+	*,
+	splitter: Callable[[List[Document]], List[Document]] = default_splitter,
+	vector_store_builder: Callable[[List[Document]], Any] = default_vector_store_builder,
+	graph_builder: Callable[..., Any] = default_async_graph_builder,
+	k: int = 4,
+	index_key: Optional[str] = None,
+	vector_store_loader: Callable[[str], Any] = default_vector_store_loader,
+	vector_store_saver: Callable[[str, Any], Any] = default_vector_store_saver,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+	pdf_id: Optional[int] = None,
+):
+	"""Async counterpart of build_graph_from_documents; the graph it returns is run with aask_question.
+	Splitting and embedding run in a worker thread so the event loop stays responsive.
+	Async graphs are bound to their event loop, so they are not shared through the registry;
+	the caller owns the graph and closes it with aclose_graph when done, which also returns
+	its corpus reference to the PDF when built with pdf_id."""
+	logger.info(f"Building async graph from {len(documents)} documents")
+	try:
+		vectorstore = await asyncio.to_thread(
+			_load_or_build_vector_store,
+			documents, splitter, vector_store_builder, index_key, vector_store_loader, vector_store_saver
+		)
+		vectorstore = await asyncio.to_thread(_search_target, vectorstore, pdf_id)
+		try:
+			lexical_index = await asyncio.to_thread(lexical_index_provider, index_key, vectorstore)
+			graph = await graph_builder(vectorstore, k=k, lexical_index=lexical_index)
+		except BaseException:
+			if pdf_id is not None:
+				corpus.release(pdf_id)
+			raise
+		if pdf_id is not None:
+			on_close(graph, lambda: corpus.release(pdf_id))
+		logger.info("Async graph built successfully")
+		return graph
+	except Exception as e:
+		logger.error(f"Failed to build async graph: {e}")
+		raise
+
+
+def load_graph_from_index(
+	index_key: str,
+	*,
+	vector_store_loader: Callable[[str], Any] = default_vector_store_loader,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+	graph_builder: Callable[[Any, int], Any] = default_graph_builder,
+	k: int = 4,
+	pdf_id: Optional[int] = None,
+):
+	"""Create a RAG graph from a stored index, or return None if it is missing or stale.
+	With pdf_id the graph searches the shared corpus index and is shared across
+	sessions through the graph registry; a PDF already in the corpus needs no load."""
+	if pdf_id is not None:
+		def build() -> Optional[GraphEntry]:
+			logger.info(f"Loading graph from stored index: {index_key}")
+			# A PDF already in the corpus needs no load
+			entry = _pdf_graph_entry(pdf_id, None, index_key, k, graph_builder, lexical_index_provider)
+			if entry is not None:
+				return entry
+			vectorstore = vector_store_loader(index_key)
+			if vectorstore is None:
+				return None
+			return _pdf_graph_entry(pdf_id, vectorstore, index_key, k, graph_builder, lexical_index_provider)
+		return graph_registry.get_or_build(graph_key(pdf_id, k), build)
+
+	logger.info(f"Loading graph from stored index: {index_key}")
+	vectorstore = vector_store_loader(index_key)
+	if vectorstore is None:
+		return None
+	graph = graph_builder(vectorstore, k=k, lexical_index=lexical_index_provider(index_key, vectorstore))
+	logger.info("Graph built successfully from stored index")
+	return graph
+
+
+def build_graph_from_stored_chunks(
+	pdf_id: int,
+	*,
+	index_key: Optional[str] = None,
+	splitter: Callable[[List[Document]], List[Document]] = default_splitter,
+	vector_store_builder: Callable[[List[Document]], Any] = default_vector_store_builder,
+	graph_builder: Callable[[Any, int], Any] = default_graph_builder,
+	vector_store_saver: Callable[[str, Any], Any] = default_vector_store_saver,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+	k: int = 4,
+):
+	"""Rebuild a stored PDF's index from its chunk rows, for when the stored index is missing
+	or stale; returns None if the PDF has no rows. The rows are embedded as they are, so their
+	ordinals stay the chunk ids. PDFs stored before chunking hold one page per row: those are
+	split once, and their rows replaced by the chunks."""
+	db = get_db()
+	rows = db.get_pdf_chunk_rows(pdf_id)
+	if not rows:
+		return None
+	if db.is_pdf_chunked(pdf_id):
+		chunks = [
+			Document(page_content=text, metadata={"page": page, "tokens": count_tokens(text)})
+			for text, page in rows
+		]
+	else:
+		# Legacy rows are whole pages, in page order
+		chunks = splitter([Document(page_content=text, metadata={"page": page}) for page, (text, _) in enumerate(rows)])
+		db.replace_pdf_chunks(
+			pdf_id, [chunk.page_content for chunk in chunks], [chunk.metadata.get("page") for chunk in chunks]
+		)
+	logger.info(f"Rebuilding index of PDF {pdf_id} from {len(chunks)} stored chunks")
+	return build_graph_from_documents(
+		chunks,
+		splitter=lambda docs: docs,
+		vector_store_builder=vector_store_builder,
+		graph_builder=graph_builder,
+		k=k,
+		index_key=index_key,
+		vector_store_loader=lambda key: None,
+		vector_store_saver=vector_store_saver,
+		lexical_index_provider=lexical_index_provider,
+		pdf_id=pdf_id,
+	)
+
+
+def build_graph_for_pdf(
+	pdf_id: int,
+	vectorstore: Any,
+	*,
+	index_key: Optional[str] = None,
+	graph_builder: Callable[[Any, int], Any] = default_graph_builder,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+	k: int = 4,
+):
+	"""Create a RAG graph over a stored PDF's slice of the shared corpus index, adding
+	the PDF's vectors from vectorstore (e.g. from index_pdf_bytes) on first use.
+	The graph is shared across sessions through the graph registry."""
+	def build() -> GraphEntry:
+		entry = _pdf_graph_entry(pdf_id, vectorstore, index_key, k, graph_builder, lexical_index_provider)
+		logger.info(f"Graph built successfully for PDF {pdf_id}")
+		return entry
+	return graph_registry.get_or_build(graph_key(pdf_id, k), build)
+
+
+def index_pdf_bytes(
+	name: str,
+	data: bytes,
+	*,
+	index_key: Optional[str] = None,
+	page_streamer: Callable[[bytes, str], Iterable[Document]] = default_page_streamer,
+	vector_store_streamer: Callable[..., Any] = default_vector_store_streamer,
+	vector_store_loader: Callable[[str], Any] = default_vector_store_loader,
+	vector_store_saver: Callable[[str, Any], Any] = default_vector_store_saver,
+	stats: Optional[dict] = None,
+) -> Tuple[Any, List[Document], bool]:
+	"""Build (or reuse) the vector store for PDF bytes with the streaming ingestion pipeline.
+	Pages are parsed lazily and flow through splitting into batched embedding, so parsing
+	overlaps with embedding and memory stays bounded. Returns the vector store, its chunks
+	in chunk id order, and whether the store was rebuilt (its chunks may then differ from
+	stored ones); a reused store needs no parsing at all."""
+	vectorstore = vector_store_loader(index_key) if index_key else None
+	if vectorstore is not None:
+		logger.info(f"Reusing stored vector store for {index_key}")
+		return vectorstore, vector_store_chunks(vectorstore), False
+	vectorstore = vector_store_streamer(page_streamer(data, name), stats=stats)
+	if vectorstore is None:
+		raise ValueError(f"No text could be extracted from {name}")
+	if index_key:
+		vector_store_saver(index_key, vectorstore)
+	return vectorstore, vector_store_chunks(vectorstore), True
+
+
+def build_graph_from_pdf_bytes(
+	name: str,
+	data: bytes,
+	*,
+	page_streamer: Callable[[bytes, str], Iterable[Document]] = default_page_streamer,
+	vector_store_streamer: Callable[..., Any] = default_vector_store_streamer,
+	graph_builder: Callable[[Any, int], Any] = default_graph_builder,
+	k: int = 4,
+	index_key: Optional[str] = None,
+	vector_store_loader: Callable[[str], Any] = default_vector_store_loader,
+	vector_store_saver: Callable[[str, Any], Any] = default_vector_store_saver,
+	lexical_index_provider: Callable[[Optional[str], Any], Any] = default_lexical_index_provider,
+) -> Tuple[Any, List[Document]]:
+	"""Create a RAG graph straight from PDF bytes (see index_pdf_bytes).
+	Returns the graph and the chunks, in chunk id order."""
+	logger.info(f"Streaming PDF document: {name}")
+	try:
+		vectorstore, chunks, _ = index_pdf_bytes(
+			name, data,
+			index_key=index_key,
+			page_streamer=page_streamer,
+			vector_store_streamer=vector_store_streamer,
+			vector_store_loader=vector_store_loader,
+			vector_store_saver=vector_store_saver,
+		)
+		lexical_index = lexical_index_provider(index_key, vectorstore)
+
+		logger.debug("Building graph")
+		graph = graph_builder(vectorstore, k=k, lexical_index=lexical_index)
+		logger.info(f"Graph built successfully from {len(chunks)} chunks of {name}")
+		return graph, chunks
+	except Exception as e:
+		logger.error(f"Failed to build graph from PDF {name}: {e}")
+		raise
+
+
+def _prior_messages(question: str, recent: List[dict]) -> List[dict]:
+	"""The chat history sent with a question: at most HISTORY_WINDOW messages before it.
+	The UI stores the question before asking, so a trailing copy of it is not prior context."""
+	if recent and recent[-1]["role"] == "user" and recent[-1]["content"] == question:
+		recent = recent[:-1]
+	return recent[-HISTORY_WINDOW:]
+
+
+def _initial_state(question: str, existing_messages: List[dict], question_vector=None) -> dict:
+	"""Build the graph input for a question, seeded with the thread's relevant chat history.
+	With the question's embedding, earlier turns are chosen by similarity to it."""
 	logger.debug(f"Retrieved {len(existing_messages)} existing messages from history")
 	
 	# Convert database messages to LangChain message format
 	from langchain_core.messages import HumanMessage, AIMessage
-	langchain_messages = []
-	for msg in existing_messages:
-		if msg["role"] == "user":
-			langchain_messages.append(HumanMessage(content=msg["content"]))
-		elif msg["role"] == "assistant":
-			langchain_messages.append(AIMessage(content=msg["content"]))
+	existing_messages = [msg for msg in existing_messages if msg["role"] in ("user", "assistant")]
+	langchain_messages = [
+		HumanMessage(content=msg["content"]) if msg["role"] == "user" else AIMessage(content=msg["content"])
+		for msg in existing_messages
+	]
+	embeddings = None
+	if question_vector is not None:
+		embeddings = embedding_matrix([msg.get("embedding") for msg in existing_messages], len(question_vector))
+	langchain_messages, history_scores = score_relevant_context(
+		question, langchain_messages, HISTORY_MAX_MESSAGES, embeddings=embeddings, question_embedding=question_vector
+	)
 	
 	# Initialize state with conversation history
-	initial_state = {
+	return {
 		"question": question,
 		"retrieved": [],
-		"messages": langchain_messages
+		"messages": langchain_messages,
+		"history_scores": history_scores,
 	}
+
+
+def _history_question_vector(question: str, history: List[dict], known_vector=None):
+	"""Question embedding for semantic history selection, or None when every message fits.
+	Reuses an embedding of the question already at hand (the answer cache's or the stored message's)."""
+	if HISTORY_SELECTION != "semantic" or len(history) <= HISTORY_MAX_MESSAGES:
+		return None
+	if known_vector is not None:
+		return known_vector
+	return answer_cache.embed_question(question)
+
+
+def _answer_cache_vector(pdf_id: Optional[int], question: str, history: List[dict], question_vector=None):
+	"""Question embedding for the semantic answer cache, or None when the question
+	must not be served from or stored in it. Reuses question_vector when given."""
+	if pdf_id is None or not ANSWER_CACHE_ENABLED or not question:
+		return None
+	if depends_on_history(question, history):
+		logger.debug("Question depends on conversation history; bypassing answer cache")
+		answer_cache.record_skip()
+		return None
+	return question_vector if question_vector is not None else answer_cache.embed_question(question)
+
+
+def _store_cached_answer(pdf_id: int, question: str, answer: str, started: float, vector):
+	if vector is not None and answer and answer != LLM_ERROR_ANSWER:
+		answer_cache.store(pdf_id, question, answer, time.perf_counter() - started, vector=vector)
+
+
+def ask_question(
+	graph: Any, question: str, thread_id: str, pdf_id: Optional[int] = None, question_vector=None
+) -> str:
+	"""Invoke the graph with a question and thread id, returning the answer string.
+	With pdf_id, similar earlier questions about the same PDF are answered from the semantic cache.
+	question_vector is the question's stored embedding (FileChatDB.add_message returns it), reused
+	for the answer cache and history selection instead of embedding the question again.
+	Node timings, tokens and errors are recorded per question (see src.utils.metrics)."""
+	logger.info(f"Asking question: {question}")
+	logger.debug(f"Thread ID: {thread_id}")
 	
-	# Pass configurable thread_id for checkpointer state management
-	try:
-		result = graph.invoke(
-			initial_state,
-			config={"configurable": {"thread_id": thread_id}}
-		)
-		answer = result.get("answer", "")
-		logger.info("Question answered successfully")
-		logger.debug(f"Answer: {answer}")
-		return answer
-	except Exception as e:
-		logger.error(f"Failed to answer question: {e}")
-		raise
-	
\ No newline at end of file
+	with track_request(thread_id, pdf_id):
+		# Recent chat history for conversation context; the messages table is the only history
+		history = _prior_messages(question, get_db().get_recent_messages(thread_id, HISTORY_WINDOW + 1))
+		started = time.perf_counter()
+		cache_vector = _answer_cache_vector(pdf_id, question, history, question_vector)
+		if cache_vector is not None:
+			cached = answer_cache.lookup(pdf_id, question, vector=cache_vector)
+			if cached is not None:
+				record_outcome("cached")
+				return cached
+		known_vector = cache_vector if cache_vector is not None else question_vector
+		initial_state = _initial_state(question, history, _history_question_vector(question, history, known_vector))
+	
+		# Pass configurable thread_id for checkpointer state management
+		try:
+			result = graph.invoke(
+				initial_state,
+				config={"configurable": {"thread_id": thread_id}}
+			)
+			answer = result.get("answer", "")
+			logger.info("Question answered successfully")
+			logger.debug(f"Answer: {answer}")
+			_store_cached_answer(pdf_id, question, answer, started, cache_vector)
+			return answer
+		except Exception as e:
+			logger.error(f"Failed to answer question: {e}")
+			raise
+
+
+def ask_question_stream(
+	graph: Any, question: str, thread_id: str, pdf_id: Optional[int] = None, question_vector=None
+) -> Iterator[str]:
+	"""Stream the graph's answer for a question, yielding tokens as the LLM produces them.
+	The final state is checkpointed exactly as with ask_question; cached answers arrive whole."""
+	logger.info(f"Asking question (streaming): {question}")
+	logger.debug(f"Thread ID: {thread_id}")
+	
+	with track_request(thread_id, pdf_id):
+		# Recent chat history for conversation context; the messages table is the only history
+		history = _prior_messages(question, get_db().get_recent_messages(thread_id, HISTORY_WINDOW + 1))
+		start = time.perf_counter()
+		cache_vector = _answer_cache_vector(pdf_id, question, history, question_vector)
+		if cache_vector is not None:
+			cached = answer_cache.lookup(pdf_id, question, vector=cache_vector)
+			if cached is not None:
+				record_outcome("cached")
+				yield cached
+				return
+		known_vector = cache_vector if cache_vector is not None else question_vector
+		initial_state = _initial_state(question, history, _history_question_vector(question, history, known_vector))
+		streamed = False
+		final_answer = ""
+		try:
+			for mode, payload in graph.stream(
+				initial_state,
+				config={"configurable": {"thread_id": thread_id}},
+				stream_mode=["messages", "values"],
+			):
+				if mode == "values":
+					final_answer = payload.get("answer", final_answer)
+					continue
+				chunk, metadata = payload
+				# Only answer tokens; the query rewriter's output is internal
+				if metadata.get("langgraph_node") != "LLM_ANSWER" or not chunk.content:
+					continue
+				if not streamed:
+					streamed = True
+					logger.info(f"First answer token after {time.perf_counter() - start:.2f}s")
+				yield chunk.content
+		except Exception as e:
+			logger.error(f"Failed to stream answer: {e}")
+			raise
+	
+		# Fallback answers (no question, LLM error) never go through the model
+		if not streamed and final_answer:
+			yield final_answer
+		_store_cached_answer(pdf_id, question, final_answer, start, cache_vector)
+		logger.info(f"Question answered successfully in {time.perf_counter() - start:.2f}s")
+
+
+async def aask_question(
+	graph: Any, question: str, thread_id: str, pdf_id: Optional[int] = None, question_vector=None
+) -> str:
+	"""Async counterpart of ask_question for graphs built with abuild_graph_from_documents."""
+	logger.info(f"Asking question (async): {question}")
+	logger.debug(f"Thread ID: {thread_id}")
+	
+	with track_request(thread_id, pdf_id):
+		from src.db.async_database import get_async_db
+		history = _prior_messages(question, await get_async_db().get_recent_messages(thread_id, HISTORY_WINDOW + 1))
+		started = time.perf_counter()
+		cache_vector = await asyncio.to_thread(_answer_cache_vector, pdf_id, question, history, question_vector)
+		if cache_vector is not None:
+			cached = await asyncio.to_thread(answer_cache.lookup, pdf_id, question, cache_vector)
+			if cached is not None:
+				record_outcome("cached")
+				return cached
+		known_vector = cache_vector if cache_vector is not None else question_vector
+		history_vector = await asyncio.to_thread(_history_question_vector, question, history, known_vector)
+		initial_state = _initial_state(question, history, history_vector)
+	
+		try:
+			result = await graph.ainvoke(
+				initial_state,
+				config={"configurable": {"thread_id": thread_id}}
+			)
+			answer = result.get("answer", "")
+			logger.info("Question answered successfully")
+			logger.debug(f"Answer: {answer}")
+			await asyncio.to_thread(_store_cached_answer, pdf_id, question, answer, started, cache_vector)
+			return answer
+		except Exception as e:
+			logger.error(f"Failed to answer question: {e}")
+			raise
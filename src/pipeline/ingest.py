@@ -0,0 +1,164 @@
+"""Bulk ingestion: pre-index a directory of PDFs without the UI.
+
+    python -m src.pipeline.ingest <directory> [--workers N]
+
+Each PDF is parsed, chunked, embedded and indexed with the streaming pipeline;
+its FAISS and lexical indexes are written under INDEX_DIR and its chunks to the
+chunks table, the same storage the app reads when a thread is opened. PDFs whose
+content hash is already in pdfs with a fresh index are skipped. A PDF's row is
+only written once its index is saved, so rerunning after a crash resumes with
+the unfinished files (already embedded chunks come from the embedding cache).
+"""
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, List
+
+from src.db.database import get_db
+from src.loader.pdf_loader import iter_pdf_pages
+from src.pipeline.core import index_pdf_bytes
+from src.vector_store.index_store import has_vector_store, load_or_build_lexical_index
+from src.utils.logger import setup_logging
+from config import INGEST_WORKERS, PDF_PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+STAGES = (("parse", "pages"), ("split", "chunks"), ("embed", "embedded"))
+
+
+def find_pdfs(directory: str) -> List[str]:
+    """PDF paths under a directory, recursively, in a stable order."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+def ingest_file(path: str, parse_workers: int = PDF_PARSE_WORKERS) -> Dict:
+    """Index one PDF and store it; returns its status and pipeline stats."""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    # Same key as uploads in app.py, so the app finds bulk-ingested PDFs
+    content_hash = hashlib.md5(data).hexdigest()
+    result = {"path": path, "content_hash": content_hash}
+    if get_db().get_pdf_id_by_content_hash(content_hash) is not None and has_vector_store(content_hash):
+        return {**result, "status": "skipped"}
+
+    stats = {}
+    name = os.path.basename(path)
+    vectorstore, chunks, rebuilt = index_pdf_bytes(
+        name, data,
+        index_key=content_hash,
+        page_streamer=partial(iter_pdf_pages, workers=parse_workers),
+        stats=stats,
+    )
+    load_or_build_lexical_index(content_hash, vectorstore)
+    pdf_id = get_db().store_pdf(
+        name, content_hash,
+        [chunk.page_content for chunk in chunks],
+        [chunk.metadata.get("page") for chunk in chunks],
+        replace_chunks=rebuilt,  # A re-split index has new chunk ids
+    )
+    return {
+        **result,
+        "status": "indexed" if rebuilt else "reused",
+        "pdf_id": pdf_id,
+        "chunks": len(chunks),
+        "stats": stats,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _init_worker():
+    setup_logging(log_file="ingest.log")
+
+
+def _rate(count: float, seconds: float) -> str:
+    return f"{count / seconds:.1f}/s" if seconds > 0 else "-"
+
+
+def _print_result(result: Dict, done: int, total: int):
+    prefix = f"[{done}/{total}] {result['path']}"
+    if result["status"] == "failed":
+        print(f"{prefix}: FAILED ({result['error']})")
+    elif result["status"] == "skipped":
+        print(f"{prefix}: already indexed")
+    elif result["status"] == "reused":
+        print(f"{prefix}: stored from existing index ({result['chunks']} chunks)")
+    else:
+        stats = result["stats"]
+        print(
+            f"{prefix}: {stats['pages']} pages, {stats['chunks']} chunks in {result['seconds']:.1f}s "
+            f"(parse {_rate(stats['pages'], stats['parse_seconds'])}, "
+            f"split {_rate(stats['chunks'], stats['split_seconds'])}, "
+            f"embed {_rate(stats['embedded'], stats['embed_seconds'])})"
+        )
+
+
+def _print_summary(results: List[Dict], elapsed: float):
+    indexed = [result for result in results if result["status"] == "indexed"]
+    counts = {status: sum(1 for result in results if result["status"] == status)
+              for status in ("indexed", "reused", "skipped", "failed")}
+    print(f"\n{len(results)} PDFs in {elapsed:.1f}s: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    if not indexed:
+        return
+    for stage, unit in STAGES:
+        count = sum(result["stats"][unit] for result in indexed)
+        busy = sum(result["stats"][f"{stage}_seconds"] for result in indexed)
+        label = "embeddings" if unit == "embedded" else unit
+        # Busy rate is per worker; wall rate is what the whole run achieved
+        print(f"  {stage:<6} {count:>8} {label:<10} {_rate(count, busy):>10} busy  {_rate(count, elapsed):>10} wall")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory to scan for PDFs, recursively")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="PDFs processed concurrently")
+    args = parser.parse_args(argv)
+
+    setup_logging(log_file="ingest.log")
+    paths = find_pdfs(args.directory)
+    print(f"Found {len(paths)} PDFs under {args.directory}")
+    if not paths:
+        return 0
+
+    start = time.perf_counter()
+    results = []
+
+    def record(result: Dict):
+        results.append(result)
+        _print_result(result, len(results), len(paths))
+
+    if args.workers <= 1:
+        # One PDF at a time, each free to parse large PDFs across PDF_PARSE_WORKERS processes
+        for path in paths:
+            try:
+                record(ingest_file(path))
+            except Exception as e:
+                logger.exception(f"Failed to ingest {path}")
+                record({"path": path, "status": "failed", "error": str(e)})
+    else:
+        # Files are the unit of parallelism here, so each is parsed in its worker process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = {pool.submit(ingest_file, path, 1): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    record(future.result())
+                except Exception as e:
+                    logger.error(f"Failed to ingest {futures[future]}: {e}")
+                    record({"path": futures[future], "status": "failed", "error": str(e)})
+
+    _print_summary(results, time.perf_counter() - start)
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
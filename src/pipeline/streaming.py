@@ -0,0 +1,138 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from src.splitter.semantic_chunker import iter_chunks
+from src.vector_store.faiss_store import add_chunks_to_vector_store, finalize_vector_store
+from config import INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _StageFailed:
+    """Carries a producer stage's exception to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _run_stage(name: str, produce: Callable[[], Iterator], out: queue.Queue, stop: threading.Event) -> threading.Thread:
+    """Run produce() in a daemon thread, feeding its items into a bounded queue.
+    Blocks while the queue is full and gives up once stop is set."""
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for item in produce():
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # Re-raised in the consuming thread
+            put(_StageFailed(e))
+
+    thread = threading.Thread(target=worker, name=f"ingest-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterator:
+    """Yield a stage's items until it finishes, re-raising its failure."""
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _StageFailed):
+            raise item.error
+        yield item
+
+
+def stream_vector_store(
+    pages: Iterable[Document],
+    *,
+    batch_size: int = INGEST_BATCH_SIZE,
+    queue_size: int = INGEST_QUEUE_SIZE,
+    stats: Optional[Dict[str, float]] = None,
+) -> Optional[FAISS]:
+    """Build a vector store from lazily parsed pages with overlapping stages.
+
+    Parsing (iterating pages), splitting and embedding + indexing run concurrently,
+    connected by bounded queues, so only a few pages and chunk batches are held
+    in flight at once; no page is kept once it has been split. Returns the vector
+    store, or None for a PDF without text.
+
+    When a stats dict is given it is filled with counts (pages, chunks, cache_hits,
+    embedded: embedding cache misses) and the seconds each stage spent busy, excluding
+    time blocked on its queues.
+    """
+    stats = {} if stats is None else stats
+    stats.update(pages=0, chunks=0, cache_hits=0, embedded=0, parse_seconds=0.0, split_seconds=0.0, embed_seconds=0.0)
+    stop = threading.Event()
+    page_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    batch_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    def parse():
+        source = iter(pages)
+        while True:
+            began = time.perf_counter()
+            page = next(source, None)
+            stats["parse_seconds"] += time.perf_counter() - began
+            if page is None:
+                return
+            stats["pages"] += 1
+            yield page
+
+    def split():
+        batch = []
+        for page in _drain(page_queue, stop):
+            began = time.perf_counter()
+            page_chunks = list(iter_chunks([page]))
+            stats["split_seconds"] += time.perf_counter() - began
+            for chunk in page_chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    start = time.perf_counter()
+    stages = [_run_stage("parse", parse, page_queue, stop), _run_stage("split", split, batch_queue, stop)]
+    vectorstore = None
+    cache_stats = {"hits": 0, "misses": 0}
+    try:
+        for batch in _drain(batch_queue, stop):
+            began = time.perf_counter()
+            vectorstore = add_chunks_to_vector_store(vectorstore, batch, cache_stats)
+            stats["embed_seconds"] += time.perf_counter() - began
+            stats["chunks"] += len(batch)
+            logger.debug(f"Indexed {stats['chunks']} chunks, {stats['pages']} pages parsed so far")
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join()
+
+    began = time.perf_counter()
+    vectorstore = finalize_vector_store(vectorstore)
+    stats["embed_seconds"] += time.perf_counter() - began
+    stats["cache_hits"], stats["embedded"] = cache_stats["hits"], cache_stats["misses"]
+    stats["seconds"] = time.perf_counter() - start
+    logger.info(f"Streamed {stats['pages']} pages into {stats['chunks']} indexed chunks in {stats['seconds']:.2f}s")
+    logger.info(f"Embedding cache: {stats['cache_hits']} hits, {stats['embedded']} misses")
+    return vectorstore
@@ -0,0 +1,54 @@
+import logging
+from typing import Dict, List, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from config import HYBRID_CANDIDATES, RRF_K
+from src.retrieval.lexical import LexicalIndex
+from src.vector_store.faiss_store import batch_similarity_search
+
+logger = logging.getLogger(__name__)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = RRF_K) -> Dict[str, float]:
+    """Fuse ranked id lists: each list adds 1 / (rrf_k + rank) to an id's score."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return scores
+
+
+def hybrid_search(
+    vectorstore: FAISS,
+    lexical_index: LexicalIndex,
+    queries: List[str],
+    k: int = 4,
+    candidates: int = HYBRID_CANDIDATES,
+    rrf_k: int = RRF_K,
+) -> List[List[Tuple[str, Document, float]]]:
+    """Batched dense + BM25 search fused with reciprocal rank fusion.
+    Same shape as batch_similarity_search; scores are fused RRF scores."""
+    if not queries:
+        return []
+    depth = max(k, candidates)
+    dense = batch_similarity_search(vectorstore, queries, k=depth)
+    lexical = lexical_index.search(queries, depth)
+
+    results = []
+    for dense_hits, lexical_hits in zip(dense, lexical):
+        documents = {chunk_id: doc for chunk_id, doc, _ in dense_hits}
+        lexical_ids = [vectorstore.index_to_docstore_id[row] for row, _ in lexical_hits]
+        fused = reciprocal_rank_fusion([[chunk_id for chunk_id, _, _ in dense_hits], lexical_ids], rrf_k)
+
+        hits = []
+        for chunk_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]:
+            doc = documents.get(chunk_id) or vectorstore.docstore.search(chunk_id)
+            hits.append((chunk_id, doc, score))
+        logger.debug(
+            f"Hybrid search: {len(dense_hits)} dense + {len(lexical_hits)} lexical candidates, "
+            f"{sum(1 for chunk_id, _, _ in hits if chunk_id not in documents)} lexical-only hits kept"
+        )
+        results.append(hits)
+    return results
@@ -0,0 +1,215 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_FORMAT_VERSION = 2
+LEXICAL_FILE = "lexical.json"
+DF_FILE = "lexical_df.npy"
+BM25_FILE = "lexical_bm25.npz"
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Keeps part numbers and codes ("pn-4411", "e-102", "v2.1") as single terms
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours
+""".split())
+
+MAX_NEIGHBOR_TERMS = 5000  # Co-occurrence neighbors are kept for the most frequent informative terms
+NEIGHBORS_PER_TERM = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a text, stopwords included."""
+    return _TOKEN.findall(text.lower())
+
+
+def content_terms(text: str) -> List[str]:
+    """Terms of a text without stopwords, in order of appearance."""
+    return [term for term in tokenize(text) if term not in STOPWORDS]
+
+
+class LexicalIndex:
+    """Term statistics over a PDF's chunks, precomputed at ingest.
+
+    Holds the vocabulary, per-term document frequencies, a sparse chunk x term
+    matrix of BM25 weights (rows in FAISS index order) and, for frequent
+    informative terms, their strongest co-occurring neighbors.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        df: np.ndarray,
+        n_docs: int,
+        neighbors: Dict[str, List[str]],
+        bm25: Optional[sparse.csr_matrix] = None,
+    ):
+        self.vocab = vocab
+        self.df = df
+        self.n_docs = n_docs
+        self.neighbors = neighbors
+        self.bm25 = bm25 if bm25 is not None else sparse.csr_matrix((n_docs, len(vocab)), dtype=np.float32)
+
+    @classmethod
+    def build(cls, texts: List[str]) -> "LexicalIndex":
+        """Compute term statistics for a list of chunk texts."""
+        logger.info(f"Building lexical index over {len(texts)} chunks")
+        vocab: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = Counter(content_terms(text))
+            lengths[row] = sum(terms.values())
+            for term, count in terms.items():
+                rows.append(row)
+                cols.append(vocab.setdefault(term, len(vocab)))
+                counts.append(count)
+
+        # Chunk x term frequency matrix
+        tf = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)), shape=(len(texts), len(vocab))
+        )
+        incidence = tf.copy()
+        incidence.data[:] = 1.0
+        df = np.asarray(incidence.sum(axis=0)).ravel().astype(np.int32)
+        index = cls(vocab, df, len(texts), {})
+        index.bm25 = index._bm25_weights(tf, lengths)
+        index.neighbors = index._cooccurrence_neighbors(incidence)
+        logger.info(f"Lexical index built: {len(vocab)} terms, {len(index.neighbors)} with neighbors")
+        return index
+
+    def _bm25_weights(self, tf: sparse.csr_matrix, lengths: np.ndarray) -> sparse.csr_matrix:
+        """Precompute each (chunk, term) BM25 contribution, so a query only sums matrix columns."""
+        weights = tf.tocoo()
+        avg_length = float(lengths.mean()) if lengths.size and lengths.mean() > 0 else 1.0
+        # Lucene's idf, not BM25Okapi's: the +1 keeps terms in over half the chunks positive,
+        # so they add a little to a score rather than being floored or subtracted
+        idf = np.log((self.n_docs - self.df + 0.5) / (self.df + 0.5) + 1.0).astype(np.float32)
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / avg_length)
+        weights.data = idf[weights.col] * weights.data * (BM25_K1 + 1.0) / (weights.data + norm[weights.row])
+        return weights.tocsr()
+
+    def _cooccurrence_neighbors(self, incidence: sparse.csr_matrix) -> Dict[str, List[str]]:
+        """Top co-occurring terms per term, by cosine of their chunk-occurrence vectors."""
+        # Terms seen once say nothing about co-occurrence; terms in most chunks say little else
+        informative = np.where((self.df >= 2) & (self.df <= max(2, self.n_docs // 2)))[0]
+        if informative.size == 0:
+            return {}
+        informative = informative[np.argsort(-self.df[informative], kind="stable")[:MAX_NEIGHBOR_TERMS]]
+
+        sub = incidence[:, informative].tocsc()
+        cooccurrence = (sub.T @ sub).tocsr()
+        norms = np.sqrt(self.df[informative].astype(np.float32))
+        terms = self.terms()
+
+        neighbors = {}
+        for i in range(cooccurrence.shape[0]):
+            start, end = cooccurrence.indptr[i], cooccurrence.indptr[i + 1]
+            columns = cooccurrence.indices[start:end]
+            scores = cooccurrence.data[start:end] / (norms[i] * norms[columns])
+            scores[columns == i] = 0.0
+            top = columns[np.argsort(-scores, kind="stable")[:NEIGHBORS_PER_TERM]]
+            neighbors[terms[informative[i]]] = [terms[informative[j]] for j in top if j != i]
+        return neighbors
+
+    def terms(self) -> List[str]:
+        """Vocabulary in column order."""
+        terms = [""] * len(self.vocab)
+        for term, column in self.vocab.items():
+            terms[column] = term
+        return terms
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency as used in the BM25 weights (Lucene form); unseen terms score as maximally rare."""
+        column = self.vocab.get(term)
+        df = int(self.df[column]) if column is not None else 0
+        return math.log((self.n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: BM25 matrix, document frequencies and term strings."""
+        bm25 = self.bm25.data.nbytes + self.bm25.indices.nbytes + self.bm25.indptr.nbytes
+        terms = sum(len(term) + 64 for term in self.vocab)  # Plus dict and str object overhead
+        neighbors = sum(8 * len(related) for related in self.neighbors.values())
+        return bm25 + self.df.nbytes + terms + neighbors
+
+    def search(self, queries: List[str], k: int) -> List[List[Tuple[int, float]]]:
+        """BM25 top-k for several queries at once.
+        Returns, per query, (row, score) pairs with higher scores more relevant; rows
+        without any query term are never returned."""
+        rows, cols = [], []
+        for row, query in enumerate(queries):
+            for term in set(content_terms(query)):
+                column = self.vocab.get(term)
+                if column is not None:
+                    rows.append(row)
+                    cols.append(column)
+        query_terms = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(queries), len(self.vocab))
+        )
+        # chunks x queries; only chunks sharing a term with a query get a stored score
+        scores = (self.bm25 @ query_terms.T).tocsc()
+
+        results = []
+        for i in range(len(queries)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            chunk_rows, chunk_scores = scores.indices[start:end], scores.data[start:end]
+            if chunk_rows.size > k:
+                top = np.argpartition(-chunk_scores, k - 1)[:k]
+                chunk_rows, chunk_scores = chunk_rows[top], chunk_scores[top]
+            order = np.argsort(-chunk_scores, kind="stable")
+            results.append([(int(chunk_rows[j]), float(chunk_scores[j])) for j in order])
+        return results
+
+    def save(self, directory: str):
+        """Write the index files into an index directory."""
+        np.save(os.path.join(directory, DF_FILE), self.df)
+        sparse.save_npz(os.path.join(directory, BM25_FILE), self.bm25.tocsr())
+        with open(os.path.join(directory, LEXICAL_FILE), "w") as f:
+            json.dump({
+                "format_version": LEXICAL_FORMAT_VERSION,
+                "n_docs": self.n_docs,
+                "terms": self.terms(),
+                "neighbors": self.neighbors,
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["LexicalIndex"]:
+        """Read the index files from an index directory, or None if absent or outdated."""
+        path = os.path.join(directory, LEXICAL_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("format_version") != LEXICAL_FORMAT_VERSION:
+            return None
+        vocab = {term: column for column, term in enumerate(data["terms"])}
+        df = np.load(os.path.join(directory, DF_FILE))
+        bm25 = sparse.load_npz(os.path.join(directory, BM25_FILE)).tocsr()
+        return cls(vocab, df, data["n_docs"], data["neighbors"], bm25)
+
+
+def term_counts(texts: List[str]) -> Counter:
+    """Content-term frequencies across texts."""
+    counts = Counter()
+    for text in texts:
+        counts.update(content_terms(text))
+    return counts
@@ -0,0 +1,96 @@
+import logging
+import math
+from typing import Dict, List, Optional
+
+from src.retrieval.lexical import LexicalIndex, content_terms, term_counts
+
+logger = logging.getLogger(__name__)
+
+# "llm" asks the chat model for paraphrases; the others run locally with no network call
+QUERY_EXPANSION_STRATEGIES = ("llm", "prf", "keywords", "none")
+
+# Strategies that expand from the original question's retrieved chunks
+FEEDBACK_STRATEGIES = ("prf",)
+
+
+def _dedupe(question: str, candidates: List[str], n: int) -> List[str]:
+    seen = {question.strip().lower()}
+    alternatives = []
+    for candidate in candidates:
+        candidate = " ".join(candidate.split())
+        if candidate and candidate.lower() not in seen:
+            seen.add(candidate.lower())
+            alternatives.append(candidate)
+    return alternatives[:n]
+
+
+def _keywords(question: str, lexical_index: Optional[LexicalIndex], limit: int = 6) -> List[str]:
+    """The question's content terms, rarest (most informative) first."""
+    terms = list(dict.fromkeys(content_terms(question)))
+    if lexical_index is not None:
+        terms.sort(key=lexical_index.idf, reverse=True)
+    return terms[:limit]
+
+
+def prf_expansions(
+    question: str,
+    hits: List[Dict],
+    lexical_index: Optional[LexicalIndex] = None,
+    n: int = 3,
+    feedback_docs: int = 3,
+) -> List[str]:
+    """Pseudo-relevance feedback: add the terms that best characterize the
+    original question's top chunks (frequency there times corpus rarity)."""
+    feedback = [hit["content"] for hit in hits[:feedback_docs]]
+    if not feedback:
+        return []
+
+    counts = term_counts(feedback)
+    question_terms = set(content_terms(question))
+    if lexical_index is not None:
+        idf = lexical_index.idf
+    else:
+        # Without ingest statistics, rarity is judged within the feedback chunks
+        doc_counts = term_counts([" ".join(set(content_terms(text))) for text in feedback])
+        idf = lambda term: math.log(1.0 + len(feedback) / doc_counts[term])  # noqa: E731
+
+    scored = sorted(
+        (term for term in counts if term not in question_terms and not term.isdigit()),
+        key=lambda term: counts[term] * idf(term),
+        reverse=True,
+    )
+    if not scored:
+        return []
+    keywords = " ".join(_keywords(question, lexical_index))
+    candidates = [
+        f"{question} {' '.join(scored[:3])}",
+        f"{question} {' '.join(scored[3:6])}",
+        f"{keywords} {' '.join(scored[:6])}",
+    ]
+    return _dedupe(question, candidates, n)
+
+
+def keyword_expansions(question: str, lexical_index: Optional[LexicalIndex], n: int = 3) -> List[str]:
+    """Keyword expansion from ingest-time statistics: the question's rarest terms,
+    plus the terms that most often co-occur with them in this PDF."""
+    if lexical_index is None:
+        return []
+    keywords = [term for term in _keywords(question, lexical_index) if term in lexical_index.vocab]
+    if not keywords:
+        return []
+
+    candidates = [" ".join(keywords)]
+    for term in keywords[:n - 1]:
+        related = [other for other in lexical_index.neighbors.get(term, []) if other not in keywords][:3]
+        if related:
+            candidates.append(f"{question} {' '.join(related)}")
+    return _dedupe(question, candidates, n)
+
+
+def expand_query(strategy: str, question: str, hits: List[Dict], lexical_index: Optional[LexicalIndex]) -> List[str]:
+    """Alternative queries from a local strategy."""
+    if strategy == "prf":
+        return prf_expansions(question, hits, lexical_index)
+    if strategy == "keywords":
+        return keyword_expansions(question, lexical_index)
+    return []
@@ -1,17 +1,40 @@
 import logging
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.llm.prompt_packer import count_tokens
+from config import CHUNK_SIZE, CHUNK_OVERLAP
 
 logger = logging.getLogger(__name__)
 
- 
+
+def _make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+    )
+
+
+def _with_token_counts(chunks):
+    """Record each chunk's token count in its metadata, so prompts are packed without re-tokenizing."""
+    for chunk in chunks:
+        chunk.metadata["tokens"] = count_tokens(chunk.page_content)
+    return chunks
+
+
 def split_pdf_into_chunks(docs):
     """Split documents into chunks using stable text splitter."""
     logger.info(f"Splitting {len(docs)} documents into chunks")
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-    )
-    chunks = splitter.split_documents(docs)
+    splitter = _make_splitter()
+    chunks = _with_token_counts(splitter.split_documents(docs))
     logger.info(f"Created {len(chunks)} chunks from {len(docs)} documents")
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+def iter_chunks(docs: Iterable[Document]) -> Iterator[Document]:
+    """Lazily split documents as they arrive; yields the same chunks as split_pdf_into_chunks."""
+    splitter = _make_splitter()
+    for doc in docs:
+        yield from _with_token_counts(splitter.split_documents([doc]))
@@ -0,0 +1,490 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from config import METRICS_ENABLED, METRICS_DB_PATH, METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# name: (type, help, histogram bucket bounds)
+FAMILIES = {
+    "filechat_request_seconds": ("histogram", "Wall time of questions, from history lookup to answer.", SECONDS_BUCKETS),
+    "filechat_requests_total": ("counter", "Questions by outcome: answered, cached or error.", None),
+    "filechat_node_seconds": ("histogram", "Wall time of QA graph nodes.", SECONDS_BUCKETS),
+    "filechat_node_errors_total": ("counter", "Errors raised or handled inside QA graph nodes.", None),
+    "filechat_retrieved_chunks": ("histogram", "Chunks returned by retrieval nodes.", COUNT_BUCKETS),
+    "filechat_llm_tokens_total": ("counter", "LLM tokens by node and kind (prompt or completion).", None),
+    "filechat_operation_seconds": ("histogram", "Wall time of database, checkpoint and embedding calls.", SECONDS_BUCKETS),
+}
+
+# The question being answered and the graph node running, if any
+_request: contextvars.ContextVar[Optional["RequestMetrics"]] = contextvars.ContextVar("filechat_request", default=None)
+_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("filechat_node", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram: one bisect and two additions per observation."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Process-wide histograms and counters from FAMILIES, keyed by label values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(FAMILIES[name][2])
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        """Current values by family: labels plus count/sum/buckets for histograms, value for counters."""
+        snapshot: Dict[str, List[dict]] = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                snapshot.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": sum(histogram.counts),
+                    "sum": histogram.sum,
+                    "buckets": dict(zip([*map(str, histogram.bounds), "+Inf"], histogram.counts)),
+                })
+            for (name, labels), value in sorted(self._counters.items()):
+                snapshot.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted((key, list(h.counts), h.sum) for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        for name, (kind, help_text, bounds) in FAMILIES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (family, labels), counts, total in histograms:
+                    if family != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip([*map(_format_value, bounds), "+Inf"], counts):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f"{name}_bucket{_label_text(labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_label_text(labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_label_text(labels)} {cumulative}")
+            else:
+                for (family, labels), value in counters:
+                    if family == name:
+                        lines.append(f"{name}{_label_text(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class RequestMetrics:
+    """Measurements of one question, filled in as it runs and persisted when it ends."""
+
+    def __init__(self, thread_id: str, pdf_id: Optional[int]):
+        self.request_id = uuid4().hex
+        self.thread_id = thread_id
+        self.pdf_id = pdf_id
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.outcome = "answered"
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retrieved_chunks = 0
+        self.nodes: Dict[str, dict] = {}
+        self.operations: Dict[str, List[float]] = {}  # operation: [calls, seconds]
+        self.errors: List[str] = []
+        # Parallel graph nodes report from different threads
+        self._lock = threading.Lock()
+
+    def add_node(self, name: str, seconds: float, chunks: Optional[int]):
+        with self._lock:
+            node = self.nodes.setdefault(name, {"seconds": 0.0})
+            node["seconds"] += seconds
+            if chunks is not None:
+                node["chunks"] = chunks
+
+    def add_operation(self, operation: str, seconds: float):
+        with self._lock:
+            calls = self.operations.setdefault(operation, [0, 0.0])
+            calls[0] += 1
+            calls[1] += seconds
+
+    def add_tokens(self, prompt: int, completion: int):
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+    def add_error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+    def row(self) -> tuple:
+        operations = {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.operations.items()}
+        return (
+            self.request_id, self.thread_id, self.pdf_id, self.created_at, self.seconds, self.outcome,
+            self.prompt_tokens, self.completion_tokens, self.retrieved_chunks, len(self.errors),
+            json.dumps(self.errors) if self.errors else None, json.dumps(self.nodes), json.dumps(operations),
+        )
+
+
+class MetricsStore:
+    """Per-request rows in SQLite, written by a background thread so requests never wait on disk."""
+
+    COLUMNS = (
+        "request_id", "thread_id", "pdf_id", "created_at", "seconds", "outcome", "prompt_tokens",
+        "completion_tokens", "retrieved_chunks", "error_count", "errors", "nodes", "operations",
+    )
+
+    def __init__(self, db_path: str = METRICS_DB_PATH):
+        self.db_path = db_path
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._initialized = False  # Table created on first use, not at import
+
+    def init_database(self):
+        """Initialize the request metrics table"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS request_metrics (
+                    request_id TEXT PRIMARY KEY,
+                    thread_id TEXT NOT NULL,
+                    pdf_id INTEGER,
+                    created_at REAL NOT NULL,
+                    seconds REAL NOT NULL,
+                    outcome TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    retrieved_chunks INTEGER NOT NULL,
+                    error_count INTEGER NOT NULL,
+                    errors TEXT,
+                    nodes TEXT NOT NULL,
+                    operations TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_request_metrics_created ON request_metrics (created_at)")
+            conn.commit()
+            self._initialized = True
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.init_database()
+        return sqlite3.connect(self.db_path)
+
+    def record(self, request: RequestMetrics):
+        """Queue a finished request for writing."""
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+        self._queue.put(request.row())
+
+    def _write_loop(self):
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        query = f"INSERT OR REPLACE INTO request_metrics ({', '.join(self.COLUMNS)}) VALUES ({placeholders})"
+        while True:
+            rows = [self._queue.get()]
+            # Everything already queued goes in the same transaction
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn = self._connect()
+                try:
+                    conn.executemany(query, rows)
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"Failed to persist metrics for {len(rows)} requests: {e}")
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every queued request is written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """The latest persisted requests, newest first, with JSON columns decoded."""
+        self.flush()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM request_metrics ORDER BY created_at DESC LIMIT ?", (limit,)
+            )
+            rows = [dict(zip(self.COLUMNS, row)) for row in cursor]
+        finally:
+            conn.close()
+        for row in rows:
+            for column in ("errors", "nodes", "operations"):
+                row[column] = json.loads(row[column]) if row[column] else ([] if column == "errors" else {})
+        return rows
+
+
+# Global metrics instances
+metrics = MetricsRegistry()
+metrics_store = MetricsStore()
+
+
+@contextmanager
+def track_request(thread_id: str, pdf_id: Optional[int] = None) -> Iterator[Optional[RequestMetrics]]:
+    """Scope one question: graph nodes and timed calls inside it add to its RequestMetrics,
+    which is recorded in the histograms and persisted when the block exits."""
+    if not METRICS_ENABLED:
+        yield None
+        return
+    request = RequestMetrics(thread_id, pdf_id)
+    token = _request.set(request)
+    try:
+        yield request
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            request.outcome = "error"
+            request.add_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        try:
+            _request.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context
+            pass
+        request.seconds = time.perf_counter() - request.started
+        metrics.observe("filechat_request_seconds", request.seconds, outcome=request.outcome)
+        metrics.inc("filechat_requests_total", outcome=request.outcome)
+        metrics_store.record(request)
+
+
+def record_outcome(outcome: str):
+    """Set the current request's outcome, e.g. "cached" for an answer cache hit."""
+    request = _request.get()
+    if request is not None:
+        request.outcome = outcome
+
+
+def record_error(exc: BaseException):
+    """Count an error handled inside a graph node, which would otherwise leave no trace but a log line."""
+    if not METRICS_ENABLED:
+        return
+    node = _node.get() or "unknown"
+    metrics.inc("filechat_node_errors_total", node=node, error=type(exc).__name__)
+    request = _request.get()
+    if request is not None:
+        request.add_error(f"{node}: {type(exc).__name__}: {exc}")
+
+
+def record_llm_usage(response: Any):
+    """Count the prompt and completion tokens an LLM response reports, against the running node."""
+    usage = getattr(response, "usage_metadata", None)
+    if not METRICS_ENABLED or not usage:
+        return
+    prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    node = _node.get() or "unknown"
+    metrics.inc("filechat_llm_tokens_total", prompt, node=node, kind="prompt")
+    metrics.inc("filechat_llm_tokens_total", completion, node=node, kind="completion")
+    request = _request.get()
+    if request is not None:
+        request.add_tokens(prompt, completion)
+
+
+def _retrieved_chunks(result: Any) -> Optional[int]:
+    if isinstance(result, dict):
+        for key in ("hits", "question_hits", "alternative_hits"):
+            if key in result:
+                return len(result[key])
+    return None
+
+
+def _node_done(name: str, seconds: float, result: Any):
+    metrics.observe("filechat_node_seconds", seconds, node=name)
+    chunks = _retrieved_chunks(result)
+    if chunks is not None:
+        metrics.observe("filechat_retrieved_chunks", chunks, node=name)
+    request = _request.get()
+    if request is not None:
+        request.add_node(name, seconds, chunks)
+        if isinstance(result, dict) and "hits" in result:
+            request.retrieved_chunks = chunks
+
+
+def instrument_node(name: str, node):
+    """Wrap a graph node function (sync or async) to record its wall time, retrieved
+    chunks and errors, and to label the LLM tokens and errors recorded inside it."""
+    if not METRICS_ENABLED:
+        return node
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def instrumented(state):
+            token = _node.set(name)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await node(state)
+                return result
+            except Exception as e:
+                record_error(e)
+                raise
+            finally:
+                _node.reset(token)
+                _node_done(name, time.perf_counter() - start, result)
+    else:
+        @functools.wraps(node)
+        def instrumented(state):
+            token = _node.set(name)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = node(state)
+                return result
+            except Exception as e:
+                record_error(e)
+                raise
+            finally:
+                _node.reset(token)
+                _node_done(name, time.perf_counter() - start, result)
+    return instrumented
+
+
+def _operation_done(operation: str, seconds: float):
+    metrics.observe("filechat_operation_seconds", seconds, operation=operation)
+    request = _request.get()
+    if request is not None:
+        request.add_operation(operation, seconds)
+
+
+def timed(operation: str):
+    """Decorator recording a function's (or coroutine's) wall time as filechat_operation_seconds."""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _operation_done(operation, time.perf_counter() - start)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _operation_done(operation, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve render_prometheus() on http://host:port/metrics from a daemon thread, once per process.
+    Returns the server, or None when port is 0 or the port cannot be bound."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def log_message(self, format, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = metrics.render_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            try:
+                server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+            _server = server
+    return _server
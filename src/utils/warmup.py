@@ -0,0 +1,42 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from config import get_embeddings
+from src.db.database import get_db
+from src.llm.llm import get_llm
+
+logger = logging.getLogger(__name__)
+
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+
+def warm_up():
+    """Construct the database, embedding model and LLM client ahead of the first request."""
+    start = time.perf_counter()
+    for name, load in (
+        ("database", get_db),
+        # The first query also loads the tokenizer and weights
+        ("embeddings", lambda: get_embeddings().embed_query("warm up")),
+        ("llm", get_llm),
+    ):
+        step = time.perf_counter()
+        try:
+            load()
+            logger.info(f"Warm-up: {name} ready in {time.perf_counter() - step:.2f}s")
+        except Exception as e:
+            # The request that needs it will construct it again and surface the error
+            logger.warning(f"Warm-up: {name} failed: {e}")
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+
+def start_warm_up() -> threading.Thread:
+    """Run warm_up in a background daemon thread, once per process."""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+            _thread.start()
+    return _thread
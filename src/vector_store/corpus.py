@@ -0,0 +1,257 @@
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config import get_embeddings, FAISS_INDEX_TYPE, FAISS_METRIC, FAISS_ANN_MIN_VECTORS
+from src.vector_store.embedding_cache import cached_emb
+from src.vector_store.embedding_engine import encode_texts
+from src.vector_store.faiss_store import build_faiss_index
+from src.vector_store.index_store import vector_store_chunks
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(pdf_id: int, ordinal: int) -> str:
+    """Corpus-wide id of a PDF's chunk."""
+    return f"{pdf_id}:{ordinal}"
+
+
+def _index_vectors(index: faiss.Index, positions: np.ndarray, texts: List[str], metric: str) -> np.ndarray:
+    """The vectors at positions of an index: read back from flat and HNSW indexes, which
+    hold them exactly, and re-embedded from texts through the embedding cache for compressed ones."""
+    if isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat)):
+        return index.reconstruct_batch(positions)
+    vectors = cached_emb.embed_array(texts)
+    if metric == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _store_vectors(vectorstore: FAISS, texts: List[str], metric: str) -> np.ndarray:
+    """A store's vectors in id order."""
+    return _index_vectors(vectorstore.index, np.arange(vectorstore.index.ntotal), texts, metric)
+
+
+class CorpusIndex:
+    """One process-wide FAISS index over the vectors of every PDF in use.
+
+    Each PDF's vectors occupy a contiguous range of positions and its chunks are
+    held once, with pdf_id and chunk_id metadata. Searches are restricted to a
+    set of PDFs by an ID selector inside FAISS, so sessions on the same PDF share
+    one copy of its vectors. The index starts flat and is rebuilt as
+    FAISS_INDEX_TYPE once it holds FAISS_ANN_MIN_VECTORS vectors. Graphs hold a
+    reference to each PDF they search (acquire/release); the last release removes
+    the PDF, which compacts a flat index at once; ANN indexes keep the removed vectors, out of
+    every search scope, until they make up half of the index and it is rebuilt.
+    """
+
+    def __init__(
+        self, embeddings: Optional[Embeddings] = None, metric: str = FAISS_METRIC, index_type: str = FAISS_INDEX_TYPE
+    ):
+        self._embeddings = embeddings
+        self.metric = metric
+        self.index_type = index_type
+        self.index: Optional[faiss.Index] = None
+        self.docstore = InMemoryDocstore({})
+        self._chunk_ids: List[Optional[str]] = []  # Per position; None once removed
+        self._removed = 0
+        self._ranges: Dict[int, range] = {}
+        self._refs: Dict[int, int] = {}  # Graphs using each PDF's vectors
+        # FAISS must not search while vectors are added or the index is rebuilt
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings if self._embeddings is not None else get_embeddings()
+
+    def __contains__(self, pdf_id: int) -> bool:
+        return pdf_id in self._ranges
+
+    def __len__(self) -> int:
+        return len(self._chunk_ids) - self._removed
+
+    def acquire(self, pdf_id: int, vectorstore: Optional[FAISS] = None) -> bool:
+        """Take a reference to a PDF's vectors, copying them in from vectorstore when absent.
+        Returns False, taking none, when the PDF is absent and no vectorstore is given.
+        The PDF stays in the corpus until every reference is returned with release."""
+        with self._lock:
+            if pdf_id in self._ranges:
+                self._refs[pdf_id] += 1
+                return True
+        if vectorstore is None:
+            return False
+        chunks = vector_store_chunks(vectorstore)
+        vectors = _store_vectors(vectorstore, [chunk.page_content for chunk in chunks], self.metric)
+        with self._lock:
+            if pdf_id not in self._ranges:
+                self._add(pdf_id, chunks, vectors)
+            self._refs[pdf_id] = self._refs.get(pdf_id, 0) + 1
+        return True
+
+    def release(self, pdf_id: int):
+        """Return a reference taken with acquire; the last one drops the PDF's vectors and chunks."""
+        with self._lock:
+            count = self._refs.get(pdf_id, 0) - 1
+            if count > 0:
+                self._refs[pdf_id] = count
+                return
+            self._refs.pop(pdf_id, None)
+            self._remove(pdf_id)
+
+    def _add(self, pdf_id: int, chunks: List[Document], vectors: np.ndarray):
+        """Append a PDF's vectors and chunks; caller holds the lock."""
+        if self.index is None:
+            dim = vectors.shape[1]
+            self.index = faiss.IndexFlatIP(dim) if self.metric == "ip" else faiss.IndexFlatL2(dim)
+        start = len(self._chunk_ids)
+        ids = [chunk_id(pdf_id, ordinal) for ordinal in range(len(chunks))]
+        self.index.add(vectors)
+        self.docstore.add({
+            cid: Document(page_content=chunk.page_content, metadata={**chunk.metadata, "pdf_id": pdf_id, "chunk_id": cid})
+            for cid, chunk in zip(ids, chunks)
+        })
+        self._chunk_ids.extend(ids)
+        self._ranges[pdf_id] = range(start, start + len(ids))
+        if self.index_type != "flat" and isinstance(self.index, faiss.IndexFlat) and len(self) >= FAISS_ANN_MIN_VECTORS:
+            logger.info(f"Corpus index reached {len(self)} vectors; rebuilding it as {self.index_type}")
+            self.index = build_faiss_index(self.index.reconstruct_n(0, self.index.ntotal), self.index_type, self.metric)
+        logger.info(f"Added {len(ids)} chunks of PDF {pdf_id} to the corpus index ({len(self)} vectors)")
+
+    def _remove(self, pdf_id: int):
+        """Drop a PDF's vectors and chunks, so later searches scoped to it find nothing; caller holds the lock."""
+        positions = self._ranges.pop(pdf_id, None)
+        if positions is None:
+            return
+        self.docstore.delete([self._chunk_ids[position] for position in positions])
+        if isinstance(self.index, faiss.IndexFlat):
+            # Flat indexes renumber the vectors after the removed range
+            self.index.remove_ids(faiss.IDSelectorRange(positions.start, positions.stop))
+            del self._chunk_ids[positions.start:positions.stop]
+            for other, other_positions in self._ranges.items():
+                if other_positions.start >= positions.stop:
+                    self._ranges[other] = range(
+                        other_positions.start - len(positions), other_positions.stop - len(positions)
+                    )
+        else:
+            for position in positions:
+                self._chunk_ids[position] = None
+            self._removed += len(positions)
+            if 2 * self._removed >= len(self._chunk_ids):
+                self._rebuild()
+        logger.info(f"Removed PDF {pdf_id} from the corpus index ({len(self)} vectors)")
+
+    def _rebuild(self):
+        """Rebuild the index over the vectors still in use, renumbered contiguously; caller holds the lock."""
+        positions = np.asarray(
+            [position for _, kept in sorted(self._ranges.items(), key=lambda item: item[1].start) for position in kept],
+            dtype=np.int64,
+        )
+        if not len(positions):
+            self.index, self._chunk_ids, self._removed = None, [], 0
+            return
+        chunk_ids = [self._chunk_ids[position] for position in positions]
+        texts = [self.docstore.search(cid).page_content for cid in chunk_ids]
+        vectors = _index_vectors(self.index, positions, texts, self.metric)
+        index_type = self.index_type if len(positions) >= FAISS_ANN_MIN_VECTORS else "flat"
+        self.index = build_faiss_index(vectors, index_type, self.metric)
+        ranges, start = {}, 0
+        for pdf_id, kept in sorted(self._ranges.items(), key=lambda item: item[1].start):
+            ranges[pdf_id] = range(start, start + len(kept))
+            start += len(kept)
+        self._ranges, self._chunk_ids, self._removed = ranges, chunk_ids, 0
+        logger.info(f"Rebuilt the corpus index over {len(chunk_ids)} vectors")
+
+    def _bytes_per_vector(self) -> int:
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return ivf.code_size + 8  # Code plus stored id
+        if isinstance(self.index, faiss.IndexHNSW):
+            return 4 * self.index.d + 4 * self.index.hnsw.nb_neighbors(0)  # Vector plus base-layer links
+        return 4 * self.index.d
+
+    def nbytes(self, pdf_ids: Sequence[int]) -> int:
+        """Approximate memory held for the given PDFs: their vectors and chunk texts."""
+        with self._lock:
+            if self.index is None:
+                return 0
+            chunk_ids = self.chunk_ids(pdf_ids)
+            return len(chunk_ids) * self._bytes_per_vector() + sum(
+                len(self.docstore.search(cid).page_content.encode("utf-8")) for cid in chunk_ids
+            )
+
+    def chunk_ids(self, pdf_ids: Sequence[int]) -> List[str]:
+        """Chunk ids of the given PDFs, each PDF's in chunk order."""
+        return [self._chunk_ids[position] for pdf_id in pdf_ids for position in self._ranges.get(pdf_id, ())]
+
+    def _search_params(self, selector: faiss.IDSelector) -> faiss.SearchParameters:
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.index.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    def search(self, queries: List[str], k: int, pdf_ids: Sequence[int]) -> List[List[Tuple[str, Document, float]]]:
+        """Batched search over the given PDFs only; same shape as batch_similarity_search."""
+        if not queries:
+            return []
+        vectors = encode_texts(self.embeddings, queries)
+        if self.metric == "ip":
+            faiss.normalize_L2(vectors)
+
+        with self._lock:
+            ranges = [self._ranges[pdf_id] for pdf_id in pdf_ids if pdf_id in self._ranges]
+            size = sum(len(positions) for positions in ranges)
+            if not size:
+                return [[] for _ in queries]
+            if len(ranges) == 1:
+                selector = faiss.IDSelectorRange(ranges[0].start, ranges[0].stop)
+            else:
+                selector = faiss.IDSelectorBatch(np.concatenate([np.arange(r.start, r.stop) for r in ranges]))
+            distances, positions = self.index.search(vectors, min(k, size), params=self._search_params(selector))
+            chunk_ids = self._chunk_ids
+
+        results = []
+        for row_distances, row_positions in zip(distances, positions):
+            hits = []
+            for distance, position in zip(row_distances, row_positions):
+                if position == -1:
+                    continue
+                cid = chunk_ids[int(position)]
+                # Same relevance scores as batch_similarity_search on a per-PDF store
+                score = float(distance) if self.metric == "ip" else 1.0 - float(distance) / math.sqrt(2)
+                hits.append((cid, self.docstore.search(cid), score))
+            results.append(hits)
+        return results
+
+    def view(self, pdf_ids: Sequence[int]) -> "CorpusView":
+        return CorpusView(self, pdf_ids)
+
+
+class CorpusView:
+    """The PDFs of the corpus index a graph searches, standing in for a per-PDF vector store.
+
+    index_to_docstore_id and docstore list and resolve the view's chunks in order,
+    which is what hybrid search and lexical index building read from a store.
+    """
+
+    def __init__(self, corpus: CorpusIndex, pdf_ids: Sequence[int]):
+        self.corpus = corpus
+        self.pdf_ids = tuple(pdf_ids)
+        self.docstore = corpus.docstore
+        self.index_to_docstore_id = corpus.chunk_ids(self.pdf_ids)
+
+    def batch_similarity_search(self, queries: List[str], k: int = 4) -> List[List[Tuple[str, Document, float]]]:
+        return self.corpus.search(queries, k, self.pdf_ids)
+
+
+# Global corpus index shared by every graph in the process
+corpus = CorpusIndex()
@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import get_embeddings, EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+from src.db.connection import ConnectionPool
+from src.vector_store.embedding_engine import encode_texts
+
+logger = logging.getLogger(__name__)
+
+EVICTION_LOW_WATERMARK = 0.9  # Eviction trims to this share of max_entries, so the cache is not recounted on every insert
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Content address of a chunk embedding: hash of (embedding model, chunk text)."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of float32 chunk embeddings with least-recently-used eviction.
+    Each thread uses its own pooled WAL connection. The entry count is tracked in memory
+    and only recounted once it passes max_entries."""
+
+    def __init__(self, db_path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._pool = ConnectionPool(db_path)
+        self._initialized = False  # Table created on first use, not at import
+        self._estimated_entries: Optional[int] = None
+        self._count_lock = threading.Lock()
+
+    def init_database(self):
+        """Initialize the cache table"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._pool.write() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)")
+        self._initialized = True
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.init_database()
+        return self._pool.connection()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the given keys, refreshing their recency"""
+        if not keys:
+            return {}
+        found = {}
+        conn = self._connection()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            with self._pool.write() as conn:
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]):
+        """Store vectors by key and evict the least recently used entries past max_entries"""
+        if not items:
+            return
+        now = time.time()
+        self._connection()
+        with self._count_lock:
+            with self._pool.write() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+                )
+                if self._estimated_entries is None:
+                    self._estimated_entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                else:
+                    # Over-estimates replaced keys and ignores other processes; the recount below corrects both
+                    self._estimated_entries += len(items)
+                if self._estimated_entries <= self.max_entries:
+                    return
+                count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    overflow = count - int(self.max_entries * EVICTION_LOW_WATERMARK)
+                    logger.debug(f"Evicting {overflow} least recently used embeddings")
+                    conn.execute("""
+                        DELETE FROM embedding_cache WHERE key IN (
+                            SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?
+                        )
+                    """, (overflow,))
+                    count -= overflow
+                self._estimated_entries = count
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model.
+    Hit/miss counts of the most recent embed_array call are kept in last_stats, and are
+    added up in the caller's stats dict when one is passed.
+    Without an explicit model it uses the configured one, loaded on first use."""
+
+    def __init__(self, embeddings: Optional[Embeddings], cache: EmbeddingCache, model_name: str):
+        self._embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self.last_stats = {"hits": 0, "misses": 0}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings if self._embeddings is not None else get_embeddings()
+
+    def embed_array(self, texts: List[str], stats: Optional[Dict[str, int]] = None) -> np.ndarray:
+        """Embeddings of texts as one float32 matrix, rows in input order, ready for FAISS."""
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        try:
+            vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed, embedding everything: {e}")
+            vectors = {}
+
+        # Identical chunks inside one document are embedded only once
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            fresh = dict(zip(missing.keys(), encode_texts(self.embeddings, list(missing.values()))))
+            try:
+                self.cache.put_many(fresh)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            vectors.update(fresh)
+
+        self.last_stats = {"hits": len(texts) - len(missing), "misses": len(missing)}
+        if stats is not None:
+            for name, count in self.last_stats.items():
+                stats[name] = stats.get(name, 0) + count
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
+cached_emb = CachedEmbeddings(None, embedding_cache, EMBEDDING_MODEL)
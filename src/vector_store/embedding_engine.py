@@ -0,0 +1,144 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_DEVICE,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    EMBEDDING_PROCESSES,
+    EMBEDDING_POOL_MIN_TEXTS,
+)
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def encode_texts(embeddings: Embeddings, texts: Sequence[str]) -> np.ndarray:
+    """Embeddings of texts as a float32 matrix: straight from an EmbeddingEngine,
+    converted from lists for any other LangChain embeddings."""
+    if isinstance(embeddings, EmbeddingEngine):
+        return embeddings.encode(texts)
+    return np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+
+
+def length_order(texts: Sequence[str]) -> np.ndarray:
+    """Indices that sort texts longest first, so each batch pads to similar lengths."""
+    return np.argsort([-len(text) for text in texts], kind="stable")
+
+
+class EmbeddingEngine(Embeddings):
+    """sentence-transformers encoder with float32 NumPy output, tuned for bulk ingest.
+
+    Texts are encoded longest first in batches of batch_size, so little compute is
+    spent on padding, and results are put back in input order. With threads > 0
+    torch's intra-op threads are set when the model loads. With processes > 1,
+    requests of at least pool_min_texts texts go to a pool of encoder processes,
+    started on first use; each process gets an even share of the threads.
+    embed_documents and embed_query serve the LangChain interface from the same model.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        *,
+        device: str = EMBEDDING_DEVICE,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        threads: int = EMBEDDING_THREADS,
+        processes: int = EMBEDDING_PROCESSES,
+        pool_min_texts: int = EMBEDDING_POOL_MIN_TEXTS,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.threads = threads
+        self.processes = processes
+        self.pool_min_texts = pool_min_texts
+        self._model = None
+        self._pool: Optional[dict] = None
+        self._lock = threading.Lock()
+        # The multi-process pool's queues serve one request at a time
+        self._pool_lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        """The SentenceTransformer, loaded on first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import torch
+                    from sentence_transformers import SentenceTransformer
+
+                    if self.threads > 0:
+                        torch.set_num_threads(self.threads)
+                    logger.info(f"Loading embedding model {self.model_name} on {self.device} ({torch.get_num_threads()} threads)")
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def _get_pool(self) -> dict:
+        if self._pool is None:
+            model = self.model
+            # Worker processes read their torch thread count from the environment at start
+            threads = max(1, (self.threads or os.cpu_count() or 1) // self.processes)
+            saved = {name: os.environ.get(name) for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS")}
+            os.environ.update({name: str(threads) for name in saved})
+            try:
+                logger.info(f"Starting {self.processes} embedding processes ({threads} threads each)")
+                self._pool = model.start_multi_process_pool([self.device] * self.processes)
+            finally:
+                for name, value in saved.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+            atexit.register(self.close)
+        return self._pool
+
+    @timed("embedding.encode")
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings of texts as one float32 matrix, rows in input order."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        order = length_order(texts)
+        # Newlines become spaces, as HuggingFaceEmbeddings did, so vectors match earlier indexes and the embedding cache
+        ordered = [texts[i].replace("\n", " ") for i in order]
+        if self.processes > 1 and len(texts) >= self.pool_min_texts:
+            with self._pool_lock:
+                pool = self._get_pool()
+                # Contiguous chunks of the sorted texts keep each process's batches uniform too
+                chunk_size = max(self.batch_size, -(-len(texts) // (4 * self.processes)))
+                encoded = self.model.encode(
+                    ordered, pool=pool, batch_size=self.batch_size, chunk_size=chunk_size, convert_to_numpy=True
+                )
+        else:
+            encoded = self.model.encode(
+                ordered, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+            )
+        vectors = np.empty_like(encoded, dtype=np.float32)
+        vectors[order] = encoded
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+    def close(self):
+        """Stop the encoder processes, if started."""
+        with self._pool_lock:
+            if self._pool is not None:
+                from sentence_transformers import SentenceTransformer
+
+                SentenceTransformer.stop_multi_process_pool(self._pool)
+                self._pool = None
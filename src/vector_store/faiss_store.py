@@ -1,17 +1,176 @@
 import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from config import emb
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from config import (
+    get_embeddings,
+    FAISS_INDEX_TYPE,
+    FAISS_METRIC,
+    FAISS_ANN_MIN_VECTORS,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NLIST,
+    FAISS_IVF_NPROBE,
+    FAISS_PQ_M,
+    FAISS_PQ_NBITS,
+)
+from src.vector_store.embedding_cache import cached_emb
+from src.vector_store.embedding_engine import encode_texts
 
 logger = logging.getLogger(__name__)
 
+FAISS_INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+FAISS_METRICS = ("l2", "ip")
+
+
+def vector_store_kwargs(metric: str = FAISS_METRIC) -> dict:
+    """FAISS vector store arguments for a metric: "ip" normalizes vectors so inner product is cosine."""
+    if metric not in FAISS_METRICS:
+        raise ValueError(f"Unknown FAISS metric '{metric}', expected one of {FAISS_METRICS}")
+    if metric == "ip":
+        return {"normalize_L2": True, "distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT}
+    return {}
+
+
+def _ivf_nlist(n_vectors: int) -> int:
+    nlist = FAISS_IVF_NLIST or int(4 * math.sqrt(n_vectors))
+    # k-means wants about 39 training vectors per list
+    return max(1, min(nlist, n_vectors // 39))
+
+
+def index_factory_string(index_type: str, n_vectors: int, dim: int) -> str:
+    """faiss.index_factory description of a configured index type for n_vectors of dimension dim."""
+    if index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {FAISS_INDEX_TYPES}")
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{FAISS_HNSW_M}"
+    if index_type == "ivf":
+        return f"IVF{_ivf_nlist(n_vectors)},Flat"
+    if dim % FAISS_PQ_M:
+        raise ValueError(f"FAISS_PQ_M={FAISS_PQ_M} must divide the embedding dimension {dim}")
+    return f"IVF{_ivf_nlist(n_vectors)},PQ{FAISS_PQ_M}x{FAISS_PQ_NBITS}"
+
+
+def configure_search(index: faiss.Index) -> faiss.Index:
+    """Apply the configured search-time parameters (IVF nprobe, HNSW efSearch) to an index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(FAISS_IVF_NPROBE, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+    return index
+
+
+def build_faiss_index(vectors: np.ndarray, index_type: str = FAISS_INDEX_TYPE, metric: str = FAISS_METRIC) -> faiss.Index:
+    """Build a FAISS index of the given type over vectors (normalized already for "ip"),
+    training it on those same vectors when the type needs training."""
+    n_vectors, dim = vectors.shape
+    description = index_factory_string(index_type, n_vectors, dim)
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+    start = time.perf_counter()
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    logger.info(f"Built {description} index over {n_vectors} vectors in {time.perf_counter() - start:.2f}s")
+    return configure_search(index)
+
+
+def finalize_vector_store(vectorstore: Optional[FAISS]) -> Optional[FAISS]:
+    """Swap a fully built store's flat index for the configured index type.
+    Stores are built flat, so batches can be added before any training; stores
+    below FAISS_ANN_MIN_VECTORS keep their exact flat index."""
+    if vectorstore is None or FAISS_INDEX_TYPE == "flat":
+        return vectorstore
+    n_vectors = vectorstore.index.ntotal
+    if n_vectors < FAISS_ANN_MIN_VECTORS:
+        logger.debug(f"Keeping a flat index for {n_vectors} vectors (below {FAISS_ANN_MIN_VECTORS})")
+        return vectorstore
+    vectors = vectorstore.index.reconstruct_n(0, n_vectors)
+    vectorstore.index = build_faiss_index(vectors)
+    return vectorstore
+
+
+def add_chunks_to_vector_store(
+    vectorstore: Optional[FAISS], chunks: List[Document], cache_stats: Optional[Dict[str, int]] = None
+) -> FAISS:
+    """Embed chunks and append them to a vector store, creating it (flat, with the
+    configured metric) when None. Chunk ids continue from the store's size, so
+    batched and one-shot builds match. The float32 embedding matrix goes into the
+    FAISS index as is, without LangChain's round trip through Python lists.
+    Embedding cache hits and misses are added up in cache_stats when given."""
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = cached_emb.embed_array(texts, stats=cache_stats)
+
+    if vectorstore is None:
+        dim = vectors.shape[1]
+        index = faiss.IndexFlatIP(dim) if FAISS_METRIC == "ip" else faiss.IndexFlatL2(dim)
+        vectorstore = FAISS(get_embeddings(), index, InMemoryDocstore(), {}, **vector_store_kwargs())
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+
+    start = len(vectorstore.index_to_docstore_id)
+    ids = [str(i) for i in range(start, start + len(chunks))]
+    vectorstore.index.add(vectors)
+    vectorstore.docstore.add({
+        chunk_id: Document(id=chunk_id, page_content=chunk.page_content, metadata=chunk.metadata)
+        for chunk_id, chunk in zip(ids, chunks)
+    })
+    vectorstore.index_to_docstore_id.update({start + i: chunk_id for i, chunk_id in enumerate(ids)})
+    return vectorstore
+
 
 def create_vector_store(chunks):
-    """Create a FAISS vector store from document chunks."""
+    """Create a FAISS vector store from document chunks.
+    Chunk embeddings come from the content-addressed cache; only misses reach the model."""
     logger.info(f"Creating vector store with {len(chunks)} chunks")
     try:
-        vectorstore = FAISS.from_documents(chunks, emb)
+        cache_stats = {"hits": 0, "misses": 0}
+        vectorstore = finalize_vector_store(add_chunks_to_vector_store(None, chunks, cache_stats))
+        logger.info(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         logger.info("Vector store created successfully")
         return vectorstore
     except Exception as e:
         logger.error(f"Failed to create vector store: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def batch_similarity_search(vectorstore: FAISS, queries: List[str], k: int = 4) -> List[List[Tuple[str, Document, float]]]:
+    """Search several queries at once: one embedding call and one matrix index search.
+    Returns, per query, (chunk id, document, relevance score) hits with higher scores more relevant."""
+    if not queries:
+        return []
+    if hasattr(vectorstore, "batch_similarity_search"):  # A CorpusView searches the shared corpus index itself
+        return vectorstore.batch_similarity_search(queries, k=k)
+    vectors = encode_texts(vectorstore.embedding_function, queries)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    distances, indices = vectorstore.index.search(vectors, k)
+
+    if vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+        # The cosine similarity is the relevance; LangChain's inner product score (1 - similarity) ranks backwards
+        relevance = float
+    else:
+        relevance = vectorstore._select_relevance_score_fn()
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        hits = []
+        for distance, index in zip(row_distances, row_indices):
+            if index == -1:  # Fewer than k vectors in the index
+                continue
+            chunk_id = vectorstore.index_to_docstore_id[int(index)]
+            hits.append((chunk_id, vectorstore.docstore.search(chunk_id), relevance(float(distance))))
+        results.append(hits)
+    return results
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from typing import List, Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from config import (
+    get_embeddings,
+    EMBEDDING_MODEL,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    INDEX_DIR,
+    FAISS_INDEX_TYPE,
+    FAISS_METRIC,
+    FAISS_ANN_MIN_VECTORS,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_IVF_NLIST,
+    FAISS_PQ_M,
+    FAISS_PQ_NBITS,
+)
+from src.vector_store.faiss_store import configure_search, vector_store_kwargs
+from src.retrieval.lexical import LexicalIndex
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+INDEX_NAME = "index"
+META_FILE = "meta.json"
+
+
+def index_fingerprint() -> dict:
+    """Settings a stored index was built with; any change makes it stale.
+    Search-time settings (ef_search, nprobe) are left out: configure_search applies them on load."""
+    return {
+        "format_version": INDEX_FORMAT_VERSION,
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "faiss_index_type": FAISS_INDEX_TYPE,
+        "faiss_metric": FAISS_METRIC,
+        "faiss_ann_min_vectors": FAISS_ANN_MIN_VECTORS,
+        "faiss_hnsw_m": FAISS_HNSW_M,
+        "faiss_hnsw_ef_construction": FAISS_HNSW_EF_CONSTRUCTION,
+        "faiss_ivf_nlist": FAISS_IVF_NLIST,
+        "faiss_pq_m": FAISS_PQ_M,
+        "faiss_pq_nbits": FAISS_PQ_NBITS,
+    }
+
+
+def _index_path(content_hash: str) -> str:
+    return os.path.join(INDEX_DIR, content_hash)
+
+
+def _read_faiss_index(path: str):
+    """Read a FAISS index memory-mapped, falling back to a full read."""
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError as e:
+        logger.debug(f"Memory-mapped read unsupported for {path} ({e}); reading into memory")
+        return faiss.read_index(path)
+
+
+def save_vector_store(content_hash: str, vectorstore: FAISS) -> str:
+    """Persist a FAISS vector store under its PDF content hash, return its directory."""
+    target = _index_path(content_hash)
+    logger.info(f"Saving vector store for {content_hash} to {target}")
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    # Write into a sibling temp dir and swap it in, so readers never see a half-written index
+    tmp_dir = tempfile.mkdtemp(prefix=f".{content_hash}-", dir=INDEX_DIR)
+    try:
+        vectorstore.save_local(tmp_dir, index_name=INDEX_NAME)
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump(index_fingerprint(), f)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+        logger.info(f"Vector store for {content_hash} saved successfully")
+        return target
+    except Exception as e:
+        logger.error(f"Failed to save vector store for {content_hash}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def has_vector_store(content_hash: str) -> bool:
+    """Whether a fresh stored index exists for a PDF content hash, without loading it."""
+    try:
+        with open(os.path.join(_index_path(content_hash), META_FILE)) as f:
+            return json.load(f) == index_fingerprint()
+    except (OSError, ValueError):
+        return False
+
+
+def load_vector_store(content_hash: str) -> Optional[FAISS]:
+    """Load the stored FAISS vector store for a PDF content hash.
+    Returns None when no index exists or it was built with different settings."""
+    path = _index_path(content_hash)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        logger.debug(f"No stored index for {content_hash}")
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta != index_fingerprint():
+            logger.info(f"Stored index for {content_hash} is stale ({meta}); it will be rebuilt")
+            return None
+
+        index = _read_faiss_index(os.path.join(path, f"{INDEX_NAME}.faiss"))
+        # The pickle is written by save_vector_store only, never taken from uploads
+        with open(os.path.join(path, f"{INDEX_NAME}.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        logger.info(f"Loaded stored index for {content_hash} ({index.ntotal} vectors)")
+        return FAISS(get_embeddings(), configure_search(index), docstore, index_to_docstore_id, **vector_store_kwargs())
+    except Exception as e:
+        logger.warning(f"Failed to load stored index for {content_hash}, it will be rebuilt: {e}")
+        return None
+
+
+def vector_store_chunks(vectorstore: FAISS) -> List[Document]:
+    """Chunk documents in FAISS index order, so list positions are the chunk ids."""
+    return [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        for position in range(len(vectorstore.index_to_docstore_id))
+    ]
+
+
+def load_or_build_lexical_index(content_hash: Optional[str], vectorstore: FAISS) -> LexicalIndex:
+    """Load the lexical index stored next to a PDF's FAISS index.
+    When missing it is built from the vector store's chunks and stored alongside it."""
+    path = _index_path(content_hash) if content_hash else None
+    if path and os.path.exists(os.path.join(path, META_FILE)):
+        try:
+            lexical_index = LexicalIndex.load(path)
+            # Rows must line up with FAISS positions for hybrid search
+            if lexical_index is not None and lexical_index.n_docs == len(vectorstore.index_to_docstore_id):
+                logger.debug(f"Loaded stored lexical index for {content_hash}")
+                return lexical_index
+        except Exception as e:
+            logger.warning(f"Failed to load stored lexical index for {content_hash}, it will be rebuilt: {e}")
+
+    lexical_index = LexicalIndex.build([chunk.page_content for chunk in vector_store_chunks(vectorstore)])
+    if path and os.path.isdir(path):
+        lexical_index.save(path)
+        logger.info(f"Lexical index for {content_hash} saved successfully")
+    return lexical_index